@@ -0,0 +1,163 @@
+"""
+ADHKAR PAGES
+============
+
+Splits static/data/adhkar.txt into display pages on the server, so the
+display sticks only render the page they are given instead of
+re-splitting the whole text after every reload.
+
+The text is a list of verses separated by `<br>` markers; a verse may
+span several lines. Pages always break between verses.
+
+HOW TO USE:
+-----------
+    store = AdhkarStore('static/data/adhkar.txt')
+    split = store.pages(2)                  # balanced by length
+    split = store.pages(2, (48, 52))        # as the entry's pageDistribution
+    split.pages                             # ['verse<br>verse', 'verse<br>...']
+    split.version                           # changes with the text or the split
+
+or over HTTP: /api/adhkar?pages=2 and /api/adhkar?pages=2&distribution=48,52
+
+IMPORTANT NOTES:
+---------------
+- With a distribution the split is exactly the one announcements.js
+  makes (`distributeVersesAcrossPages`), so a configured entry looks the
+  same either way.
+- Without one, pages are balanced by length: each line weighs its
+  character count, but at least MIN_LINE_WEIGHT, since a short line
+  still takes a full row on screen.
+- Splits are cached per page count and distribution, and dropped when
+  the file's modification time changes.
+"""
+
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+ADHKAR_TEXT = os.path.join('static', 'data', 'adhkar.txt')
+
+VERSE_SEPARATOR = '<br>'
+
+# Most pages one request may ask for
+MAX_PAGES = 20
+
+# A line shorter than this still fills a row on the display
+MIN_LINE_WEIGHT = 40
+
+
+class AdhkarPages(NamedTuple):
+    version: str
+    pages: List[str]
+    last_modified: Optional[datetime]
+
+
+def split_verses(text: str) -> List[str]:
+    """Verses between <br> markers, skipping empty ones (as announcements.js)"""
+    return [verse for verse in text.split(VERSE_SEPARATOR) if verse.strip()]
+
+
+def verse_weight(verse: str) -> int:
+    return sum(max(len(line.strip()), MIN_LINE_WEIGHT) for line in verse.splitlines() if line.strip())
+
+
+def _js_round(value: float) -> int:
+    # Math.round rounds halves up; Python's round() rounds them to even
+    return math.floor(value + 0.5)
+
+
+def distribute(verses: List[str], distribution: Sequence[float]) -> List[List[str]]:
+    """Verses per page from percentages, the same way announcements.js does it"""
+    pages = []
+    position = 0
+    for number, percentage in enumerate(distribution):
+        count = _js_round(percentage / 100 * len(verses))
+        if count == 0 and position < len(verses):
+            count = 1
+        end = len(verses) if number == len(distribution) - 1 else min(position + count, len(verses))
+        pages.append(verses[position:end])
+        position = end
+    return pages
+
+
+def balance(verses: List[str], page_count: int) -> List[List[str]]:
+    """Verses per page so every page carries about the same weight"""
+    weights = [verse_weight(verse) for verse in verses]
+    cumulative = [0]
+    for weight in weights:
+        cumulative.append(cumulative[-1] + weight)
+    total = cumulative[-1]
+
+    cuts = [0]
+    for number in range(1, page_count):
+        # Leave at least one verse for each later page when there are enough
+        low = min(cuts[-1] + 1, len(verses))
+        high = max(low, len(verses) - (page_count - number))
+        target = total * number / page_count
+        cuts.append(min(range(low, high + 1), key=lambda cut: abs(cumulative[cut] - target)))
+    cuts.append(len(verses))
+    return [verses[start:end] for start, end in zip(cuts, cuts[1:])]
+
+
+def paginate(text: str, page_count: int, distribution: Optional[Sequence[float]] = None) -> List[str]:
+    """Page texts, each verse joined with <br> as the display renders them"""
+    verses = split_verses(text)
+    groups = distribute(verses, distribution) if distribution else balance(verses, page_count)
+    return [VERSE_SEPARATOR.join(group) for group in groups]
+
+
+def parse_distribution(value: Optional[str], page_count: int) -> Optional[Tuple[float, ...]]:
+    """'48,52' -> (48.0, 52.0); one percentage per page"""
+    if not value:
+        return None
+    distribution = tuple(float(part) for part in value.split(','))
+    if len(distribution) != page_count or any(not 0 <= part <= 100 for part in distribution):
+        raise ValueError(f'distribution must list {page_count} percentages between 0 and 100')
+    return distribution
+
+
+class AdhkarStore:
+    """Pages of one adhkar file, cached until the file changes"""
+
+    def __init__(self, path: str = ADHKAR_TEXT, max_entries: int = 32):
+        self.path = path
+        self.max_entries = max_entries
+        self._text = None
+        self._version = None
+        self._pages: 'OrderedDict[tuple, AdhkarPages]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pages(self, page_count: int, distribution: Optional[Sequence[float]] = None) -> AdhkarPages:
+        """Raises OSError if the file can't be read"""
+        version = os.stat(self.path).st_mtime_ns
+        key = (page_count, tuple(distribution) if distribution else None)
+        with self._lock:
+            if version != self._version:
+                with open(self.path, 'r', encoding='utf-8') as file:
+                    self._text = file.read()
+                self._version = version
+                self._pages.clear()
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                return cached
+
+            pages = paginate(self._text, page_count, distribution)
+            digest = hashlib.sha1(self._text.encode('utf-8'))
+            digest.update(repr(key).encode('utf-8'))
+            cached = AdhkarPages(digest.hexdigest()[:20], pages,
+                                 datetime.fromtimestamp(version / 1e9, timezone.utc))
+            self._pages[key] = cached
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+            return cached
+
+    def clear(self):
+        with self._lock:
+            self._text = None
+            self._version = None
+            self._pages.clear()
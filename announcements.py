@@ -0,0 +1,282 @@
+"""
+ANNOUNCEMENTS INDEX
+===================
+
+Parses static/data/announcements.json once and answers "what is showing
+at this moment?" without every display downloading and filtering the
+whole file. Dated announcements are put in a start/end sweep index: the
+timeline is cut at every startDate and endDate, and the set of
+announcements showing in each slice is worked out up front, so a lookup
+is one binary search.
+
+HOW TO USE:
+-----------
+    store = AnnouncementStore('static/data/announcements.json')
+    index = store.get()              # re-reads the file only when it changed
+    active = index.active(now)       # Active(announcements, controls, next_change)
+    index.upcoming(now, limit=5)     # dated announcements that haven't started
+
+IMPORTANT NOTES:
+---------------
+- Times are UTC-aware datetimes. startDate and endDate are both
+  inclusive, as in announcements.js.
+- Entries that are not dated are still returned where they apply:
+  * "control" entries are resolved to `controls` ({id: hidden}),
+  * "recurring_weekly" entries are returned on their Irish weekday unless
+    hidden (the display checks the prayer-time window itself),
+  * "adhkar_text" entries are returned unless disabled (the display
+    decides when they trigger).
+- `next_change` is the next instant the answer can change (a start, an
+  end, or Irish midnight when weekly entries are involved). Displays
+  fetch again then instead of polling.
+- Entries with a missing id or an unreadable date are skipped. Ids
+  must be unique; a repeated id is ignored after its first entry.
+
+VERSIONED FEEDS:
+----------------
+Both the whole file and each "active" answer have a version (a hash of
+the entries' ids and contents). A display that already has version V
+asks with `?since=V` and gets only the entries added or changed since
+then plus the ids removed, worked out from the last few versions kept
+in a FeedHistory. An unknown or expired V gets the full list instead.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import irish_time
+
+logger = logging.getLogger(__name__)
+
+
+class Active(NamedTuple):
+    announcements: List[dict]
+    controls: Dict[str, bool]
+    next_change: Optional[datetime]
+
+
+class Snapshot(NamedTuple):
+    version: str
+    order: Tuple[str, ...]    # entry ids in display order
+    hashes: Dict[str, str]    # entry id -> hash of its content
+
+
+def entry_hash(entry: dict) -> str:
+    canonical = json.dumps(entry, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def make_snapshot(order, hashes: Dict[str, str], extra=()) -> Snapshot:
+    """Version a list of entries (plus anything else the answer depends on)"""
+    digest = hashlib.sha1()
+    for key in order:
+        digest.update(f"{key}\0{hashes[key]}\n".encode('utf-8'))
+    for item in extra:
+        digest.update(f"{item}\n".encode('utf-8'))
+    return Snapshot(digest.hexdigest()[:20], tuple(order), {key: hashes[key] for key in order})
+
+
+class FeedHistory:
+    """The last few versions of a feed, so clients can ask for a delta"""
+
+    def __init__(self, max_versions: int = 32):
+        self.max_versions = max_versions
+        self._snapshots: 'OrderedDict[str, Snapshot]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, snapshot: Snapshot):
+        with self._lock:
+            self._snapshots[snapshot.version] = snapshot
+            self._snapshots.move_to_end(snapshot.version)
+            while len(self._snapshots) > self.max_versions:
+                self._snapshots.popitem(last=False)
+
+    def delta(self, since: str, snapshot: Snapshot) -> Optional[Tuple[List[str], List[str]]]:
+        """Ids added or changed, and ids removed, since a version; None if it is unknown"""
+        with self._lock:
+            old = self._snapshots.get(since)
+        if old is None:
+            return None
+        changed = [key for key in snapshot.order if old.hashes.get(key) != snapshot.hashes[key]]
+        removed = [key for key in old.order if key not in snapshot.hashes]
+        return changed, removed
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+def feed_body(snapshot: Snapshot, by_id: Dict[str, dict], history: FeedHistory, since: Optional[str] = None) -> dict:
+    """The full entry list, or only what changed since an earlier version"""
+    delta = history.delta(since, snapshot) if since else None
+    if delta is None:
+        return {'version': snapshot.version, 'announcements': [by_id[key] for key in snapshot.order]}
+    changed, removed = delta
+    return {
+        'version': snapshot.version,
+        'since': since,
+        'changed': [by_id[key] for key in changed],
+        'removed': removed,
+        'order': list(snapshot.order)
+    }
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 time; one without an offset is taken as UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def irish_weekday(at: datetime) -> int:
+    """Day of the week in Ireland at a UTC instant, 0 = Sunday (as JavaScript's getDay)"""
+    return (irish_time.utc_to_irish(at).weekday() + 1) % 7
+
+
+def next_irish_midnight(at: datetime) -> datetime:
+    """The UTC instant of the next midnight on Irish clocks"""
+    tomorrow = irish_time.utc_to_irish(at).date() + timedelta(days=1)
+    midnight = datetime.combine(tomorrow, time(), tzinfo=timezone.utc)
+    # Clocks change at 01:00 UTC, so midnight is never ambiguous
+    summer = midnight - timedelta(hours=1)
+    return summer if irish_time.is_dst(summer) else midnight
+
+
+class AnnouncementIndex:
+    """Interval index over one parsed announcements file"""
+
+    def __init__(self, entries: List[dict]):
+        self.controls: Dict[str, bool] = {}
+        self.weekly: List[dict] = []
+        self.always: List[dict] = []
+        self.by_id: Dict[str, dict] = {}
+        dated: List[Tuple[datetime, datetime, dict]] = []
+
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get('id') or entry['id'] in self.by_id:
+                continue
+            self.by_id[entry['id']] = entry
+            kind = entry.get('type')
+            if kind == 'control':
+                self.controls[entry['id']] = entry.get('hide') is True
+            elif kind == 'recurring_weekly':
+                if entry.get('hide') is not True:
+                    self.weekly.append(entry)
+            elif kind == 'adhkar_text':
+                if entry.get('enabled', True):
+                    self.always.append(entry)
+            elif entry.get('startDate') and entry.get('endDate'):
+                try:
+                    start, end = parse_datetime(entry['startDate']), parse_datetime(entry['endDate'])
+                except (TypeError, ValueError):
+                    continue
+                if start <= end:
+                    dated.append((start, end, entry))
+
+        # Upcoming lookups: dated entries by start
+        dated.sort(key=lambda item: item[0])
+        self.dated = dated
+        self._starts = [start for start, _, _ in dated]
+
+        # Sweep: slice i covers [boundaries[i], boundaries[i + 1]); ends are
+        # inclusive, so an entry stops showing one microsecond after endDate
+        tick = timedelta(microseconds=1)
+        self.boundaries = sorted({start for start, _, _ in dated} | {end + tick for _, end, _ in dated})
+        self._slices: List[Tuple[dict, ...]] = []
+        for boundary in self.boundaries:
+            self._slices.append(tuple(entry for start, end, entry in dated if start <= boundary <= end))
+
+        # Version of the whole file, as served by the full feed
+        self.hashes = {key: entry_hash(entry) for key, entry in self.by_id.items()}
+        self.snapshot = make_snapshot(self.by_id, self.hashes)
+
+    def dated_at(self, at: datetime) -> Tuple[dict, ...]:
+        """Dated announcements showing at this instant, earliest start first"""
+        position = bisect_right(self.boundaries, at) - 1
+        return self._slices[position] if position >= 0 else ()
+
+    def next_boundary(self, at: datetime) -> Optional[datetime]:
+        position = bisect_right(self.boundaries, at)
+        return self.boundaries[position] if position < len(self.boundaries) else None
+
+    def active(self, at: datetime) -> Active:
+        weekday = irish_weekday(at)
+        weekly = [entry for entry in self.weekly if entry.get('dayOfWeek') == weekday]
+        announcements = list(self.dated_at(at)) + weekly + self.always
+
+        next_change = self.next_boundary(at)
+        if self.weekly:
+            midnight = next_irish_midnight(at)
+            next_change = midnight if next_change is None else min(next_change, midnight)
+        return Active(announcements, dict(self.controls), next_change)
+
+    def active_snapshot(self, active: Active) -> Snapshot:
+        """Version of one active answer; it changes with its entries, controls or next_change"""
+        next_change = active.next_change.isoformat() if active.next_change else ''
+        return make_snapshot([entry['id'] for entry in active.announcements], self.hashes,
+                             [sorted(active.controls.items()), next_change])
+
+    def upcoming(self, at: datetime, limit: Optional[int] = None) -> List[dict]:
+        """Dated announcements starting after this instant, soonest first"""
+        position = bisect_right(self._starts, at)
+        end = len(self.dated) if limit is None else position + limit
+        return [entry for _, _, entry in self.dated[position:end]]
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+
+class AnnouncementStore:
+    """The index for one announcements file, rebuilt when the file changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+        self.last_modified: Optional[datetime] = None
+        # Recent versions of the whole file and of the active answers
+        self.history = FeedHistory()
+        self.active_history = FeedHistory(max_versions=64)
+
+    def get(self) -> AnnouncementIndex:
+        try:
+            version = os.stat(self.path).st_mtime_ns
+        except OSError:
+            version = None
+        with self._lock:
+            if self._index is None or version != self._version:
+                try:
+                    entries = self._load() if version is not None else []
+                except (OSError, ValueError) as e:
+                    # Keep serving what we had while the file is being edited
+                    logger.warning("Invalid announcements file %s: %s", self.path, e)
+                    entries = None
+                if entries is not None or self._index is None:
+                    self._index = AnnouncementIndex(entries or [])
+                    self.history.record(self._index.snapshot)
+                    self.last_modified = (datetime.fromtimestamp(version / 1e9, timezone.utc)
+                                          if version is not None else None)
+                self._version = version
+            return self._index
+
+    def _load(self) -> List[dict]:
+        with open(self.path, 'r', encoding='utf-8') as file:
+            entries = json.load(file)
+        return entries if isinstance(entries, list) else []
+
+    def clear(self):
+        with self._lock:
+            self._index = None
+            self._version = None
+            self.last_modified = None
+        self.history.clear()
+        self.active_history.clear()
@@ -1,17 +1,146 @@
 import csv
+import hashlib
+import json
+import mimetypes
+import os
+import time
 from datetime import datetime, timezone
 
-from flask import Flask, render_template
-from hijri_converter import convert
+from flask import Flask, Response, abort, g, jsonify, render_template, request, send_file, stream_with_context, url_for
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.security import safe_join
 from datetime import datetime, timedelta
 
+import irish_time
+from adhkar import MAX_PAGES as MAX_ADHKAR_PAGES, AdhkarStore, parse_distribution
+from announcements import AnnouncementStore, feed_body, parse_datetime
+from assets import AssetBundler
+from compiled_timetable import load_compiled
+from compression import StaticVariants, is_compressible, negotiate
+from events import EventBroker, Watcher, format_event
+from hijri_calendar import clear_cache as clear_hijri_cache, format_hijri_date
+from images import ImageManifest
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry, WorkerFiles, resident_memory_bytes
+from profiling import Profiler, ProfilingMiddleware
+from refresh_policy import MAX_DEVICE_ID_LENGTH, refresh_policy
+from render_cache import CachedPage, FragmentCache, RenderCache, SingleFlight
+from tenants import TimetableStore, is_valid_mosque_id, tenant_csv_path
+from timetable import DEFAULT_DERIVED_TIMES, Timetable
+from timetable_export import EXPORTERS, FORMATS
+from year_bundle import YearBundles
+
 app = Flask(__name__)
 
+# Compiled templates are kept on disk so new workers don't compile them
+# again; None uses a per-user directory under the system temp directory
+JINJA_CACHE_DIR = None
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+
+# Extra times shown under the prayer table (Suhoor / Sunrise / Zawal),
+# worked out for every day when the timetable loads. The defaults are in
+# timetable.py; give DerivedTime rules here instead to suit your mosque.
+IMPORTANT_TIME_RULES = DEFAULT_DERIVED_TIMES
+
+DATA_DIR = 'data'
+PRAYER_TIMES_CSV = 'data/prayer_times.csv'
+ANNOUNCEMENTS_JSON = 'static/data/announcements.json'
+ADHKAR_TEXT = 'static/data/adhkar.txt'
+
+# Longest date range /api/range will stream in one request
+MAX_RANGE_DAYS = 366 * 50
+
+# Shared in-memory timetable, built from the CSV on first use; requests
+# arriving while it loads wait for that load instead of starting another
+_timetable = None
+_timetable_loads = SingleFlight()
+
+# Other mosques' timetables (data/<mosque_id>/prayer_times.csv), loaded on
+# first use and dropped least-recently-used first above this many bytes
+TENANT_CACHE_BYTES = 32 * 1024 * 1024
+_tenants = TimetableStore(lambda mosque_id: load_tenant_timetable(mosque_id), max_bytes=TENANT_CACHE_BYTES)
+
+# Rendered index pages keyed by (mosque id, Irish date, timetable version);
+# the default mosque's id is None
+_index_cache = RenderCache(max_entries=64)
+
+# Rendered prayer grids keyed by (timetable version, Irish date), shared by
+# every mosque with the same timetable
+_grid_fragments = FragmentCache(max_entries=64)
+
+# Days pre-baked by `py year_bundle.py` (data/year-<year>.json), used while
+# they match the timetable's version
+_year_bundles = YearBundles(DATA_DIR)
+
+# Serialised /api/day documents keyed by (mosque id, date, timetable version)
+_day_api_cache = RenderCache(max_entries=256)
+
+# Minified, fingerprinted JS/CSS bundles served from /assets/ (see assets.py)
+_assets = AssetBundler(app.static_folder)
+
+# Hash of the bundles and templates a display page is built from (page_build)
+_page_build = None
+
+
+def templates_digest():
+    # Templates only change with a deploy, so they are hashed once at startup
+    digest = hashlib.sha1()
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    for name in sorted(os.listdir(template_dir)):
+        with open(os.path.join(template_dir, name), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+_templates_digest = templates_digest()
+
+# gzip/Brotli copies of static files that have no precompressed sibling yet
+_static_variants = StaticVariants()
+
+# Resized poster variants built by `py images.py`
+_image_manifest = ImageManifest(os.path.join(app.static_folder, 'images', 'variants', 'manifest.json'))
+
+# announcements.json indexed by start/end, re-read when the file changes
+_announcements = AnnouncementStore(ANNOUNCEMENTS_JSON)
+
+# adhkar.txt split into display pages, re-split when the file changes
+_adhkar = AdhkarStore(ADHKAR_TEXT)
+
+# Longest list /api/announcements/upcoming returns
+MAX_UPCOMING_ANNOUNCEMENTS = 100
+
+# Numbers served at /metrics (see metrics.py). With several gunicorn
+# workers, set METRICS_DIR so a scrape merges all of them
+metrics_registry = Registry()
+REQUEST_SECONDS = metrics_registry.histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route', ('route', 'method', 'status'))
+TIMETABLE_LOAD_SECONDS = metrics_registry.histogram(
+    'timetable_load_seconds', 'Time to load a timetable, from a compiled file or the CSV', ('source',))
+DAY_LOOKUP_SECONDS = metrics_registry.histogram(
+    'timetable_lookup_seconds', 'Time to look up one day, from a year bundle or the timetable', ('source',),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01))
+TEMPLATE_RENDER_SECONDS = metrics_registry.histogram(
+    'template_render_seconds', 'Time to render a template', ('template',),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1))
+_metrics_files = WorkerFiles(metrics_registry, os.environ['METRICS_DIR']) if os.environ.get('METRICS_DIR') else None
+
+# Opt-in cProfile + stack sampling of / and the API (see profiling.py); not
+# installed at all unless PROFILE=1 or PROFILE_SECRET is set
+_profiler = Profiler.from_env(os.environ)
+if _profiler is not None:
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, _profiler)
+
+# Pushes day/timetable/announcement changes to the displays over /events
+event_broker = EventBroker()
+_event_watcher = None
+
+# How often the displays are sent the server clock
+TIME_SYNC_SECONDS = 60
+
 
 # Load the prayer times from the CSV file
 def load_prayer_times():
     prayer_times = []
-    with open('data/prayer_times.csv', newline='') as csvfile:
+    with open(PRAYER_TIMES_CSV, newline='') as csvfile:
         csvreader = csv.reader(csvfile)
         next(csvreader)  # Skip header
         for row in csvreader:
@@ -19,26 +148,84 @@ def load_prayer_times():
     return prayer_times
 
 
+def get_timetable():
+    # Load and index the CSV once; every request then does O(1) lookups
+    global _timetable
+    if _timetable is None:
+        _timetable = _timetable_loads.do(PRAYER_TIMES_CSV, load_timetable)
+    return _timetable
+
+
+def load_timetable():
+    # A load that finished just before this one started has set it
+    if _timetable is not None:
+        return _timetable
+    # A compiled file (`py compiled_timetable.py`) is mapped and shared
+    # between workers; without one, or if it is out of date, read the CSV
+    started = time.perf_counter()
+    timetable = load_compiled(PRAYER_TIMES_CSV, IMPORTANT_TIME_RULES)
+    source = 'compiled'
+    if timetable is None:
+        timetable = Timetable.from_rows(load_prayer_times(), IMPORTANT_TIME_RULES)
+        source = 'csv'
+    TIMETABLE_LOAD_SECONDS.observe(time.perf_counter() - started, source=source)
+    return timetable
+
+
+def load_tenant_timetable(mosque_id):
+    csv_path = tenant_csv_path(DATA_DIR, mosque_id)
+    started = time.perf_counter()
+    timetable = load_compiled(csv_path, IMPORTANT_TIME_RULES)
+    source = 'compiled'
+    if timetable is None:
+        timetable = Timetable.from_csv(csv_path, IMPORTANT_TIME_RULES)
+        source = 'csv'
+    TIMETABLE_LOAD_SECONDS.observe(time.perf_counter() - started, source=source)
+    return timetable
+
+
+def get_tenant_timetable(mosque_id):
+    # None for an unknown (or malformed) mosque id. A mosque whose CSV is
+    # broken raises, so it shows up as a logged error rather than a 404
+    if not is_valid_mosque_id(mosque_id):
+        return None
+    try:
+        return _tenants.get(mosque_id)
+    except FileNotFoundError:
+        return None
+
+
+def reset_caches():
+    # Forget everything loaded from disk so the next request reloads it
+    global _timetable, _page_build
+    _timetable = None
+    _page_build = None
+    _tenants.clear()
+    _index_cache.clear()
+    _grid_fragments.clear()
+    _day_api_cache.clear()
+    _year_bundles.clear()
+    _assets.clear()
+    _static_variants.clear()
+    _image_manifest.clear()
+    _announcements.clear()
+    _adhkar.clear()
+    clear_hijri_cache()
+
+
 def get_islamic_date(date=None):
     if date is None:
         today = datetime.today().date()  # Get today's date
     else:
         today = date
-        
-    hijri_date = convert.Gregorian(today.year, today.month, today.day).to_hijri()
-
-    # Format Islamic date like "14 J-Ul-Awwal 1436"
-    islamic_months = [
-        "Muharram", "Safar", "Rabi-Ul-Awwal", "Rabi-Ul-Thani",
-        "J-Ul-Awwal", "J-Ul-Thani", "Rajab", "Sha'ban",
-        "Ramadan", "Shawwal", "Dhul-Qadah", "Dhul-Hijjah"
-    ]
 
-    formatted_hijri_date = f"{hijri_date.day} {islamic_months[hijri_date.month - 1]} {hijri_date.year}"
-    return formatted_hijri_date
+    # Conversions are memoised per date in hijri_calendar
+    return format_hijri_date(today)
 
 
 def calculate_important_times(prayer_times):
+    # Works on a single raw row; the app itself reads the precomputed
+    # values from the timetable (see IMPORTANT_TIME_RULES)
     # Convert string times to datetime objects for calculations
     # Correct indices based on your current CSV structure:
     # [0]=MONTH, [1]=DATE, [2]=FAJR BEGINNING, [3]=SUNRISE BEGINNING, [4]=ZOHR BEGINNING, etc.
@@ -60,36 +247,113 @@ def calculate_important_times(prayer_times):
 
 # To determine if a given date is in Irish Summer Time
 def is_ireland_dst(dt):
-    # Ireland's DST rules: starts last Sunday in March, ends last Sunday in October
-    year = dt.year
-    # Last Sunday in March
-    march_last_day = 31 - (datetime(year, 3, 31).weekday() + 1) % 7
-    dst_start = datetime(year, 3, march_last_day, 1, 0, tzinfo=timezone.utc)
-    
-    # Last Sunday in October
-    oct_last_day = 31 - (datetime(year, 10, 31).weekday() + 1) % 7
-    dst_end = datetime(year, 10, oct_last_day, 1, 0, tzinfo=timezone.utc)
-    
-    return dst_start <= dt < dst_end
+    # Ireland's DST rules: starts last Sunday in March, ends last Sunday in October.
+    # The transition instants are computed once per year in irish_time.
+    return irish_time.is_dst(dt)
+
+
+def get_irish_time():
+    # The current Irish wall-clock time (UTC, plus an hour in summer time)
+    return irish_time.utc_to_irish(datetime.now(timezone.utc))
+
+
+def build_day_times(timetable, index):
+    # Everything the page shows for one day, in the shape used by /api/day
+    prayer_times = timetable.row(index)
+    return {
+        'beginning': prayer_times.beginning_times(),
+        'jamaah': prayer_times.jamaah_times(),
+        'important': timetable.derived_times_at(index)
+    }
+
+
+def build_day_payload(timetable, day):
+    # Baked into a year bundle ahead of time, or worked out now
+    started = time.perf_counter()
+    payload = _year_bundles.payload(timetable.version, day)
+    if payload is not None:
+        DAY_LOOKUP_SECONDS.observe(time.perf_counter() - started, source='bundle')
+        return payload
+    payload = compute_day_payload(timetable, day)
+    DAY_LOOKUP_SECONDS.observe(time.perf_counter() - started, source='timetable')
+    return payload
+
+
+def compute_day_payload(timetable, day):
+    # Same data index() passes to the template, for a single Irish date
+    today_index = timetable.row_index(day.month, day.day)
+    if today_index is None:
+        return None
+    tomorrow = day + timedelta(days=1)
+    tomorrow_index = timetable.row_index(tomorrow.month, tomorrow.day)
+
+    return {
+        'date': day.isoformat(),
+        'version': timetable.version,
+        'gregorian_date': day.strftime('%a %d %b %Y'),
+        'islamic_date': get_islamic_date(day),
+        'today': build_day_times(timetable, today_index),
+        'tomorrow': build_day_times(timetable, tomorrow_index) if tomorrow_index is not None else None
+    }
+
 
 # Get the current time and date from the prayer times
 @app.route('/')
 def index():
-    prayer_times = load_prayer_times()
-    
-    # Determine if Ireland is currently in DST (summer time)
-    now = datetime.now(timezone.utc)
-    is_summer_time = is_ireland_dst(now)
-    
-    # Apply the Irish time offset
-    irish_time = now + timedelta(hours=(1 if is_summer_time else 0))
+    return serve_index(get_timetable(), None)
+
+
+# The same page for another mosque in this deployment
+@app.route('/m/<mosque_id>/')
+def tenant_index(mosque_id):
+    timetable = get_tenant_timetable(mosque_id)
+    if timetable is None:
+        abort(404)
+    return serve_index(timetable, mosque_id)
+
+
+def serve_index(timetable, mosque_id):
+    irish_time = get_irish_time()
     
+    # The page only changes when the Irish date or the timetable data changes;
+    # the clock itself is drawn by static/js/time.js. Requests that miss the
+    # cache together (every display at midnight) share a single render
+    cache_key = (mosque_id, irish_time.date(), timetable.version)
+    page = _index_cache.get_or_put(cache_key, lambda: render_index(timetable, irish_time, day_api_url(mosque_id)))
+    return page.to_response(request)
+
+
+def day_api_url(mosque_id):
+    return url_for('api_day') if mosque_id is None else url_for('tenant_api_day', mosque_id=mosque_id)
+
+
+def render_index(timetable, irish_time, day_url='/api/day'):
+    bundled = _year_bundles.payload(timetable.version, irish_time.date())
+    islamic_date = bundled['islamic_date'] if bundled else get_islamic_date(irish_time.date())
+    prayer_grid = render_prayer_grid(timetable, irish_time)
+    with TEMPLATE_RENDER_SECONDS.time(template='index.html'):
+        return render_template('index.html',
+                             current_time=irish_time.strftime('%H:%M:%S'),
+                             current_date=irish_time.strftime('%a %d %b %Y'),
+                             islamic_date=islamic_date,
+                             prayer_grid=prayer_grid,
+                             day_url=day_url)
+
+
+def render_prayer_grid(timetable, irish_time):
+    # The grid only depends on the day and the timetable, so it is rendered
+    # once even when the page around it is not cached
+    return _grid_fragments.get_or_render((timetable.version, irish_time.date()),
+                                         lambda: render_prayer_grid_html(timetable, irish_time))
+
+
+def render_prayer_grid_html(timetable, irish_time):
     # Use Irish time for day and month
     current_month = irish_time.month
     current_day = irish_time.day
     
     # Get today's prayer times using both month and day
-    today_prayer_times = next((row for row in prayer_times if int(row[0]) == current_month and int(row[1]) == current_day), None)
+    today_prayer_times = timetable.get(current_month, current_day)
     
     # Get tomorrow's date (also in Irish time)
     tomorrow = irish_time + timedelta(days=1)
@@ -97,20 +361,392 @@ def index():
     tomorrow_day = tomorrow.day
 
     # Get tomorrow's prayer times using both month and day
-    tomorrow_prayer_times = next((row for row in prayer_times if int(row[0]) == tomorrow_month and int(row[1]) == tomorrow_day), None)
+    tomorrow_prayer_times = timetable.get(tomorrow_month, tomorrow_day)
+
+    # Important times were worked out when the timetable loaded
+    important_times = timetable.derived_times(current_month, current_day)
+    tomorrow_important_times = timetable.derived_times(tomorrow_month, tomorrow_day)
+
+    with TEMPLATE_RENDER_SECONDS.time(template='_prayer_grid.html'):
+        return render_template('_prayer_grid.html',
+                             today_prayer_times=today_prayer_times,
+                             tomorrow_prayer_times=tomorrow_prayer_times,
+                             important_times=important_times,
+                             tomorrow_important_times=tomorrow_important_times)
+
+
+@app.template_global()
+def asset_url(name):
+    # URL of a bundle that changes whenever its content does
+    return url_for('asset', filename=_assets.filename(name))
+
+
+@app.template_global()
+def page_build():
+    # Changes whenever a deploy changes the page (JS/CSS bundles or templates).
+    # Displays are told it with their day data and clock syncs, and reload
+    # themselves when it differs from the one their page was rendered with
+    global _page_build
+    if _page_build is None:
+        digest = hashlib.sha1(_templates_digest.encode('utf-8'))
+        for name in sorted(_assets.bundles):
+            digest.update(_assets.filename(name).encode('utf-8'))
+        _page_build = digest.hexdigest()[:12]
+    return _page_build
+
+
+# Bundled JS/CSS; a new deploy changes the URL, so browsers can cache these forever
+@app.route('/assets/<filename>')
+def asset(filename):
+    bundle = _assets.find(filename)
+    if bundle is None:
+        abort(404)
+    return bundle.page.to_response(request)
+
+
+def serve_static(filename):
+    # Flask's /static/ handler, but text files (JSON, adhkar, fonts, ...) are
+    # sent gzip/Brotli compressed when the client accepts it
+    path = safe_join(app.static_folder, filename)
+    if path is None or not is_compressible(path) or not os.path.isfile(path):
+        return app.send_static_file(filename)
+
+    encoding = negotiate(request.accept_encodings)
+    variant = _static_variants.get(path, encoding) if encoding else None
+    if variant is None:
+        response = app.send_static_file(filename)
+    elif isinstance(variant, str):
+        # Precompressed .br/.gz sibling written by `py compression.py`
+        response = send_file(variant, mimetype=mimetypes.guess_type(path)[0],
+                             max_age=app.get_send_file_max_age(filename))
+        response.headers['Content-Encoding'] = encoding
+    else:
+        stat = os.stat(path)
+        response = Response(variant, mimetype=mimetypes.guess_type(path)[0])
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding}")
+        response.last_modified = stat.st_mtime
+        response.make_conditional(request)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+app.view_functions['static'] = serve_static
+
+
+# Announcement posters, resized and re-encoded for the requesting display
+@app.route('/images/<path:filename>')
+def image(filename):
+    try:
+        width = int(request.args['w'])
+    except (KeyError, ValueError):
+        width = None
+    variant = _image_manifest.choose(f'images/{filename}', request.accept_mimetypes, width)
+    if variant is None:
+        # Not built yet: send the original poster
+        response = serve_static(f'images/{filename}')
+    else:
+        response = app.send_static_file(variant['file'])
+    response.vary.add('Accept')
+    return response
+
+
+# Day data for displays that update in place instead of reloading the page
+@app.route('/api/day')
+def api_day():
+    return serve_day(get_timetable(), None)
+
+
+@app.route('/api/<mosque_id>/day')
+def tenant_api_day(mosque_id):
+    timetable = get_tenant_timetable(mosque_id)
+    if timetable is None:
+        return jsonify({'error': f'Unknown mosque: {mosque_id}'}), 404
+    return serve_day(timetable, mosque_id)
+
+
+def serve_day(timetable, mosque_id):
+    date_param = request.args.get('date')
+    if date_param:
+        try:
+            day = datetime.strptime(date_param, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+    else:
+        day = get_irish_time().date()
+
+    # Concurrent misses for the same day (a fleet refreshing at once) share one build
+    cache_key = (mosque_id, day, timetable.version)
+    try:
+        page = _day_api_cache.get_or_put(cache_key, lambda: render_day(timetable, day), mimetype='application/json')
+    except OverflowError:
+        return jsonify({'error': 'date is outside the supported Hijri calendar range'}), 400
+    if page is None:
+        return jsonify({'error': f'No prayer times found for {day.isoformat()}'}), 404
+    response = page.to_response(request)
+    # Sent beside the (cached or pre-baked) body, which doesn't change with a deploy
+    response.headers['X-Page-Build'] = page_build()
+    return response
+
+
+def render_day(timetable, day):
+    # The /api/day document, or None if the timetable has no such day
+    payload = build_day_payload(timetable, day)
+    return None if payload is None else json.dumps(payload, separators=(',', ':'))
+
+
+def parse_date_param(name):
+    value = request.args.get(name)
+    if not value:
+        raise ValueError(f'{name} is required (YYYY-MM-DD)')
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{name} must be in YYYY-MM-DD format')
+
+
+# Stream a date range of prayer times as NDJSON or CSV
+@app.route('/api/range')
+def api_range():
+    try:
+        start = parse_date_param('from')
+        end = parse_date_param('to')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if end < start:
+        return jsonify({'error': 'to must not be before from'}), 400
+    if (end - start).days >= MAX_RANGE_DAYS:
+        return jsonify({'error': f'range must be shorter than {MAX_RANGE_DAYS} days'}), 400
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORTERS:
+        return jsonify({'error': f'format must be one of: {", ".join(EXPORTERS)}'}), 400
+
+    chunks = EXPORTERS[export_format](get_timetable(), start, end)
+    response = Response(stream_with_context(chunks), mimetype=FORMATS[export_format])
+    if export_format == 'csv':
+        response.headers['Content-Disposition'] = f'attachment; filename=prayer_times_{start}_{end}.csv'
+    return response
+
+
+def parse_at_param():
+    # ?at=<ISO 8601 time>, defaulting to now; no offset means UTC
+    value = request.args.get('at')
+    if not value:
+        return datetime.now(timezone.utc)
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        raise ValueError('at must be an ISO 8601 date and time, e.g. 2025-06-04T20:30:00+01:00')
+
+
+def feed_response(body, version, last_modified=None):
+    # Versioned JSON, compressed when accepted; a client that already has
+    # this version (If-None-Match / If-Modified-Since) gets an empty 304
+    page = CachedPage(json.dumps(body, separators=(',', ':')).encode('utf-8'), version,
+                      {'Cache-Control': 'no-cache'}, 'application/json', encoded={})
+    response = page.to_response(request)
+    if last_modified is not None:
+        response.last_modified = last_modified
+        response.make_conditional(request)
+    return response
+
+
+# The whole announcements file as a versioned feed; ?since=<version> sends
+# only the entries added, changed or removed since then
+@app.route('/api/announcements')
+def api_announcements():
+    index = _announcements.get()
+    body = feed_body(index.snapshot, index.by_id, _announcements.history, request.args.get('since'))
+    return feed_response(body, index.snapshot.version, _announcements.last_modified)
+
+
+# Only the announcements showing at one moment, instead of the whole file;
+# also versioned, with ?since=<version> deltas
+@app.route('/api/announcements/active')
+def api_announcements_active():
+    try:
+        at = parse_at_param()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    index = _announcements.get()
+    active = index.active(at)
+    snapshot = index.active_snapshot(active)
+    _announcements.active_history.record(snapshot)
+
+    body = feed_body(snapshot, index.by_id, _announcements.active_history, request.args.get('since'))
+    body.update({
+        'at': at.isoformat(),
+        'controls': active.controls,
+        'next_change': active.next_change.isoformat() if active.next_change else None
+    })
+    return feed_response(body, snapshot.version)
+
+
+@app.route('/api/announcements/upcoming')
+def api_announcements_upcoming():
+    try:
+        at = parse_at_param()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_UPCOMING_ANNOUNCEMENTS:
+        return jsonify({'error': f'limit must be between 1 and {MAX_UPCOMING_ANNOUNCEMENTS}'}), 400
+
+    return jsonify({
+        'at': at.isoformat(),
+        'announcements': _announcements.get().upcoming(at, limit)
+    })
+
+
+# The adhkar text already split into pages, so the displays only render;
+# ?pages=N balances by length, &distribution=48,52 splits by percentage
+@app.route('/api/adhkar')
+def api_adhkar():
+    try:
+        page_count = int(request.args.get('pages', 1))
+    except ValueError:
+        page_count = 0
+    if not 1 <= page_count <= MAX_ADHKAR_PAGES:
+        return jsonify({'error': f'pages must be between 1 and {MAX_ADHKAR_PAGES}'}), 400
+    try:
+        distribution = parse_distribution(request.args.get('distribution'), page_count)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        split = _adhkar.pages(page_count, distribution)
+    except OSError:
+        return jsonify({'error': 'Adhkar text not found'}), 404
+    return feed_response({'version': split.version, 'pages': split.pages}, split.version, split.last_modified)
+
+
+# When this display should refresh within the fleet's refresh window, and
+# how it should back off retrying (see refresh_policy.py)
+@app.route('/api/refresh-policy')
+def api_refresh_policy():
+    device = request.args.get('device') or f"{request.remote_addr} {request.user_agent.string}"
+    if len(device) > MAX_DEVICE_ID_LENGTH:
+        return jsonify({'error': f'device must be at most {MAX_DEVICE_ID_LENGTH} characters'}), 400
+    response = jsonify(refresh_policy(device))
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Time to the response headers; a streamed body (/events, /api/range) isn't included
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                route=route, method=request.method, status=str(response.status_code))
+    if _metrics_files is not None:
+        _metrics_files.maybe_flush()
+    return response
+
+
+@metrics_registry.collector
+def collect_app_metrics():
+    # Read from the caches' own counters at scrape time
+    caches = {'index': _index_cache, 'prayer_grid': _grid_fragments, 'day_api': _day_api_cache, 'tenants': _tenants}
+    hijri = format_hijri_date.cache_info()
+    families = [
+        {'name': f'cache_{field}_total', 'type': 'counter', 'help': f'Cache {field} by cache',
+         'samples': [({'cache': name}, getattr(cache, field)) for name, cache in caches.items()]}
+        for field in ('hits', 'misses', 'evictions')
+    ]
+    families.append({'name': 'cache_coalesced_total', 'type': 'counter',
+                     'help': 'Misses that waited for a render or load already in progress',
+                     'samples': [({'cache': name}, cache.coalesced) for name, cache in caches.items()] +
+                                [({'cache': 'timetable'}, _timetable_loads.coalesced)]})
+    families.append({'name': 'hijri_conversions_total', 'type': 'counter',
+                     'help': 'Gregorian to Hijri conversions (memoised lookups not counted)',
+                     'samples': [({}, hijri.misses)]})
+    families.append({'name': 'hijri_cache_hits_total', 'type': 'counter',
+                     'help': 'Hijri dates answered from the memo', 'samples': [({}, hijri.hits)]})
+    rss = resident_memory_bytes()
+    if rss is not None:
+        families.append({'name': 'process_resident_memory_bytes', 'type': 'gauge',
+                         'help': 'Resident memory of the worker', 'samples': [({}, rss)]})
+    return families
+
+
+# Prometheus text format; merged across workers when METRICS_DIR is set
+@app.route('/metrics')
+def metrics():
+    body = _metrics_files.render() if _metrics_files is not None else metrics_registry.render()
+    return Response(body, content_type=METRICS_CONTENT_TYPE)
+
+
+def file_version(path):
+    # Modification time, or None if the file is missing
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def server_time_event():
+    now = datetime.now(timezone.utc)
+    return {
+        'utc_ms': int(now.timestamp() * 1000),
+        'irish_offset': 1 if is_ireland_dst(now) else 0,
+        'page_build': page_build()
+    }
+
+
+def reload_timetable(_):
+    # The CSV changed on disk: drop everything built from it and reload
+    reset_caches()
+    return {'version': get_timetable().version}
+
+
+def build_event_watcher():
+    watcher = Watcher(event_broker)
+    watcher.watch('day', lambda: get_irish_time().date().isoformat(), lambda value: {'date': value})
+    watcher.watch('timetable', lambda: file_version(PRAYER_TIMES_CSV), reload_timetable)
+    watcher.watch('announcements', lambda: file_version(ANNOUNCEMENTS_JSON))
+    # Only useful live; kept out of the replay history (see events.py)
+    watcher.every('time', TIME_SYNC_SECONDS, server_time_event, replay=False)
+    return watcher
+
+
+def start_event_watcher():
+    # One watcher thread per worker process serves every /events connection
+    global _event_watcher
+    if _event_watcher is None:
+        _event_watcher = build_event_watcher()
+    _event_watcher.start()
+
+
+def initial_events():
+    # Let a (re)connecting display sync its clock straight away
+    return [format_event(event_broker.last_id, 'time', server_time_event())]
+
+
+# Server-Sent Events stream the display screens listen on instead of polling
+@app.route('/events')
+def events():
+    start_event_watcher()
 
-    # Calculate important times
-    important_times = calculate_important_times(today_prayer_times)
-    tomorrow_important_times = calculate_important_times(tomorrow_prayer_times)
+    response = Response(event_broker.stream(request.headers.get('Last-Event-ID'), initial_events),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
 
-    return render_template('index.html',
-                         current_time=irish_time.strftime('%H:%M:%S'),
-                         current_date=irish_time.strftime('%a %d %b %Y'),
-                         islamic_date=get_islamic_date(irish_time.date()),
-                         today_prayer_times=today_prayer_times,
-                         tomorrow_prayer_times=tomorrow_prayer_times,
-                         important_times=important_times,
-                         tomorrow_important_times=tomorrow_important_times)
 
 if __name__ == '__main__':
+    _assets.auto_reload = True  # rebuild the bundles when a JS/CSS file is edited
     app.run(debug=True)
@@ -0,0 +1,290 @@
+"""
+ASYNC (ASGI) SERVING MODE
+=========================
+
+Runs the prayer times app under an asyncio server so one process on one
+core can hold thousands of display screens on `/events` at once. The
+timetable, templates and caches are the Flask app's own: every URL except
+`/events` is passed straight to `app.app`.
+
+HOW TO USE:
+-----------
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+or in the Procfile, instead of gunicorn:
+
+    web: uvicorn asgi:application --host 0.0.0.0 --port $PORT
+
+`benchmarks/load_idle_connections.py` opens thousands of idle `/events`
+connections against this server and reports memory per connection.
+
+HOW IT WORKS:
+-------------
+- `/events` runs on the event loop. Each connection is one coroutine
+  waiting on an asyncio.Event shared by every connection. A publish from
+  the watcher thread wakes them all, and a single timer wakes them for
+  keep-alives, so there is no thread or timer per connection.
+- Everything else is a normal WSGI call into Flask on a small thread
+  pool, so a slow request (e.g. a long /api/range export) never blocks
+  the event loop.
+
+IMPORTANT NOTES:
+---------------
+- At most `MAX_EVENT_CONNECTIONS` streams are accepted per process;
+  further ones get a 503 and those displays fall back to polling.
+- The event log, Last-Event-ID replay and the watcher thread are the same
+  as in WSGI mode (see events.py).
+"""
+
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app, event_broker, initial_events, start_event_watcher
+from events import KEEPALIVE, RETRY_MS
+
+
+# Upper bound on open /events streams per process (memory stays bounded)
+MAX_EVENT_CONNECTIONS = 10000
+
+# Threads running ordinary Flask requests
+WSGI_THREADS = 8
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no')
+]
+
+_executor = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix='wsgi')
+_waker = None
+
+
+class EventWaker:
+    """Wakes every /events coroutine on one event loop
+
+    Connections wait on a shared asyncio.Event that is swapped for a fresh
+    one each time it fires: when the broker publishes (from any thread)
+    and every `keepalive` seconds.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, keepalive: float):
+        self.loop = loop
+        self._keepalive = keepalive
+        self._event = asyncio.Event()
+        self._timer = loop.call_later(keepalive, self._tick)
+
+    def _tick(self):
+        self.wake()
+        self._timer = self.loop.call_later(self._keepalive, self._tick)
+
+    def wake(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    def wake_threadsafe(self):
+        # Called by EventBroker.publish on the publishing thread
+        try:
+            self.loop.call_soon_threadsafe(self.wake)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def close(self):
+        self._timer.cancel()
+
+    @property
+    def event(self) -> asyncio.Event:
+        """The event the next wake-up will set"""
+        return self._event
+
+
+def get_waker() -> EventWaker:
+    # One waker per event loop, registered with the broker once
+    global _waker
+    loop = asyncio.get_running_loop()
+    if _waker is None or _waker.loop is not loop:
+        if _waker is not None:
+            event_broker.remove_listener(_waker.wake_threadsafe)
+            _waker.close()
+        _waker = EventWaker(loop, event_broker.keepalive)
+        event_broker.add_listener(_waker.wake_threadsafe)
+    return _waker
+
+
+def get_header(scope, name: bytes):
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def send_text(send, status, text, content_type=b'text/plain; charset=utf-8'):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', content_type)]})
+    await send({'type': 'http.response.body', 'body': text.encode('utf-8')})
+
+
+async def cancel_on_disconnect(receive, task):
+    # The server only tells us a client went away through receive()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            task.cancel()
+            return
+
+
+async def serve_events(scope, receive, send):
+    """The /events Server-Sent Events stream, on the event loop"""
+    if event_broker.connections >= MAX_EVENT_CONNECTIONS:
+        await send_text(send, 503, 'Too many display connections')
+        return
+
+    start_event_watcher()
+    waker = get_waker()
+    last_seen = event_broker.connect(get_header(scope, b'last-event-id'))
+    joined = event_broker.last_id
+    disconnect_watch = asyncio.ensure_future(cancel_on_disconnect(receive, asyncio.current_task()))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+        opening = f"retry: {RETRY_MS}\n\n" + ''.join(initial_events())
+        await send({'type': 'http.response.body', 'body': opening.encode('utf-8'), 'more_body': True})
+        woken_up = False
+        while True:
+            # Take the event before reading the log so a publish made
+            # while we are sending is never missed
+            wake = waker.event
+            pending, last_seen = event_broker.since(last_seen, joined)
+            if pending:
+                await send({'type': 'http.response.body', 'body': ''.join(pending).encode('utf-8'), 'more_body': True})
+            elif woken_up:
+                await send({'type': 'http.response.body', 'body': KEEPALIVE.encode('utf-8'), 'more_body': True})
+            await wake.wait()
+            woken_up = True
+    except asyncio.CancelledError:
+        pass  # client went away
+    finally:
+        disconnect_watch.cancel()
+        event_broker.disconnect()
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key in environ:
+            # Repeated headers are joined as one; cookies with '; ' like other servers do
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+def run_wsgi(environ, send, disconnected):
+    """Run one Flask request on a pool thread, sending each chunk as it is produced"""
+    response_start = {}
+
+    def start_response(status, headers, exc_info=None):
+        response_start.update({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        })
+
+    result = flask_app(environ, start_response)
+    started = False
+    try:
+        for chunk in result:
+            if not chunk:
+                continue
+            if not started:
+                send(response_start)
+                started = True
+            send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if disconnected.is_set():
+                return  # stop generating a stream nobody is reading
+        if not started:
+            send(response_start)
+        send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+
+async def flag_disconnect(receive, disconnected):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            disconnected.set()
+            return
+
+
+async def serve_wsgi(scope, receive, send):
+    """Hand a request to the Flask app on the thread pool"""
+    body = io.BytesIO()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+
+    loop = asyncio.get_running_loop()
+
+    def send_from_thread(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    disconnected = threading.Event()
+    disconnect_watch = asyncio.ensure_future(flag_disconnect(receive, disconnected))
+    try:
+        await loop.run_in_executor(_executor, run_wsgi, build_environ(scope, body), send_from_thread, disconnected)
+    finally:
+        disconnect_watch.cancel()
+
+
+async def serve_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await serve_lifespan(receive, send)
+    elif scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+    elif scope['path'] == '/events' and scope['method'] == 'GET':
+        await serve_events(scope, receive, send)
+    else:
+        await serve_wsgi(scope, receive, send)
@@ -0,0 +1,228 @@
+"""
+STATIC ASSET BUNDLES
+====================
+
+Concatenates and minifies the display's JavaScript (in load order) and
+CSS into one file each, fingerprinted with a content hash, so the page
+can serve them as `/assets/app.<hash>.js` with a year-long immutable
+Cache-Control. After the first visit a kiosk reload only fetches the HTML.
+
+HOW TO USE:
+-----------
+    bundler = AssetBundler('static')
+    bundler.filename('app.js')      # 'app.3f2a9c1b0d4e.js'
+    bundler.find('app.3f2a9c1b0d4e.js').page.to_response(request)
+
+In templates: <script src="{{ asset_url('app.js') }}"></script>
+
+IMPORTANT NOTES:
+---------------
+- Bundles are built on first use and kept in memory for the life of the
+  process; `clear()` (or `auto_reload=True`, used by `python app.py`)
+  rebuilds them after the source files change.
+- Minifying is deliberately conservative: comments, indentation and
+  blank lines are removed but line breaks are kept, so JavaScript's
+  automatic semicolon insertion behaves exactly as in the source.
+- Each bundle is also compressed once, at the highest level, when it is
+  built (see compression.py).
+- A new source file must be added to `BUNDLES` in its load order.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from compression import available_encodings, compress
+from render_cache import CachedPage
+
+
+# Bundle name -> source files under static/, in the order the page loads them
+BUNDLES = {
+    'app.js': [
+        'js/config.js',
+        'js/utils.js',
+        'js/time.js',
+        'js/prayers.js',
+        'js/announcements.js',
+        'js/themes.js',
+        'js/events.js',
+        'js/main.js'
+    ],
+    'styles.css': ['styles.css']
+}
+
+MIMETYPES = {
+    '.js': 'application/javascript',
+    '.css': 'text/css'
+}
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Characters after which a '/' starts a regular expression rather than a division
+_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^\n')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'delete', 'throw')
+
+
+class Asset(NamedTuple):
+    name: str       # bundle name, e.g. 'app.js'
+    filename: str   # fingerprinted, e.g. 'app.3f2a9c1b0d4e.js'
+    page: CachedPage
+
+
+def _starts_regex(output: List[str]) -> bool:
+    # Look back over what has been written so far for the last token
+    text = ''.join(output[-20:]).rstrip(' \t')
+    if not text:
+        return True
+    if text[-1] in _REGEX_PREFIX:
+        return True
+    for keyword in _REGEX_KEYWORDS:
+        if text.endswith(keyword):
+            before = text[:-len(keyword)][-1:]
+            if not before or not (before.isalnum() or before in '_$'):
+                return True
+    return False
+
+
+def _strip_js_comments(source: str) -> str:
+    output = []
+    i = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+        following = source[i + 1] if i + 1 < length else ''
+        if char in '"\'`':
+            # String or template literal: copy through to the closing quote
+            end = i + 1
+            while end < length and source[end] != char:
+                if source[end] == '\\':
+                    end += 1
+                elif char != '`' and source[end] == '\n':
+                    break
+                end += 1
+            output.append(source[i:end + 1])
+            i = end + 1
+        elif char == '/' and following == '/':
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+        elif char == '/' and following == '*':
+            end = source.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            output.append(' ')
+        elif char == '/' and _starts_regex(output):
+            # Regular expression literal, including any [...] character class
+            end = i + 1
+            in_class = False
+            while end < length and source[end] != '\n':
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                elif source[end] == '/' and not in_class:
+                    break
+                end += 1
+            output.append(source[i:end + 1])
+            i = end + 1
+        else:
+            output.append(char)
+            i += 1
+    return ''.join(output)
+
+
+def minify_js(source: str) -> str:
+    """Remove comments, indentation and blank lines (line breaks are kept)"""
+    lines = (line.strip() for line in _strip_js_comments(source).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def minify_css(source: str) -> str:
+    """Remove comments, indentation and blank lines"""
+    output = []
+    i = 0
+    while True:
+        start = source.find('/*', i)
+        if start == -1:
+            output.append(source[i:])
+            break
+        output.append(source[i:start])
+        end = source.find('*/', start + 2)
+        i = len(source) if end == -1 else end + 2
+    lines = (line.strip() for line in ''.join(output).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+MINIFIERS = {
+    '.js': minify_js,
+    '.css': minify_css
+}
+
+
+class AssetBundler:
+    """Builds and holds the fingerprinted bundles in memory"""
+
+    def __init__(self, static_folder: str, bundles: Dict[str, List[str]] = BUNDLES, auto_reload: bool = False):
+        self.static_folder = static_folder
+        self.bundles = bundles
+        self.auto_reload = auto_reload
+        self._assets: Dict[str, Asset] = {}
+        self._by_filename: Dict[str, Asset] = {}
+        self._mtimes = None
+        self._lock = threading.Lock()
+
+    def _source_mtimes(self):
+        return tuple(os.stat(os.path.join(self.static_folder, path)).st_mtime_ns
+                     for paths in self.bundles.values() for path in paths)
+
+    def _build(self, name: str) -> Asset:
+        extension = os.path.splitext(name)[1]
+        parts = []
+        for path in self.bundles[name]:
+            with open(os.path.join(self.static_folder, path), 'r', encoding='utf-8') as file:
+                parts.append(MINIFIERS[extension](file.read()))
+        # ';' keeps one script's last statement from running into the next
+        body = (';\n' if extension == '.js' else '\n').join(parts).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        stem = os.path.splitext(name)[0]
+        page = CachedPage(
+            body=body,
+            etag=digest[:32],
+            headers={'Cache-Control': IMMUTABLE_CACHE_CONTROL},
+            mimetype=MIMETYPES[extension],
+            # Built once per deploy, so spend the CPU on the smallest output
+            encoded={encoding: compress(body, encoding, best=True) for encoding in available_encodings()}
+        )
+        return Asset(name, f"{stem}.{digest[:12]}{extension}", page)
+
+    def _ensure_built(self):
+        # Called with the lock held
+        if self.auto_reload and self._assets and self._source_mtimes() != self._mtimes:
+            self._assets = {}
+            self._by_filename = {}
+        if not self._assets:
+            self._mtimes = self._source_mtimes() if self.auto_reload else None
+            self._assets = {name: self._build(name) for name in self.bundles}
+            self._by_filename = {asset.filename: asset for asset in self._assets.values()}
+
+    def get(self, name: str) -> Asset:
+        with self._lock:
+            self._ensure_built()
+            return self._assets[name]
+
+    def filename(self, name: str) -> str:
+        """Fingerprinted file name for a bundle"""
+        return self.get(name).filename
+
+    def find(self, filename: str) -> Optional[Asset]:
+        """Look up a bundle by its fingerprinted file name"""
+        with self._lock:
+            self._ensure_built()
+            return self._by_filename.get(filename)
+
+    def clear(self):
+        with self._lock:
+            self._assets = {}
+            self._by_filename = {}
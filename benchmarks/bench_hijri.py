@@ -0,0 +1,66 @@
+"""
+HIJRI CONVERSION BENCHMARK
+==========================
+
+Compares the per-call cost of the old `get_islamic_date()` (convert with
+hijri_converter and rebuild the month list on every call) against the
+memoised lookup, and the cost per day of formatting a whole year.
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_hijri.py
+"""
+
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from hijri_converter import convert  # noqa: E402
+
+import hijri_calendar  # noqa: E402
+
+
+def legacy_islamic_date(today):
+    # get_islamic_date() before memoisation
+    hijri_date = convert.Gregorian(today.year, today.month, today.day).to_hijri()
+    islamic_months = [
+        "Muharram", "Safar", "Rabi-Ul-Awwal", "Rabi-Ul-Thani",
+        "J-Ul-Awwal", "J-Ul-Thani", "Rajab", "Sha'ban",
+        "Ramadan", "Shawwal", "Dhul-Qadah", "Dhul-Hijjah"
+    ]
+    return f"{hijri_date.day} {islamic_months[hijri_date.month - 1]} {hijri_date.year}"
+
+
+def report(label, seconds, number):
+    print(f"  {label:<32} {seconds / number * 1e6:10.2f} us/op")
+
+
+def main(number=20000):
+    today = date(2025, 3, 15)
+    print(f"Single date ({number} calls)")
+    report("convert every call", timeit.timeit(lambda: legacy_islamic_date(today), number=number), number)
+    hijri_calendar.format_hijri_date(today)
+    report("memoised", timeit.timeit(lambda: hijri_calendar.format_hijri_date(today), number=number), number)
+
+    start = date(2025, 1, 1)
+    days = [start + timedelta(days=i) for i in range(365)]
+    runs = 20
+    print(f"\nWhole year, per day ({runs} runs of 365 days)")
+    report("convert every day", timeit.timeit(lambda: [legacy_islamic_date(day) for day in days], number=runs), runs * 365)
+
+    def stepped():
+        hijri_calendar.clear_cache()
+        list(hijri_calendar.iter_hijri_dates(days[0], days[-1]))
+
+    report("stepped range (cold cache)", timeit.timeit(stepped, number=runs), runs * 365)
+
+
+if __name__ == '__main__':
+    main()
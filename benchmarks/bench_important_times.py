@@ -0,0 +1,50 @@
+"""
+IMPORTANT TIMES BENCHMARK
+=========================
+
+Compares working out Sehri ends / Sunrise / Noon from a row on every
+request (`calculate_important_times()`: strptime, timedelta, strftime)
+with reading the values precomputed when the timetable loads.
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_important_times.py
+"""
+
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from app import calculate_important_times  # noqa: E402
+from benchmarks.synthetic import synthetic_rows  # noqa: E402
+from timetable import Timetable  # noqa: E402
+
+
+def report(label, seconds, number):
+    print(f"  {label:<32} {seconds / number * 1e6:10.2f} us/op")
+
+
+def main(number=20000):
+    rows = synthetic_rows()
+    timetable = Timetable.from_rows(rows)
+    row = timetable.get(3, 15)
+
+    print(f"Today + tomorrow ({number} requests)")
+    report("calculate per request", timeit.timeit(
+        lambda: (calculate_important_times(row), calculate_important_times(row)), number=number), number)
+    report("precomputed lookup", timeit.timeit(
+        lambda: (timetable.derived_times(3, 15), timetable.derived_times(3, 16)), number=number), number)
+
+    runs = 50
+    print(f"\nDeriving a whole year at load time ({runs} runs)")
+    report("Timetable.from_rows", timeit.timeit(lambda: Timetable.from_rows(rows), number=runs), runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+INDEX REQUEST BENCHMARK
+=======================
+
+Compares the per-request cost of the `/` route when the timetable is
+re-read from `data/prayer_times.csv` on every hit (the old behaviour)
+against the shared in-memory (month, day) timetable.
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_index.py
+
+Two measurements are printed for each mode:
+- lookup:  finding today's and tomorrow's rows only
+- request: a full `GET /` through Flask's test client
+"""
+
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import app as app_module  # noqa: E402
+
+
+def legacy_lookup(today, tomorrow):
+    # What index() used to do: read the CSV and scan it twice
+    prayer_times = app_module.load_prayer_times()
+    today_row = next((row for row in prayer_times if int(row[0]) == today.month and int(row[1]) == today.day), None)
+    tomorrow_row = next((row for row in prayer_times if int(row[0]) == tomorrow.month and int(row[1]) == tomorrow.day), None)
+    return today_row, tomorrow_row
+
+
+def indexed_lookup(today, tomorrow):
+    timetable = app_module.get_timetable()
+    return timetable.for_date(today), timetable.for_date(tomorrow)
+
+
+def report(label, seconds, number):
+    print(f"  {label:<28} {seconds / number * 1e6:10.1f} us/op")
+
+
+def main(number=2000):
+    # Use the last row of the CSV so the old linear scan is at its worst
+    last = app_module.load_prayer_times()[-1]
+    today = date(2025, int(last[0]), int(last[1]))
+    tomorrow = today + timedelta(days=1)
+
+    print(f"Lookup of {today:%d %b} and {tomorrow:%d %b} ({number} runs)")
+    report("re-read CSV + scan", timeit.timeit(lambda: legacy_lookup(today, tomorrow), number=number), number)
+    app_module.get_timetable()
+    report("in-memory timetable", timeit.timeit(lambda: indexed_lookup(today, tomorrow), number=number), number)
+
+    client = app_module.app.test_client()
+    requests = max(number // 10, 50)
+
+    def cold_request():
+        app_module.reset_caches()
+        client.get('/')
+
+    print(f"\nFull GET / ({requests} runs)")
+    report("reload timetable per request", timeit.timeit(cold_request, number=requests), requests)
+    client.get('/')
+    report("shared timetable", timeit.timeit(lambda: client.get('/'), number=requests), requests)
+
+
+if __name__ == '__main__':
+    main()
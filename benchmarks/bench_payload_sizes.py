@@ -0,0 +1,68 @@
+"""
+PAYLOAD SIZE BENCHMARK
+======================
+
+Reports the bytes a display downloads for each response, as sent to a
+client that accepts nothing, gzip, or gzip and Brotli.
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_payload_sizes.py
+
+IMPORTANT NOTES:
+---------------
+- The Brotli column is only filled in when the `brotli` package is
+  installed.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import app as app_module  # noqa: E402
+from compression import available_encodings  # noqa: E402
+
+
+ACCEPT = [('identity', ''), ('gzip', 'gzip'), ('br', 'gzip, br')]
+
+
+def main():
+    client = app_module.app.test_client()
+    with app_module.app.test_request_context():
+        urls = [
+            '/',
+            '/api/day',
+            app_module.asset_url('app.js'),
+            app_module.asset_url('styles.css'),
+            '/static/data/announcements.json',
+            '/static/data/adhkar.txt',
+            '/static/fonts/ds_digital/DS-DIGI.TTF'
+        ]
+
+    print(f"{'URL':45} {'plain':>9} {'gzip':>9} {'br':>9}")
+    totals = dict.fromkeys(name for name, _ in ACCEPT)
+    for url in urls:
+        sizes = []
+        for name, header in ACCEPT:
+            if name == 'br' and 'br' not in available_encodings():
+                sizes.append('n/a')
+                continue
+            response = client.get(url, headers={'Accept-Encoding': header})
+            assert response.status_code == 200, (url, response.status_code)
+            size = len(response.data)
+            response.close()
+            totals[name] = (totals[name] or 0) + size
+            sizes.append(f"{size / 1024:.1f} KB")
+        print(f"{url[:45]:45} {sizes[0]:>9} {sizes[1]:>9} {sizes[2]:>9}")
+
+    print(f"{'total':45} " + ' '.join(
+        f"{totals[name] / 1024:.1f} KB".rjust(9) if totals[name] else 'n/a'.rjust(9) for name, _ in ACCEPT))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+RANGE EXPORT BENCHMARK
+======================
+
+Streams a synthetic 10-year date range through `/api/range` and reports
+throughput and peak Python memory, next to building the same export as
+one in-memory JSON document for comparison.
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_range_export.py [years]
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import app as app_module  # noqa: E402
+from benchmarks.synthetic import synthetic_rows  # noqa: E402
+from timetable import Timetable  # noqa: E402
+from timetable_export import iter_days  # noqa: E402
+
+
+def measure(label, func):
+    # Time without tracemalloc (it slows allocation down a lot), then measure memory
+    started = time.perf_counter()
+    rows, size = func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<22} {rows:7d} rows {size / 1e6:7.2f} MB {elapsed * 1000:8.1f} ms "
+          f"{rows / elapsed:10.0f} rows/s  peak {peak / 1024:8.1f} KB")
+
+
+def main(years=10):
+    timetable = Timetable.from_rows(synthetic_rows())
+    app_module._timetable = timetable
+    client = app_module.app.test_client()
+    start, end = date(2025, 1, 1), date(2025 + years - 1, 12, 31)
+    query = f'/api/range?from={start}&to={end}'
+
+    def streamed(export_format):
+        def run():
+            response = client.get(f'{query}&format={export_format}', buffered=False)
+            rows = size = 0
+            for chunk in response.response:
+                size += len(chunk)
+                rows += chunk.count(b'\n')
+            response.close()
+            return rows, size
+        return run
+
+    def materialised():
+        # A non-streaming implementation would build the whole document first
+        document = json.dumps([
+            {
+                'date': day.isoformat(),
+                'beginning': row.beginning_times(),
+                'jamaah': row.jamaah_times(),
+                'important': app_module.calculate_important_times(row)
+            }
+            for day, row in iter_days(timetable, start, end)
+        ])
+        return document.count('"date"'), len(document)
+
+    print(f"Exporting {start} to {end} ({years} years)")
+    measure("streamed NDJSON", streamed('ndjson'))
+    measure("streamed CSV", streamed('csv'))
+    measure("materialised JSON", materialised)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,75 @@
+"""
+TEMPLATE RENDERING BENCHMARK
+============================
+
+Measures what the Jinja bytecode cache and the prayer grid fragment
+cache save when the index page has to be rendered (a new day, a new
+timetable, or another mosque's page).
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_templates.py
+
+Two measurements are printed:
+- load:   compiling index.html and _prayer_grid.html in a fresh worker,
+          from source and from the on-disk bytecode cache
+- render: render_index() with the grid rendered every time, and with
+          the grid taken from the fragment cache
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+
+from jinja2 import Environment, FileSystemBytecodeCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import app as app_module  # noqa: E402
+
+TEMPLATES = ('index.html', '_prayer_grid.html')
+
+
+def report(label, seconds, number):
+    print(f"  {label:<28} {seconds / number * 1e6:10.1f} us/op")
+
+
+def load_templates(bytecode_cache):
+    # A new environment is what a newly started worker has
+    environment = Environment(loader=app_module.app.jinja_env.loader, bytecode_cache=bytecode_cache)
+    for name in TEMPLATES:
+        environment.get_template(name)
+
+
+def main(number=200):
+    print(f"Template load in a new worker ({number} runs)")
+    report("compile from source", timeit.timeit(lambda: load_templates(None), number=number), number)
+    with tempfile.TemporaryDirectory() as directory:
+        bytecode_cache = FileSystemBytecodeCache(directory)
+        load_templates(bytecode_cache)
+        report("bytecode cache", timeit.timeit(lambda: load_templates(bytecode_cache), number=number), number)
+
+    timetable = app_module.get_timetable()
+    irish_time = app_module.get_irish_time()
+    renders = number * 5
+
+    def render_without_fragments():
+        app_module._grid_fragments.clear()
+        app_module.render_index(timetable, irish_time)
+
+    with app_module.app.test_request_context('/'):
+        app_module.render_index(timetable, irish_time)
+        print(f"\nrender_index ({renders} runs)")
+        report("grid rendered every time", timeit.timeit(render_without_fragments, number=renders), renders)
+        app_module.render_index(timetable, irish_time)
+        report("grid from fragment cache",
+               timeit.timeit(lambda: app_module.render_index(timetable, irish_time), number=renders), renders)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+MULTI-MOSQUE BENCHMARK
+======================
+
+Serves 1,000 synthetic mosques from one process and reports:
+
+- cold load cost per mosque and memory per cached timetable,
+- cache hit cost once loaded,
+- hit rate and evictions when only part of the mosques fit in the cache
+  (popular mosques are asked for far more often than the rest),
+- that a slow load for one mosque does not delay the others,
+- /api/<mosque_id>/day throughput through the Flask app.
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_tenants.py
+    py benchmarks/bench_tenants.py --tenants 5000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import app as app_module  # noqa: E402
+from benchmarks.synthetic import write_fleet  # noqa: E402
+from tenants import TimetableStore, tenant_csv_path  # noqa: E402
+from timetable import Timetable  # noqa: E402
+
+
+def tenant_loader(data_dir):
+    return lambda key: Timetable.from_csv(tenant_csv_path(data_dir, key))
+
+
+def cold_and_warm(data_dir, ids):
+    store = TimetableStore(tenant_loader(data_dir), max_bytes=1 << 40)
+    started = time.perf_counter()
+    for key in ids:
+        store.get(key)
+    cold = time.perf_counter() - started
+    print(f"Cold load: {len(ids)} mosques in {cold:.2f}s ({cold / len(ids) * 1000:.2f} ms each)")
+
+    # Separate pass: tracemalloc slows loading down a lot
+    sample = ids[:100]
+    traced_store = TimetableStore(tenant_loader(data_dir), max_bytes=1 << 40)
+    tracemalloc.start()
+    for key in sample:
+        traced_store.get(key)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Memory: {store.memory_size() / 1024:.0f} KB accounted for {len(ids)} mosques "
+          f"({store.memory_size() / len(ids) / 1024:.1f} KB each); "
+          f"tracemalloc sees {traced / len(sample) / 1024:.1f} KB each")
+
+    number = 200000
+    seconds = timeit.timeit(lambda: store.get(ids[123]), number=number)
+    print(f"Cache hit: {seconds / number * 1e6:.2f} us")
+
+
+def zipf_ids(ids, requests, seed=1):
+    # Mosque n is asked for about 1/n as often as mosque 1
+    weights = [1 / (rank + 1) for rank in range(len(ids))]
+    return random.Random(seed).choices(ids, weights=weights, k=requests)
+
+
+def bounded_cache(data_dir, ids, fraction=0.1, requests=50000):
+    per_mosque = Timetable.from_csv(tenant_csv_path(data_dir, ids[0])).memory_size()
+    max_bytes = int(per_mosque * len(ids) * fraction)
+    store = TimetableStore(tenant_loader(data_dir), max_bytes=max_bytes)
+
+    started = time.perf_counter()
+    for key in zipf_ids(ids, requests):
+        store.get(key)
+    elapsed = time.perf_counter() - started
+
+    print(f"\nBounded cache ({max_bytes / 1024:.0f} KB, about {fraction:.0%} of mosques), {requests} skewed requests")
+    print(f"  hit rate {store.hits / (store.hits + store.misses):.1%}, {store.evictions} evictions, "
+          f"{len(store)} cached, {store.memory_size() / 1024:.0f} KB used, "
+          f"{elapsed / requests * 1e6:.1f} us per request")
+
+
+def slow_tenant_isolation(data_dir, ids, delay=0.5):
+    release = threading.Event()
+
+    def loader(key):
+        if key == 'slow-mosque':
+            release.wait(delay)
+            key = ids[0]
+        return Timetable.from_csv(tenant_csv_path(data_dir, key))
+
+    store = TimetableStore(loader, max_bytes=1 << 40)
+    for key in ids[:100]:
+        store.get(key)
+
+    slow = threading.Thread(target=store.get, args=('slow-mosque',))
+    slow.start()
+    time.sleep(0.01)
+    worst = 0.0
+    requests = 0
+    while slow.is_alive() and requests < 200000:
+        started = time.perf_counter()
+        store.get(ids[requests % 100])
+        worst = max(worst, time.perf_counter() - started)
+        requests += 1
+    release.set()
+    slow.join()
+
+    print(f"\nWhile one mosque took {delay * 1000:.0f} ms to load, {requests} requests for other "
+          f"mosques were served; slowest took {worst * 1e6:.0f} us")
+
+
+def http_requests(data_dir, ids, requests=5000):
+    app_module.DATA_DIR = data_dir
+    app_module.reset_caches()
+    client = app_module.app.test_client()
+    keys = zipf_ids(ids, requests, seed=2)
+
+    started = time.perf_counter()
+    for key in keys:
+        response = client.get(f'/api/{key}/day?date=2025-03-15')
+        assert response.status_code == 200, response.data
+    elapsed = time.perf_counter() - started
+
+    print(f"\nHTTP /api/<mosque_id>/day: {requests} requests over {len(set(keys))} mosques in "
+          f"{elapsed:.2f}s ({requests / elapsed:.0f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-mosque timetable benchmark')
+    parser.add_argument('--tenants', type=int, default=1000)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='prayer-tenants-')
+    try:
+        print(f"Writing {args.tenants} synthetic mosques to {data_dir}\n")
+        ids = write_fleet(data_dir, args.tenants)
+
+        cold_and_warm(data_dir, ids)
+        bounded_cache(data_dir, ids)
+        slow_tenant_isolation(data_dir, ids)
+        http_requests(data_dir, ids)
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+TIMETABLE MEMORY BENCHMARK
+==========================
+
+Compares the memory held by the timetable as CSV string rows (what
+`load_prayer_times()` returns), as csv.DictReader dicts (what the
+validator keeps), as the columnar minutes-since-midnight Timetable and
+as a compiled file mapped with mmap (compiled_timetable.py), whose pages
+are shared by every worker instead of counted in each one.
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/bench_timetable_memory.py [years]
+"""
+
+import csv
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from benchmarks.synthetic import synthetic_rows, write_csv  # noqa: E402
+from compiled_timetable import MappedTimetable, compile_timetable  # noqa: E402
+from timetable import CSV_HEADER, Timetable  # noqa: E402
+
+
+def traced(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main(copies=10):
+    # Many mosques/years per worker: hold several independent copies
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(CSV_HEADER)
+    writer.writerows(synthetic_rows())
+    source = text.getvalue()
+
+    def as_rows():
+        return [list(csv.reader(io.StringIO(source)))[1:] for _ in range(copies)]
+
+    def as_dicts():
+        return [list(csv.DictReader(io.StringIO(source))) for _ in range(copies)]
+
+    def as_columns():
+        return [Timetable.from_rows(list(csv.reader(io.StringIO(source)))[1:]) for _ in range(copies)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'prayer_times.csv')
+        write_csv(csv_path, synthetic_rows())
+        compiled = compile_timetable(csv_path)
+
+        def as_mapped():
+            return [MappedTimetable(compiled) for _ in range(copies)]
+
+        print(f"{copies} copies of a 366-day timetable")
+        _, rows_size = traced(as_rows)
+        _, dicts_size = traced(as_dicts)
+        timetables, columns_size = traced(as_columns)
+        mapped, mapped_size = traced(as_mapped)
+        for label, size in [("CSV string rows", rows_size), ("DictReader dicts", dicts_size),
+                            ("columnar Timetable", columns_size), ("mapped compiled file", mapped_size)]:
+            print(f"  {label:<20} {size / 1024:9.1f} KB  ({size / copies / 1024:7.1f} KB each)")
+        print(f"  compiled file is {os.path.getsize(compiled) / 1024:.1f} KB on disk; its pages are shared by "
+              f"every process through the page cache")
+        del mapped
+    print(f"  Timetable.memory_size() reports {timetables[0].memory_size() / 1024:.1f} KB each")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,197 @@
+"""
+IDLE DISPLAY CONNECTIONS LOAD TEST
+==================================
+
+Starts the asyncio server (`uvicorn asgi:application`, one process pinned
+to one core where the OS allows it), opens thousands of idle `/events`
+connections like display screens do, and reports:
+
+- how many connections are held open,
+- the server's memory before and after, and per connection,
+- how long a normal `/api/day` request takes while they are open,
+- how long one pushed event takes to reach every connection.
+
+HOW TO USE:
+-----------
+Run from the repository root (needs uvicorn, see requirements.txt):
+
+    py benchmarks/load_idle_connections.py
+    py benchmarks/load_idle_connections.py --connections 5000
+
+IMPORTANT NOTES:
+---------------
+- Server memory is read from /proc, so it is only reported on Linux.
+- The broadcast check touches static/data/announcements.json (mtime only)
+  so the server's watcher publishes an `announcements` event.
+- Each connection needs a file descriptor on both sides; the open-file
+  limit is raised to its hard limit first where the OS allows it.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+ANNOUNCEMENTS_JSON = os.path.join('static', 'data', 'announcements.json')
+
+
+def raise_file_limit():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def pin_to_one_core():
+    # Runs in the server process before uvicorn starts
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+
+def rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+async def http_get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+async def wait_until_ready(port, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await http_get(port, '/api/day')).startswith(b'HTTP/1.1 200'):
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+async def open_display(port):
+    # Open one /events stream and wait for the opening chunk
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+    await writer.drain()
+    received = b''
+    while b'retry:' not in received:
+        chunk = await reader.read(4096)
+        if not chunk:
+            raise ConnectionError('stream closed')
+        received += chunk
+    return reader, writer
+
+
+async def wait_for_event(reader, name):
+    received = b''
+    while f'event: {name}'.encode() not in received:
+        chunk = await reader.read(4096)
+        if not chunk:
+            raise ConnectionError('stream closed')
+        received += chunk
+
+
+async def load_test(server, port, connections, batch):
+    await wait_until_ready(port)
+    # Warm up the page caches and one stream so start-up memory is not counted
+    await http_get(port, '/')
+    warm = await open_display(port)
+    await asyncio.sleep(0.5)
+    before = rss_kb(server.pid)
+
+    displays = []
+    failed = 0
+    started = time.perf_counter()
+    for offset in range(0, connections, batch):
+        results = await asyncio.gather(
+            *[open_display(port) for _ in range(min(batch, connections - offset))],
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                failed += 1
+            else:
+                displays.append(result)
+    open_seconds = time.perf_counter() - started
+    await asyncio.sleep(1)
+    after = rss_kb(server.pid)
+
+    print(f"Open /events connections: {len(displays)} (failed: {failed}) in {open_seconds:.1f}s")
+    if before is not None and after is not None:
+        per_connection = (after - before) / max(len(displays), 1)
+        print(f"Server RSS: {before / 1024:.1f} MB -> {after / 1024:.1f} MB "
+              f"({per_connection:.1f} KB per connection)")
+    else:
+        print("Server RSS: n/a (needs /proc)")
+
+    latencies = []
+    for _ in range(20):
+        request_started = time.perf_counter()
+        response = await http_get(port, '/api/day')
+        latencies.append(time.perf_counter() - request_started)
+        assert response.startswith(b'HTTP/1.1 200'), response[:80]
+    latencies.sort()
+    print(f"/api/day with all connections open: median {latencies[10] * 1000:.1f} ms, "
+          f"max {latencies[-1] * 1000:.1f} ms")
+
+    # Touch announcements.json so the watcher pushes an event to everyone
+    broadcast_started = time.perf_counter()
+    os.utime(ANNOUNCEMENTS_JSON)
+    results = await asyncio.gather(
+        *[asyncio.wait_for(wait_for_event(reader, 'announcements'), 30) for reader, _ in displays],
+        return_exceptions=True
+    )
+    delivered = sum(1 for result in results if not isinstance(result, BaseException))
+    print(f"Broadcast 'announcements' reached {delivered}/{len(displays)} connections "
+          f"in {time.perf_counter() - broadcast_started:.1f}s (watcher polls every 2s)")
+
+    for _, writer in displays + [warm]:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--connections', type=int, default=3000)
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--batch', type=int, default=250, help='connections opened at a time')
+    args = parser.parse_args()
+
+    limit = raise_file_limit()
+    if limit is not None and limit < 2 * args.connections + 100:
+        print(f"Open-file limit is {limit}; expect failures above {(limit - 100) // 2} connections")
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(args.port),
+         '--log-level', 'warning', '--no-access-log', '--backlog', '4096'],
+        preexec_fn=pin_to_one_core if os.name == 'posix' else None
+    )
+    try:
+        asyncio.run(load_test(server, args.port, args.connections, args.batch))
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,462 @@
+"""
+KIOSK FLEET LOAD TEST
+=====================
+
+Starts the app the way the Procfile does (gunicorn, gthread workers) or
+under uvicorn, and replays the requests N display screens make on the
+schedule in static/js, then reports latency, errors and how busy the
+server's workers were.
+
+What each simulated display does (as main.js, time.js and
+announcements.js do with the /events stream down, which is when every
+screen falls back to its timers - e.g. after an outage):
+
+- loads the page, its CSS/JS bundles, /api/refresh-policy and
+  /api/announcements/active once it is switched on,
+- ticks every second on its own clock (a little off the real time) and,
+  in seconds 0-2 of a refresh minute, calls persistentRefresh(): after
+  its offset in the refresh window, a GET of the day data, retried with
+  the policy's backoff until it succeeds; calls while one is pending are
+  ignored. Refresh minutes are 00:00, 03:30, 12:30, 14:12, 16:30, 17:30,
+  19:45, 21:15, 30 minutes before each jamaah (Jumu'ah included) and
+  every 5 minutes from 13:48 to 15:45 on Fridays,
+- fetches /api/announcements/active?since=<version> every hour.
+
+With --legacy-client the displays refresh as they did before the refresh
+policy: at once, on each of seconds 0-2, retrying every 30 s.
+
+The 30 s clock resync only redraws the clock, so like the 1 s tick it
+makes no request; both only decide when the requests above happen.
+
+HOW TO USE:
+-----------
+Run from the repository root (needs gunicorn or uvicorn, see
+requirements.txt):
+
+    py benchmarks/load_kiosk_fleet.py                       # 500 displays, gunicorn 2x200 threads
+    py benchmarks/load_kiosk_fleet.py --displays 2000 --workers 4
+    py benchmarks/load_kiosk_fleet.py --server uvicorn
+    py benchmarks/load_kiosk_fleet.py --legacy-client               # without jitter and backoff
+    py benchmarks/load_kiosk_fleet.py --url http://127.0.0.1:5000 --capacity 400
+
+By default the simulated clock starts 20 seconds before the next refresh
+minute and runs for 3 minutes (long enough for the 2 minute refresh
+window), with every display switched on in the first 10 seconds. Use
+--start HH:MM:SS and --duration to replay another part of the day, and
+--speed to run the clock faster than real time (the same requests then
+arrive `speed` times closer together).
+
+IMPORTANT NOTES:
+---------------
+- Latency is measured by the client, so it includes time spent waiting
+  for a free worker. Worker saturation is reported two ways: requests in
+  flight against the server's capacity (workers x threads), and the
+  server's own busy time from /metrics.
+- Each request opens a new connection (browsers would keep one open), so
+  the figures are slightly pessimistic.
+- Keep the load generator and the server on different cores for
+  realistic numbers; at a few thousand displays the event loop of this
+  script becomes the bottleneck.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import irish_time  # noqa: E402
+from benchmarks.load_idle_connections import raise_file_limit  # noqa: E402
+
+# Fixed refresh minutes in main.js
+FIXED_REFRESHES = [(0, 0), (3, 30), (12, 30), (14, 12), (16, 30), (17, 30), (19, 45), (21, 15)]
+
+# How often the displays do things, in seconds of the display's clock
+TICK_SECONDS = 1
+LEGACY_RETRY_SECONDS = 30
+ANNOUNCEMENTS_SECONDS = 60 * 60
+
+REQUEST_TIMEOUT = 30.0
+
+ASSET_PATTERN = re.compile(r'(?:src|href)="(/(?:assets|static)/[^"]+)"')
+DURATION_SUM = re.compile(r'^http_request_duration_seconds_sum\{[^}]*\} (\S+)$', re.MULTILINE)
+
+
+def minutes_before(hhmm: str, minutes: int):
+    hours, mins = (int(part) for part in hhmm.split(':'))
+    total = (hours * 60 + mins - minutes) % (24 * 60)
+    return total // 60, total % 60
+
+
+def jumuah_time(day: date) -> str:
+    # main.js sets the Jumu'ah jamaah by Summer/Winter time on page load
+    return '13:45' if irish_time.is_dst_on(day.year, day.month, day.day) else '13:20'
+
+
+def should_refresh(local: datetime, jamaah: List[str]) -> bool:
+    """main.js's once-a-second check, for a display whose clock reads `local`"""
+    if local.second > 2:
+        return False
+    if (local.hour, local.minute) in FIXED_REFRESHES:
+        return True
+    if local.weekday() == 4:
+        minutes = local.hour * 60 + local.minute
+        if 13 * 60 + 48 <= minutes <= 15 * 60 + 45 and (minutes - (13 * 60 + 48)) % 5 == 0:
+            return True
+    return any((local.hour, local.minute) == minutes_before(time, 30) for time in jamaah)
+
+
+def next_refresh_minute(after: datetime, jamaah: List[str]) -> datetime:
+    """The first refresh minute after `after` (today, or early tomorrow)"""
+    minute = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for _ in range(24 * 60):
+        if should_refresh(minute, jamaah):
+            return minute
+        minute += timedelta(minutes=1)
+    return minute
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Clock:
+    """The simulated Irish wall clock, running `speed` times faster than real time"""
+
+    def __init__(self, start: datetime, speed: float):
+        self.start = start
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def now(self) -> float:
+        # Simulated seconds since the start
+        return (time.monotonic() - self.started) * self.speed
+
+    def at(self, offset: float) -> datetime:
+        return self.start + timedelta(seconds=offset)
+
+    async def sleep_until(self, offset: float):
+        delay = (offset - self.now()) / self.speed
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Stats:
+    """Every request's outcome, and how many were in flight at once"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started_per_second: Dict[int, int] = defaultdict(int)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated: Dict[int, bool] = {}
+
+    def begin(self, second: int):
+        # `second`: simulated seconds since the start
+        self.in_flight += 1
+        self.started_per_second[second] += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.in_flight >= self.capacity:
+            self.saturated[second] = True
+
+    def end(self, kind: str, latency: float, ok: bool):
+        self.in_flight -= 1
+        self.latencies[kind].append(latency)
+        if not ok:
+            self.errors[kind] += 1
+
+
+class Fleet:
+    def __init__(self, host: str, port: int, clock: Clock, stats: Stats, end: float, legacy: bool = False):
+        self.host = host
+        self.port = port
+        self.clock = clock
+        self.stats = stats
+        self.end = end
+        self.legacy = legacy
+        self.tasks = set()
+
+    def spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def get(self, kind: str, path: str, headers: Optional[Dict[str, str]] = None):
+        """(status, headers, body), with status 0 for a failed connection or a timeout"""
+        self.stats.begin(int(self.clock.now()))
+        started = time.perf_counter()
+        status, response_headers, body = 0, {}, b''
+        try:
+            status, response_headers, body = await asyncio.wait_for(self._get(path, headers or {}), REQUEST_TIMEOUT)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            pass
+        self.stats.end(kind, time.perf_counter() - started, 200 <= status < 400)
+        return status, response_headers, body
+
+    async def _get(self, path, headers):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}", "Connection: close"]
+            lines += [f"{name}: {value}" for name, value in headers.items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        response_headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        return int(status_line.split()[1]), response_headers, body
+
+
+class Display:
+    """One screen: switched on at `boot`, with a clock `skew` seconds off"""
+
+    def __init__(self, fleet: Fleet, page: str, day_url: str, jamaah: List[str], boot: float, skew: float,
+                 device: str, seed: int):
+        self.fleet = fleet
+        self.page = page
+        self.day_url = day_url
+        self.jamaah = jamaah
+        self.boot = boot
+        self.skew = skew
+        self.device = device
+        self.random = random.Random(seed)
+        self.announcements_version = None
+        self.refresh_policy = None
+        self.refresh_pending = False
+
+    async def run(self):
+        clock = self.fleet.clock
+        await clock.sleep_until(self.boot)
+        await self.load_page()
+        next_announcements = self.boot + ANNOUNCEMENTS_SECONDS
+        tick = self.boot + TICK_SECONDS
+        while tick < self.fleet.end:
+            await clock.sleep_until(tick)
+            if should_refresh(clock.at(tick + self.skew), self.jamaah):
+                self.fleet.spawn(self.persistent_refresh())
+            if tick >= next_announcements:
+                self.fleet.spawn(self.load_announcements())
+                next_announcements += ANNOUNCEMENTS_SECONDS
+            tick += TICK_SECONDS
+
+    async def load_page(self):
+        status, _, body = await self.fleet.get('page', self.page)
+        if status == 200:
+            for asset in dict.fromkeys(ASSET_PATTERN.findall(body.decode('utf-8', 'replace'))):
+                await self.fleet.get('asset', asset)
+        if not self.fleet.legacy:
+            status, _, body = await self.fleet.get('policy', f'/api/refresh-policy?device={self.device}')
+            if status == 200:
+                self.refresh_policy = json.loads(body)
+        await self.load_announcements()
+
+    async def load_announcements(self):
+        path = '/api/announcements/active'
+        headers = {}
+        if self.announcements_version:
+            path += f'?since={self.announcements_version}'
+            headers['If-None-Match'] = f'"{self.announcements_version}"'
+        status, _, body = await self.fleet.get('announcements', path, headers)
+        if status == 200:
+            try:
+                self.announcements_version = json.loads(body).get('version')
+            except ValueError:
+                self.announcements_version = None
+
+    async def persistent_refresh(self):
+        # time.js: wait for this display's offset, then try until a 200
+        if self.fleet.legacy:
+            await self.refresh_until_ok(lambda attempt: LEGACY_RETRY_SECONDS)
+            return
+        if self.refresh_pending:
+            return
+        self.refresh_pending = True
+        policy = self.refresh_policy or {'offset_ms': 0, 'retry': {'initial_seconds': 30, 'max_seconds': 600,
+                                                                     'multiplier': 2}}
+        try:
+            await self.fleet.clock.sleep_until(self.fleet.clock.now() + policy['offset_ms'] / 1000)
+            await self.refresh_until_ok(lambda attempt: self.retry_delay(policy['retry'], attempt))
+        finally:
+            self.refresh_pending = False
+
+    def retry_delay(self, retry: dict, attempt: int) -> float:
+        seconds = min(retry['max_seconds'], retry['initial_seconds'] * retry['multiplier'] ** attempt)
+        return seconds * (0.5 + self.random.random() / 2)
+
+    async def refresh_until_ok(self, delay):
+        attempt = 0
+        while self.fleet.clock.now() < self.fleet.end:
+            status, _, _ = await self.fleet.get('day', self.day_url)
+            if status == 200:
+                return
+            await self.fleet.clock.sleep_until(self.fleet.clock.now() + delay(attempt))
+            attempt += 1
+
+
+async def wait_until_ready(fleet: Fleet, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _, body = await fleet._get('/api/day', {})
+            if status == 200:
+                return json.loads(body)
+        except (OSError, ValueError, IndexError):
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+async def server_busy_seconds(fleet: Fleet) -> Optional[float]:
+    try:
+        status, _, body = await fleet._get('/metrics', {})
+    except (OSError, ValueError, IndexError):
+        return None
+    if status != 200:
+        return None
+    return sum(float(value) for value in DURATION_SUM.findall(body.decode('utf-8')))
+
+
+async def load_test(args, host: str, port: int, capacity: int):
+    probe = Fleet(host, port, None, None, 0)
+    day = await wait_until_ready(probe)
+    today = date.fromisoformat(day['date'])
+    jamaah = list(day['today']['jamaah'].values()) + [jumuah_time(today)]
+
+    irish_now = irish_time.utc_to_irish(datetime.now(timezone.utc)).replace(tzinfo=None)
+    if args.start:
+        start = datetime.combine(today, datetime.strptime(args.start, '%H:%M:%S').time())
+    else:
+        start = next_refresh_minute(irish_now, jamaah) - timedelta(seconds=20)
+
+    stats = Stats(capacity)
+    clock = Clock(start, args.speed)
+    fleet = Fleet(host, port, clock, stats, args.duration, args.legacy_client)
+    seeded = random.Random(args.seed)
+    displays = [
+        Display(fleet, args.page, args.day_url, jamaah,
+                boot=seeded.uniform(0, args.boot_spread), skew=seeded.uniform(-args.skew, args.skew),
+                device=f'display-{args.seed}-{number}', seed=seeded.getrandbits(32))
+        for number in range(args.displays)
+    ]
+
+    print(f"{args.displays} {'legacy ' if args.legacy_client else ''}displays from {start:%H:%M:%S} "
+          f"for {args.duration:.0f}s (speed x{args.speed:g}), capacity {capacity} concurrent requests")
+    busy_before = await server_busy_seconds(probe)
+    started = time.monotonic()
+    await asyncio.gather(*[display.run() for display in displays])
+    if fleet.tasks:
+        await asyncio.wait(list(fleet.tasks), timeout=REQUEST_TIMEOUT)
+    elapsed = time.monotonic() - started
+    busy_after = await server_busy_seconds(probe)
+
+    report(stats, start, args.duration, elapsed, capacity,
+           None if busy_before is None or busy_after is None else busy_after - busy_before)
+
+
+def report(stats: Stats, start: datetime, duration: float, elapsed: float, capacity: int, busy: Optional[float]):
+    total = sum(len(values) for values in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    print(f"\n{'requests':<15} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind in ('page', 'asset', 'policy', 'announcements', 'day'):
+        values = stats.latencies.get(kind, [])
+        if values:
+            print(f"{kind:<15} {len(values):7d} {stats.errors[kind]:7d} {percentile(values, 0.5) * 1000:9.1f} "
+                  f"{percentile(values, 0.99) * 1000:9.1f} {max(values) * 1000:9.1f}")
+    everything = [value for values in stats.latencies.values() for value in values]
+    print(f"{'all':<15} {total:7d} {errors:7d} {percentile(everything, 0.5) * 1000:9.1f} "
+          f"{percentile(everything, 0.99) * 1000:9.1f} {max(everything, default=0) * 1000:9.1f}")
+    print(f"\nError rate: {errors / max(total, 1):.2%}")
+
+    if stats.started_per_second:
+        second, count = max(stats.started_per_second.items(), key=lambda item: item[1])
+        print(f"Busiest second: {count} requests started at {start + timedelta(seconds=second):%H:%M:%S} "
+              f"(mean {total / max(duration, 1):.1f} per simulated second)")
+    print(f"Worker saturation: peak {stats.peak_in_flight} requests in flight for {capacity} threads; "
+          f"all busy in {len(stats.saturated)} of {int(duration)} simulated seconds")
+    if busy is not None:
+        print(f"Server busy time: {busy:.2f}s handling requests, "
+              f"{busy / (elapsed * capacity):.1%} of {capacity} threads over {elapsed:.0f}s")
+    else:
+        print("Server busy time: n/a (/metrics not reachable)")
+
+
+def start_server(args, port: int, metrics_dir: str):
+    environment = dict(os.environ, METRICS_DIR=metrics_dir)
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{port}', '--worker-class', 'gthread',
+                   '--workers', str(args.workers), '--threads', str(args.threads),
+                   '--backlog', '4096', '--log-level', 'warning', 'app:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port),
+                   '--log-level', 'warning', '--no-access-log', '--backlog', '4096']
+    return subprocess.Popen(command, env=environment)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a fleet of display screens against the app')
+    parser.add_argument('--displays', type=int, default=500)
+    parser.add_argument('--server', choices=['gunicorn', 'uvicorn'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=200, help='threads per gunicorn worker (as in the Procfile)')
+    parser.add_argument('--url', help='use a server that is already running instead of starting one')
+    parser.add_argument('--capacity', type=int, help='concurrent requests the server can handle (for --url)')
+    parser.add_argument('--port', type=int, default=5078)
+    parser.add_argument('--page', default='/', help='page the displays show, e.g. /m/<mosque_id>/')
+    parser.add_argument('--day-url', default='/api/day', help='day data the page refreshes from')
+    parser.add_argument('--start', help='simulated Irish time to start at, HH:MM:SS (default: '
+                                        '20s before the next refresh minute)')
+    parser.add_argument('--duration', type=float, default=180, help='simulated seconds')
+    parser.add_argument('--speed', type=float, default=1, help='simulated seconds per real second')
+    parser.add_argument('--boot-spread', type=float, default=10, help='displays switch on within this many seconds')
+    parser.add_argument('--skew', type=float, default=2, help='display clocks are up to this many seconds off')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--legacy-client', action='store_true',
+                        help='refresh as displays did before /api/refresh-policy')
+    args = parser.parse_args()
+
+    raise_file_limit()
+    if args.url:
+        parts = urlsplit(args.url)
+        capacity = args.capacity or 1
+        asyncio.run(load_test(args, parts.hostname, parts.port or 80, capacity))
+        return
+
+    if args.server == 'gunicorn':
+        capacity = args.workers * args.threads
+    else:
+        from asgi import WSGI_THREADS
+        capacity = WSGI_THREADS
+    with tempfile.TemporaryDirectory(prefix='prayer-metrics-') as metrics_dir:
+        server = start_server(args, args.port, metrics_dir)
+        try:
+            asyncio.run(load_test(args, '127.0.0.1', args.port, args.capacity or capacity))
+        finally:
+            server.terminate()
+            server.wait(10)
+
+
+if __name__ == '__main__':
+    main()
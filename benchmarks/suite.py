@@ -0,0 +1,301 @@
+"""
+BENCHMARK SUITE
+===============
+
+Times the hot paths of the app, the parser and the validator on
+synthetic data from 1 to 20 years and 1 to 1,000 mosques, and keeps
+every run in a JSON history file so a slowdown shows up as soon as the
+commit that caused it is benchmarked.
+
+What is timed (each at every size):
+- load_prayer_times:   reading the CSV (1 / 5 / 20 years of rows)
+- index:               GET / through Flask's test client - first request
+                       of a worker (CSV load, Hijri date, render), a new
+                       day (render only) and a cached page
+- tenant_index:        GET /m/<mosque_id>/ over 1 / 100 / 1,000 mosques,
+                       cold and cached
+- get_islamic_date:    a year of dates converted, and memoised
+- parse_input:         one pasted month, and every row of the file pasted
+                       as one large table
+- validate_month:      every month of a loaded file, and a whole file
+                       read and validated as the CLI does
+
+HOW TO USE:
+-----------
+Run from the repository root:
+
+    py benchmarks/suite.py                  # full run, appended to benchmarks/history.json
+    py benchmarks/suite.py --quick          # smaller sizes, for a quick check
+    py benchmarks/suite.py --no-save        # compare without recording the run
+    py benchmarks/suite.py --compare a1b2c3d --fail-on-regression
+
+Each result is compared with the last recorded run (or the newest run of
+the commit given to --compare). Anything more than --threshold (default
+25%) slower is reported as a REGRESSION.
+
+IMPORTANT NOTES:
+---------------
+- The figures are the best of several repeats, which is the least noisy
+  number on a busy machine. Compare runs from the same machine only; the
+  history file is ignored by git for that reason.
+- The CSV has no year column, so "20 years" is 20 years of rows appended
+  one after another, as a file that is never trimmed would grow.
+- The app is pointed at a temporary data directory, so no year bundle or
+  compiled timetable is used; these are the costs without pre-baking.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import app as app_module  # noqa: E402
+from benchmarks.synthetic import pasted_table, synthetic_years, write_csv, write_fleet  # noqa: E402
+from hijri_calendar import clear_cache as clear_hijri_cache  # noqa: E402
+from prayer_time_parser import PrayerTimeParser  # noqa: E402
+from prayer_time_validator import PrayerTimeValidator  # noqa: E402
+
+HISTORY_FILE = os.path.join('benchmarks', 'history.json')
+
+YEARS = (1, 5, 20)
+MOSQUES = (1, 100, 1000)
+QUICK_YEARS = (1, 5)
+QUICK_MOSQUES = (1, 10)
+
+THRESHOLD = 0.25
+
+
+def measure(call: Callable[[], object], number: int, repeat: int = 5,
+            setup: Optional[Callable[[], object]] = None) -> float:
+    """Best of `repeat` runs, in seconds per call; `setup` runs untimed before every call"""
+    best = float('inf')
+    for _ in range(repeat):
+        elapsed = 0.0
+        for _ in range(number):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            call()
+            elapsed += time.perf_counter() - started
+        best = min(best, elapsed / number)
+    return best
+
+
+class Suite:
+    """The benchmarks of one run, recorded by name"""
+
+    def __init__(self, work_dir: str, years, mosques):
+        self.work_dir = work_dir
+        self.years = years
+        self.mosques = mosques
+        self.results: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float):
+        self.results[name] = seconds
+        print(f"  {name:<44} {format_seconds(seconds):>12}")
+
+    def csv_for(self, years: int) -> str:
+        path = os.path.join(self.work_dir, f"prayer_times-{years}y.csv")
+        if not os.path.exists(path):
+            write_csv(path, synthetic_years(years))
+        return path
+
+    def use_data(self, csv_path: str, data_dir: Optional[str] = None):
+        app_module.PRAYER_TIMES_CSV = csv_path
+        app_module.DATA_DIR = data_dir or os.path.dirname(csv_path)
+        app_module._year_bundles.data_dir = app_module.DATA_DIR
+        app_module.reset_caches()
+
+    def run(self):
+        client = app_module.app.test_client()
+
+        def get(path):
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+
+        print("load_prayer_times")
+        for years in self.years:
+            self.use_data(self.csv_for(years))
+            self.record(f"load_prayer_times[years={years}]", measure(app_module.load_prayer_times, 5))
+
+        print("index request cycle")
+        for years in self.years:
+            self.use_data(self.csv_for(years))
+            self.record(f"index.first_request[years={years}]",
+                        measure(lambda: get('/'), 5, setup=app_module.reset_caches))
+            self.record(f"index.new_day[years={years}]",
+                        measure(lambda: get('/'), 20, setup=self.forget_pages))
+            get('/')
+            self.record(f"index.cached[years={years}]", measure(lambda: get('/'), 200))
+
+        print("tenant index across mosques")
+        for mosques in self.mosques:
+            data_dir = os.path.join(self.work_dir, f"fleet-{mosques}")
+            ids = write_fleet(data_dir, mosques) if not os.path.isdir(data_dir) else sorted(os.listdir(data_dir))
+            self.use_data(self.csv_for(1), data_dir)
+            paths = [f'/m/{mosque}/' for mosque in ids]
+            self.record(f"tenant_index.cold[mosques={mosques}]",
+                        measure(lambda: [get(path) for path in paths], 1, repeat=3,
+                                setup=app_module.reset_caches) / mosques)
+            self.record(f"tenant_index.cached[mosques={mosques}]",
+                        measure(lambda: [get(path) for path in paths], 1, repeat=3) / mosques)
+
+        print("get_islamic_date")
+        days = [date(2026, 1, 1) + timedelta(days=offset) for offset in range(365)]
+        self.record("get_islamic_date.convert[per day]",
+                    measure(lambda: [app_module.get_islamic_date(day) for day in days], 1,
+                            setup=clear_hijri_cache) / len(days))
+        self.record("get_islamic_date.memoised[per day]",
+                    measure(lambda: [app_module.get_islamic_date(day) for day in days], 20) / len(days))
+
+        print("PrayerTimeParser.parse_input")
+        parser = PrayerTimeParser()
+        month = pasted_table(synthetic_years(1)[:31], 1)
+        self.record("parse_input[month]", measure(lambda: parser.parse_input(month), 200))
+        for years in self.years:
+            table = pasted_table(synthetic_years(years), 1)
+            self.record(f"parse_input[years={years}]", measure(lambda: parser.parse_input(table), 3))
+
+        print("PrayerTimeValidator.validate_month")
+        for years in self.years:
+            csv_path = self.csv_for(years)
+            validator = PrayerTimeValidator(csv_path, year=2026)
+            validator.validate_month(1)
+            self.record(f"validate_month[years={years}, per month]",
+                        measure(lambda: [validator.validate_month(number) for number in range(1, 13)], 3) / 12)
+            self.record(f"validate_file[years={years}]",
+                        measure(lambda: validate_file(csv_path), 3))
+
+    def forget_pages(self):
+        # What a new Irish date does: the page and its grid are rendered again
+        app_module._index_cache.clear()
+        app_module._grid_fragments.clear()
+        app_module._day_api_cache.clear()
+
+
+def validate_file(csv_path: str):
+    validator = PrayerTimeValidator(csv_path, year=2026)
+    return [validator.validate_month(number) for number in range(1, 13)]
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def git_commit() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': bool(status.strip())}
+
+
+def load_history(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_history(path: str, history: List[dict]):
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(history, file, indent=1)
+        file.write('\n')
+    os.replace(temporary, path)
+
+
+def find_baseline(history: List[dict], commit: Optional[str]) -> Optional[dict]:
+    """The newest run of `commit` (a prefix is enough), or the newest run of all"""
+    for run in reversed(history):
+        if commit is None or (run.get('commit') or '').startswith(commit):
+            return run
+    return None
+
+
+def compare(results: Dict[str, float], baseline: dict, threshold: float) -> List[str]:
+    """Print the change against the baseline run and return the names that got slower"""
+    label = baseline.get('commit') or 'unknown commit'
+    if baseline.get('dirty'):
+        label += ' (uncommitted changes)'
+    print(f"\nCompared with {label}, {baseline['timestamp']}")
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline['results'].get(name)
+        if not before:
+            print(f"  {name:<44} {'new':>12}")
+            continue
+        change = seconds / before - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"  {name:<44} {change:+11.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the app, parser and validator and record the results')
+    parser.add_argument('--quick', action='store_true', help=f'years {QUICK_YEARS}, mosques {QUICK_MOSQUES}')
+    parser.add_argument('--history', default=HISTORY_FILE, help='JSON history file (default: %(default)s)')
+    parser.add_argument('--no-save', action='store_true', help="don't add this run to the history")
+    parser.add_argument('--compare', metavar='COMMIT', help='compare with the newest run of this commit')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='slowdown reported as a regression (default: %(default)s)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on a regression')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='prayer-bench-')
+    suite = Suite(work_dir, QUICK_YEARS if args.quick else YEARS, QUICK_MOSQUES if args.quick else MOSQUES)
+    try:
+        suite.run()
+    finally:
+        shutil.rmtree(work_dir)
+
+    history = load_history(args.history)
+    regressions = []
+    baseline = find_baseline(history, args.compare)
+    if baseline is not None:
+        regressions = compare(suite.results, baseline, args.threshold)
+    elif args.compare:
+        print(f"\nNo recorded run of {args.compare} in {args.history}")
+
+    if not args.no_save:
+        history.append(dict(git_commit(), **{
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.node(),
+            'quick': args.quick,
+            'results': suite.results
+        }))
+        save_history(args.history, history)
+        print(f"\nRecorded in {args.history} ({len(history)} runs)")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+SYNTHETIC TIMETABLE DATA
+========================
+
+Generates realistic-looking prayer timetables for benchmarks: one row for
+every day of a leap year (so 29 Feb is covered) with times that drift
+through the seasons like the real Dublin timetable.
+
+HOW TO USE:
+-----------
+    from benchmarks.synthetic import synthetic_rows, write_csv
+
+    rows = synthetic_rows()                 # list of CSV rows (strings)
+    write_csv('/tmp/prayer_times.csv', rows)
+
+    rows = synthetic_years(20)              # 20 years of rows, one after another
+    write_fleet('/tmp/data', 1000)          # /tmp/data/mosque-0000/prayer_times.csv, ...
+    text = pasted_table(rows[:31], 1)       # a month as copied from the Salah Template
+
+Passing a different `seed` shifts the times a little so many synthetic
+mosques do not all share identical data.
+"""
+
+import csv
+import math
+import os
+from datetime import date, timedelta
+from typing import List
+
+from tenants import tenant_csv_path
+from timetable import CSV_HEADER
+
+MONTH_NAMES = ['JANUARY', 'FEBRUARY', 'MARCH', 'APRIL', 'MAY', 'JUNE', 'JULY',
+               'AUGUST', 'SEPTEMBER', 'OCTOBER', 'NOVEMBER', 'DECEMBER']
+
+
+def _hhmm(minutes: float) -> str:
+    minutes = int(round(minutes)) % (24 * 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def synthetic_rows(seed: int = 0) -> List[List[str]]:
+    """Return 366 CSV rows (1 Jan - 31 Dec of a leap year)"""
+    rows = []
+    day = date(2024, 1, 1)
+    shift = seed % 7
+    while day.year == 2024:
+        # 0 at the winter solstice, 1 at the summer solstice
+        season = (1 - math.cos(2 * math.pi * (day.timetuple().tm_yday + 10) / 366)) / 2
+        fajr = 6 * 60 + 40 - season * 240 + shift
+        sunrise = 8 * 60 + 40 - season * 200 + shift
+        zohr = 12 * 60 + 35 + season * 60 + shift
+        asar = 14 * 60 + 10 + season * 240 + shift
+        magrib = 16 * 60 + 15 + season * 330 + shift
+        isha = 17 * 60 + 45 + season * 360 + shift
+        rows.append([
+            str(day.month), str(day.day),
+            _hhmm(fajr), _hhmm(sunrise), _hhmm(zohr), _hhmm(asar), _hhmm(magrib), _hhmm(isha),
+            _hhmm(fajr + 20), _hhmm(zohr + 40), _hhmm(asar + 30), _hhmm(magrib + 5), _hhmm(isha + 30)
+        ])
+        day += timedelta(days=1)
+    return rows
+
+
+def write_csv(path: str, rows: List[List[str]]):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+
+
+def synthetic_years(years: int, seed: int = 0) -> List[List[str]]:
+    """Return `years` synthetic years one after another, as a CSV that has been appended to every year"""
+    rows = []
+    for year in range(years):
+        rows.extend(synthetic_rows(seed + year))
+    return rows
+
+
+def mosque_id(number: int) -> str:
+    return f"mosque-{number:04d}"
+
+
+def write_fleet(data_dir: str, mosques: int, years: int = 1) -> List[str]:
+    """Write data/<mosque_id>/prayer_times.csv for `mosques` mosques and return their ids"""
+    ids = []
+    for number in range(mosques):
+        ids.append(mosque_id(number))
+        os.makedirs(os.path.join(data_dir, ids[-1]), exist_ok=True)
+        write_csv(tenant_csv_path(data_dir, ids[-1]), synthetic_years(years, seed=number))
+    return ids
+
+
+def _dotted(value: str) -> str:
+    # "21:37" -> "9.37", the 12-hour form the jamaat columns are typed in
+    hours, minutes = value.split(':')
+    return f"{int(hours) % 12 or 12}.{minutes}"
+
+
+def pasted_table(rows: List[List[str]], month: int) -> str:
+    """The rows as PrayerTimeParser expects them pasted from the Salah Template"""
+    lines = [
+        f"{MONTH_NAMES[month - 1]}\t\tISLAMIC \tBEGINNING TIMES\t\t\t\t\t\t\tJAMAAT TIMES\t\t\t\t",
+        "DATE\tDAY\tHIJRI\tFAJR\tSUNRISE\tZOHR\tASAR\tMAGRIB\tISHA\t\tFAJR\tZOHR\tASAR\tMAGRIB\tISHA"
+    ]
+    previous = None
+    for number, row in enumerate(rows):
+        # Unchanged jamaat times are typed as a ditto mark
+        jamaat = [_dotted(value) for value in row[8:13]]
+        if previous is None:
+            shown = jamaat
+        else:
+            shown = ['"' if value == before else value for value, before in zip(jamaat, previous)]
+        weekday = date(2024, int(row[0]), int(row[1])).strftime('%a')
+        hijri = '1 Safar' if number == 0 else str(number % 30 + 1)
+        lines.append('\t'.join([row[1], weekday, hijri] + row[2:8] + [''] + shown))
+        previous = jamaat
+    return '\n'.join(lines)
@@ -0,0 +1,223 @@
+"""
+COMPILED TIMETABLE FILES
+========================
+
+Compiles a prayer times CSV into a fixed-width binary file that workers
+`mmap` read-only. Every gunicorn worker then reads the same pages from
+the OS page cache instead of holding its own copy of the timetable, and
+lookups read the mapped bytes in place.
+
+HOW TO USE:
+-----------
+Compile before deploying (and again whenever a CSV changes):
+
+    py compiled_timetable.py                                  # data/prayer_times.csv
+    py compiled_timetable.py data/*/prayer_times.csv          # every mosque
+
+Each CSV gets a `prayer_times.bin` next to it. In code:
+
+    timetable = load_compiled('data/prayer_times.csv', rules)   # or None
+    timetable.get(3, 15).fajr_begin                             # '05:30'
+
+`MappedTimetable` is a `Timetable`, so everything that takes one
+(the app, the exporters, TimetableStore) works with it unchanged.
+
+IMPORTANT NOTES:
+---------------
+- The file stores a SHA-256 of the CSV it was compiled from, and the
+  derived time rules. `load_compiled` returns None when the CSV has
+  changed since, the rules differ or the file is missing, and the app
+  then reads the CSV as before.
+- Values are stored in the byte order of the machine that compiled the
+  file; a file from a machine with the other byte order counts as out of
+  date. Compile on (or for) the machine that serves it.
+- `memory_size()` counts the whole mapped file, so a TimetableStore
+  of compiled tenants drops (and unmaps) the least recently used ones
+  just as it does timetables read from CSV.
+- `version` is the same fingerprint the CSV-built Timetable has, so
+  cached pages and ETags don't change when switching between the two.
+
+FILE LAYOUT:
+------------
+    header    HEADER (magic, format, byte order, rows, columns, rules,
+              CSV SHA-256, version)
+    rules     RULE per derived time (name, CSV column, offset)
+    index     416 x int16, row number for month * 32 + day, -1 if none
+    months    rows x uint8
+    dates     rows x uint8
+    columns   rows x uint16 per CSV time column, then per derived time
+"""
+
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+from typing import Optional, Sequence
+
+from timetable import CSV_HEADER, DEFAULT_DERIVED_TIMES, TIME_COLUMNS, DerivedTime, Timetable
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PTTB'
+FORMAT_VERSION = 1
+
+# magic, format version, byte order (0 little, 1 big), rows, time columns,
+# derived times, SHA-256 of the source CSV, timetable version
+HEADER = struct.Struct('<4sBBHHH32s12s')
+RULE = struct.Struct('<16sHh')
+
+INDEX_SIZE = 13 * 32
+
+BYTE_ORDER = 0 if sys.byteorder == 'little' else 1
+
+
+def compiled_path(csv_path: str) -> str:
+    """data/prayer_times.csv -> data/prayer_times.bin"""
+    return os.path.splitext(csv_path)[0] + '.bin'
+
+
+def source_digest(csv_path: str) -> bytes:
+    with open(csv_path, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def compile_timetable(csv_path: str, output_path: Optional[str] = None,
+                      rules: Sequence[DerivedTime] = DEFAULT_DERIVED_TIMES) -> str:
+    """Write the compiled file for a CSV and return its path"""
+    output_path = output_path or compiled_path(csv_path)
+    digest = source_digest(csv_path)
+    timetable = Timetable.from_csv(csv_path, rules)
+
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, len(timetable), len(TIME_COLUMNS),
+                         len(timetable.rules), digest, timetable.version.encode('ascii'))]
+    for rule in timetable.rules:
+        if len(rule.name.encode('utf-8')) > 16:
+            raise ValueError(f"Derived time name too long to compile (16 bytes at most): {rule.name!r}")
+        parts.append(RULE.pack(rule.name.encode('utf-8'), CSV_HEADER.index(rule.column), rule.offset))
+    parts.append(timetable._index.tobytes())
+    parts.append(timetable.months.tobytes())
+    parts.append(timetable.dates.tobytes())
+    for name in TIME_COLUMNS:
+        parts.append(timetable.columns[name].tobytes())
+    for rule in timetable.rules:
+        parts.append(timetable.derived[rule.name].tobytes())
+
+    # Written aside and renamed, so a worker never maps a half-written file
+    temporary = f"{output_path}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(b''.join(parts))
+    os.replace(temporary, output_path)
+    return output_path
+
+
+class MappedTimetable(Timetable):
+    """A Timetable whose columns are views onto a memory-mapped compiled file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._sections = []  # views onto the mapping, released by close()
+        try:
+            with memoryview(self._mmap) as view:
+                self._read(view, path)
+        except BaseException:
+            self.close()
+            raise
+
+    def _read(self, view: memoryview, path: str):
+        try:
+            (magic, format_version, byte_order, rows, column_count, rule_count,
+             self.source_digest, version) = HEADER.unpack_from(view)
+        except struct.error:
+            raise ValueError(f"Not a compiled timetable: {path}")
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"Not a compiled timetable (format {FORMAT_VERSION}): {path}")
+        if byte_order != BYTE_ORDER or column_count != len(TIME_COLUMNS):
+            raise ValueError(f"Compiled timetable is for another machine or format: {path}")
+
+        self.path = path
+        self.version = version.decode('ascii')
+        offset = HEADER.size
+        rules = []
+        for _ in range(rule_count):
+            name, column, rule_offset = RULE.unpack_from(view, offset)
+            rules.append(DerivedTime(name.rstrip(b'\0').decode('utf-8'), CSV_HEADER[column], rule_offset))
+            offset += RULE.size
+        self.rules = tuple(rules)
+
+        expected = offset + INDEX_SIZE * 2 + rows * 2 + (column_count + rule_count) * rows * 2
+        if len(view) != expected:
+            raise ValueError(f"Compiled timetable is truncated: {path}")
+
+        def take(size, typecode):
+            nonlocal offset
+            section = view[offset:offset + size].cast(typecode)
+            self._sections.append(section)
+            offset += size
+            return section
+
+        self._index = take(INDEX_SIZE * 2, 'h')
+        self.months = take(rows, 'B')
+        self.dates = take(rows, 'B')
+        self.columns = {name: take(rows * 2, 'H') for name in TIME_COLUMNS}
+        self.derived = {rule.name: take(rows * 2, 'H') for rule in self.rules}
+
+    def close(self):
+        """Unmap the file and close its descriptor; the timetable can't be read afterwards"""
+        for section in self._sections:
+            section.release()
+        self._mmap.close()
+
+    def memory_size(self) -> int:
+        """Bytes of the mapped file plus the views onto it
+
+        The pages are shared with other workers through the page cache, but
+        the mapping (and its file descriptor) stays open for as long as the
+        timetable is held, so a TimetableStore must count it against its budget.
+        """
+        return len(self._mmap) + super().memory_size()
+
+    def matches(self, csv_path: str, rules: Sequence[DerivedTime] = DEFAULT_DERIVED_TIMES) -> bool:
+        """True if this file was compiled from the CSV as it is now, with these rules"""
+        return self.source_digest == source_digest(csv_path) and self.rules == tuple(rules)
+
+
+def load_compiled(csv_path: str, rules: Sequence[DerivedTime] = DEFAULT_DERIVED_TIMES) -> Optional[MappedTimetable]:
+    """The compiled timetable for a CSV, or None if it is missing or out of date"""
+    path = compiled_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        timetable = MappedTimetable(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring compiled timetable %s: %s", path, e)
+        return None
+    try:
+        if timetable.matches(csv_path, rules):
+            return timetable
+        reason = f"out of date, run `py compiled_timetable.py {csv_path}`"
+    except OSError as e:
+        reason = e
+    # Not kept, so unmap it (and close its descriptor) now rather than whenever it is collected
+    timetable.close()
+    logger.warning("Ignoring compiled timetable %s: %s", path, reason)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile prayer times CSVs into memory-mappable timetable files')
+    parser.add_argument('csv', nargs='*', default=[os.path.join('data', 'prayer_times.csv')])
+    args = parser.parse_args()
+
+    # The app's own Suhoor / Sunrise / Zawal rules, so the derived times match
+    from app import IMPORTANT_TIME_RULES
+
+    for csv_path in args.csv:
+        path = compile_timetable(csv_path, rules=IMPORTANT_TIME_RULES)
+        print(f"{csv_path} -> {path} ({os.path.getsize(path)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
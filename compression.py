@@ -0,0 +1,189 @@
+"""
+RESPONSE COMPRESSION
+====================
+
+gzip / Brotli for everything text-like the displays download: the page
+HTML, /api/day, the /assets/ bundles and files under static/ (the
+announcements JSON, adhkar.txt, fonts, ...). The encoding is picked from
+the request's Accept-Encoding; every such response carries
+`Vary: Accept-Encoding` and an ETag per encoding (`"<etag>-gzip"`), so
+caches never hand a compressed body to a client that can't read it.
+
+HOW TO USE:
+-----------
+Precompress static/ at deploy time (writes `.br` / `.gz` next to each file):
+
+    py compression.py
+    py compression.py static --force
+
+In code:
+
+    encoding = negotiate(request.accept_encodings)   # 'br', 'gzip' or None
+    body = compress(data, encoding)
+
+IMPORTANT NOTES:
+---------------
+- Brotli needs the optional `brotli` package; without it only gzip is
+  offered and no `.br` files are written.
+- Static files without an up-to-date `.br` / `.gz` sibling are compressed
+  on first request and kept in memory (`StaticVariants`), so the
+  precompression step only saves that first-request CPU time.
+- Files smaller than MIN_SIZE are sent as they are; compressing them
+  saves almost nothing.
+- Images (JPEG/PNG) are already compressed and are never touched.
+"""
+
+import argparse
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+# Content that shrinks well; everything else is sent as it is
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.txt', '.html', '.svg', '.csv', '.xml', '.md', '.ttf')
+
+# Smallest body worth compressing, in bytes
+MIN_SIZE = 512
+
+# File name suffix of the precompressed copy for each encoding
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Encodings this server can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def is_compressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def negotiate(accept_encodings, encodings: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+    """Pick the encoding to send for a Werkzeug Accept-Encoding header, or None"""
+    best, best_quality = None, 0
+    for encoding in encodings if encodings is not None else available_encodings():
+        quality = accept_encodings[encoding]
+        # Ties go to the earlier (smaller) encoding
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compress with 'br' or 'gzip'; `best` trades CPU for size (for build-time use)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def variant_path(path: str, encoding: str) -> str:
+    return path + SUFFIXES[encoding]
+
+
+def precompressed_path(path: str, encoding: str) -> Optional[str]:
+    """The file's .br/.gz sibling, if there is one at least as new as the file"""
+    sibling = variant_path(path, encoding)
+    try:
+        if os.stat(sibling).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return sibling
+    except OSError:
+        pass
+    return None
+
+
+def precompress_file(path: str, force: bool = False) -> list:
+    """Write the .br/.gz siblings of one file; returns the paths written"""
+    written = []
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < MIN_SIZE:
+        return written
+    for encoding in available_encodings():
+        if not force and precompressed_path(path, encoding):
+            continue
+        body = compress(data, encoding, best=True)
+        if len(body) >= len(data):
+            continue
+        target = variant_path(path, encoding)
+        # Write then rename so a server never reads a half-written file
+        temporary = f"{target}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(body)
+        os.replace(temporary, target)
+        written.append(target)
+    return written
+
+
+def precompress_tree(root: str, force: bool = False) -> list:
+    written = []
+    for directory, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if is_compressible(filename):
+                written.extend(precompress_file(os.path.join(directory, filename), force))
+    return written
+
+
+class StaticVariants:
+    """Finds (or builds and remembers) the compressed copy of a static file"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (path, mtime_ns, size, encoding) -> bytes
+        self._lock = threading.Lock()
+
+    def get(self, path: str, encoding: str) -> Union[str, bytes, None]:
+        """Path of a precompressed sibling, else the compressed bytes; None if not worth it"""
+        sibling = precompressed_path(path, encoding)
+        if sibling is not None:
+            return sibling
+
+        stat = os.stat(path)
+        if stat.st_size < MIN_SIZE:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size, encoding)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+
+        with open(path, 'rb') as file:
+            body = compress(file.read(), encoding)
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write .br/.gz copies of the static files')
+    parser.add_argument('root', nargs='?', default='static')
+    parser.add_argument('--force', action='store_true', help='rewrite copies that are already up to date')
+    args = parser.parse_args()
+
+    written = precompress_tree(args.root, args.force)
+    for path in written:
+        print(path)
+    print(f"{len(written)} files written ({', '.join(available_encodings())})")
+
+
+if __name__ == '__main__':
+    main()
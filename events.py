@@ -0,0 +1,244 @@
+"""
+DISPLAY EVENTS (SERVER-SENT EVENTS)
+===================================
+
+Pushes "something changed" notifications to the display screens over a
+single long-lived `/events` connection, so the kiosks no longer have to
+poll for a new day, a new timetable or new announcements.
+
+EVENTS:
+-------
+    day            - the Irish date rolled over     {"date": "2025-03-16"}
+    timetable      - prayer_times.csv changed        {"version": "..."}
+    announcements  - announcements.json changed      {}
+    time           - server clock for resyncing      {"utc_ms": ..., "irish_offset": 0}
+    resync         - events were missed; refetch everything
+
+HOW TO USE:
+-----------
+    broker = EventBroker()
+    broker.publish('announcements')
+
+    watcher = Watcher(broker)
+    watcher.watch('day', lambda: get_irish_time().date().isoformat(),
+                  lambda value: {'date': value})
+    watcher.every('time', 60, server_time)
+    watcher.start()
+
+    Response(broker.stream(last_event_id), mimetype='text/event-stream')
+
+IMPORTANT NOTES:
+---------------
+- All connections share one event log and one `threading.Condition`.
+  An idle connection is a thread blocked in `Condition.wait()` plus a
+  generator holding one integer, so hundreds of them per worker are
+  cheap (run gunicorn with the gthread worker, see the Procfile). For
+  thousands of connections use the asyncio server in `asgi.py`, which
+  streams from the same broker without a thread per connection.
+- Each connection wakes up only when an event is published or to send a
+  keep-alive comment, which also lets the server notice dead clients.
+- Only the last `history` events are kept. A client that reconnects with
+  an older `Last-Event-ID` gets a single `resync` event instead.
+- `time` is published with `replay=False`: it goes to the displays
+  connected at the time and is never kept, so a minute-by-minute clock
+  sync neither fills the history nor reaches a display late.
+- One `Watcher` thread per process does the checking (stat two files and
+  compare the date every couple of seconds) for every connection.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Sent to the browser with every stream: reconnect after 5 seconds
+RETRY_MS = 5000
+
+# Comment line sent on idle connections so proxies keep them open
+KEEPALIVE_SECONDS = 20.0
+KEEPALIVE = ": keep-alive\n\n"
+
+
+def format_event(event_id: int, event: str, data: Optional[Dict[str, Any]] = None) -> str:
+    """Return one event in text/event-stream format"""
+    payload = json.dumps(data or {}, separators=(',', ':'))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class EventBroker:
+    """Fans published events out to every open /events stream"""
+
+    def __init__(self, history: int = 64, keepalive: float = KEEPALIVE_SECONDS):
+        self.keepalive = keepalive
+        self._events = deque(maxlen=history)  # (id, formatted event)
+        self._dropped_id = 0  # newest id that fell out of the history
+        self._live: Dict[str, Tuple[int, str]] = {}  # event -> newest (id, formatted event) not kept
+        self._last_id = 0
+        self._condition = threading.Condition()
+        self._listeners = []
+        self.connections = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None, replay: bool = True) -> int:
+        """Send an event to every connected display; returns its id
+
+        With `replay=False` the event only goes to displays connected now and
+        is left out of the history replayed after a reconnect.
+        """
+        with self._condition:
+            self._last_id += 1
+            text = format_event(self._last_id, event, data)
+            if not replay:
+                self._live[event] = (self._last_id, text)
+            else:
+                if len(self._events) == self._events.maxlen:
+                    self._dropped_id = self._events[0][0]
+                self._events.append((self._last_id, text))
+            self._condition.notify_all()
+            event_id = self._last_id
+        for callback in self._listeners:
+            callback()
+        return event_id
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Call `callback()` (from the publishing thread) after every publish"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def connect(self, last_event_id: Optional[str] = None) -> int:
+        """Register a new stream; returns the id it has already seen
+
+        `last_event_id` is the browser's Last-Event-ID header.
+        """
+        with self._condition:
+            self.connections += 1
+            try:
+                last_seen = int(last_event_id)
+            except (TypeError, ValueError):
+                return self._last_id
+            if last_seen > self._last_id:  # server restarted since
+                return 0
+            return last_seen
+
+    def disconnect(self):
+        with self._condition:
+            self.connections -= 1
+
+    def since(self, last_seen: int, joined: int = 0) -> Tuple[List[str], int]:
+        """Return (formatted events after last_seen, id to remember)
+
+        `joined` is the last id when the connection opened: live-only events
+        from before then are not sent.
+        """
+        with self._condition:
+            return self._since(last_seen, joined), self._last_id
+
+    def _since(self, last_seen: int, joined: int = 0) -> List[str]:
+        # Called with the condition held
+        if last_seen < self._dropped_id:
+            return [format_event(self._last_id, 'resync')]
+        after = max(last_seen, joined)
+        events = [event for event in self._events if event[0] > last_seen]
+        events += [event for event in self._live.values() if event[0] > after]
+        return [text for _, text in sorted(events)]
+
+    def stream(self, last_event_id: Optional[str] = None,
+               initial: Optional[Callable[[], List[str]]] = None) -> Iterator[str]:
+        """Yield text/event-stream chunks for one connection, forever
+
+        Events published since `last_event_id` are replayed first.
+        `initial` can return extra chunks to send as soon as the stream
+        opens.
+        """
+        last_seen = self.connect(last_event_id)
+        joined = self._last_id
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if initial is not None:
+                yield from initial()
+            while True:
+                with self._condition:
+                    if self._last_id == last_seen:
+                        self._condition.wait(self.keepalive)
+                    pending = self._since(last_seen, joined)
+                    last_seen = self._last_id
+                if pending:
+                    yield ''.join(pending)
+                else:
+                    yield KEEPALIVE
+        finally:
+            self.disconnect()
+
+    def clear(self):
+        with self._condition:
+            self._events.clear()
+            self._live.clear()
+            self._dropped_id = 0
+            self._last_id = 0
+
+
+class Watcher:
+    """Background thread that turns changes into published events"""
+
+    def __init__(self, broker: EventBroker, interval: float = 2.0):
+        self.broker = broker
+        self.interval = interval
+        self._watches = []    # [event, getter, data, last value]
+        self._intervals = []  # [event, seconds, data, next due, replay]
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def watch(self, event: str, getter: Callable[[], Any],
+              data: Optional[Callable[[Any], Optional[Dict[str, Any]]]] = None):
+        """Publish `event` whenever getter() returns a different value"""
+        self._watches.append([event, getter, data, getter()])
+
+    def every(self, event: str, seconds: float, data: Callable[[], Optional[Dict[str, Any]]], replay: bool = True):
+        """Publish `event` every `seconds`; see EventBroker.publish for `replay`"""
+        self._intervals.append([event, seconds, data, time.monotonic() + seconds, replay])
+
+    def poll(self, now: Optional[float] = None):
+        """Run every check once (the thread calls this every `interval`)"""
+        now = time.monotonic() if now is None else now
+        for watch in self._watches:
+            event, getter, data, previous = watch
+            value = getter()
+            if value != previous:
+                watch[3] = value
+                self.broker.publish(event, data(value) if data else None)
+        for scheduled in self._intervals:
+            event, seconds, data, due, replay = scheduled
+            if now >= due:
+                scheduled[3] = now + seconds
+                self.broker.publish(event, data(), replay)
+
+    def start(self):
+        """Start the watcher thread once per process"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-watcher', daemon=True)
+                self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                # Keep pushing the other events if one check fails (e.g. CSV mid-save)
+                logger.warning("Event watcher check failed: %s", e)
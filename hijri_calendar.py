@@ -0,0 +1,95 @@
+"""
+HIJRI CALENDAR LOOKUPS
+======================
+
+Memoised Gregorian -> Hijri conversions for the dates shown on the
+display, plus a cheap day-by-day walk for date ranges (exports and printed
+timetables) that only calls the converter once per range.
+
+HOW TO USE:
+-----------
+    format_hijri_date(date(2024, 3, 15))          # '5 Ramadan 1445'
+    list(iter_hijri_dates(date(2024, 3, 15), date(2024, 3, 17)))
+
+IMPORTANT NOTES:
+---------------
+- Conversions use the Umm al-Qura calendar from `hijri_converter`, which
+  only covers Gregorian dates from 1 Aug 1924 to 16 Nov 2077. Dates
+  outside that range raise OverflowError in `format_hijri_date` and are
+  yielded as empty strings by `iter_hijri_dates`.
+- `clear_cache()` drops memoised conversions (used by the tests when the
+  converter is mocked).
+"""
+
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterator
+
+from hijri_converter import convert, ummalqura
+
+
+# Format Islamic date like "14 J-Ul-Awwal 1436"
+ISLAMIC_MONTHS = [
+    "Muharram", "Safar", "Rabi-Ul-Awwal", "Rabi-Ul-Thani",
+    "J-Ul-Awwal", "J-Ul-Thani", "Rajab", "Sha'ban",
+    "Ramadan", "Shawwal", "Dhul-Qadah", "Dhul-Hijjah"
+]
+
+FIRST_SUPPORTED_DATE = date(*ummalqura.GREGORIAN_RANGE[0])
+LAST_SUPPORTED_DATE = date(*ummalqura.GREGORIAN_RANGE[1])
+
+
+def _format(day: int, month: int, year: int) -> str:
+    return f"{day} {ISLAMIC_MONTHS[month - 1]} {year}"
+
+
+@lru_cache(maxsize=2048)
+def format_hijri_date(day: date) -> str:
+    """Return the Hijri date for a Gregorian date, e.g. '5 Ramadan 1445'"""
+    hijri_date = convert.Gregorian(day.year, day.month, day.day).to_hijri()
+    return _format(hijri_date.day, hijri_date.month, hijri_date.year)
+
+
+@lru_cache(maxsize=512)
+def _month_length(year: int, month: int) -> int:
+    return convert.Hijri(year, month, 1).month_length()
+
+
+def iter_hijri_dates(start: date, end: date) -> Iterator[str]:
+    """Yield the formatted Hijri date for every day from start to end inclusive
+
+    Only the first supported day is converted; after that the Hijri date is
+    stepped forward using the (cached) Hijri month lengths.
+    """
+    one_day = timedelta(days=1)
+    day = start
+    while day <= end and day < FIRST_SUPPORTED_DATE:
+        yield ''
+        day += one_day
+    if day > end or day > LAST_SUPPORTED_DATE:
+        while day <= end:
+            yield ''
+            day += one_day
+        return
+
+    hijri_date = convert.Gregorian(day.year, day.month, day.day).to_hijri()
+    h_year, h_month, h_day = hijri_date.year, hijri_date.month, hijri_date.day
+    last = min(end, LAST_SUPPORTED_DATE)
+    while day <= last:
+        yield _format(h_day, h_month, h_year)
+        day += one_day
+        h_day += 1
+        if h_day > _month_length(h_year, h_month):
+            h_day = 1
+            h_month += 1
+            if h_month > 12:
+                h_month = 1
+                h_year += 1
+    while day <= end:
+        yield ''
+        day += one_day
+
+
+def clear_cache():
+    format_hijri_date.cache_clear()
+    _month_length.cache_clear()
@@ -0,0 +1,270 @@
+"""
+RESPONSIVE ANNOUNCEMENT IMAGES
+==============================
+
+The posters in static/images/ are full-size photos (some several MB)
+shown on 1080p-or-smaller screens. This module builds smaller copies of
+each one (AVIF / WebP / JPEG at a few widths) ahead of time, and lets the
+server pick the best copy for each request, so the display sticks decode
+a fraction of the pixels.
+
+HOW TO USE:
+-----------
+Build the variants (needs Pillow; run again after adding or changing posters):
+
+    pip install Pillow
+    py images.py
+    py images.py --widths 480,960,1440,1920
+
+This writes static/images/variants/<name>-<hash>-<width>.<ext> and
+static/images/variants/manifest.json. Then request a poster as
+
+    /images/zakat.jpg?w=1280
+
+and the server sends the smallest variant at least 1280px wide, in the
+best format the browser's Accept header lists (AVIF, then WebP, then JPEG).
+
+IMPORTANT NOTES:
+---------------
+- Variants are keyed by a hash of the source file, so an unchanged poster
+  is never rebuilt and an edited one gets new file names. Variants no
+  longer in the manifest are deleted.
+- Images are never scaled up: a poster narrower than a target width gets
+  one variant at its own width instead.
+- AVIF is only written when the installed Pillow supports it.
+- A poster missing from the manifest is served as the original file, so
+  the displays keep working before the build has been run.
+- Only the server side (`ImageManifest`) is needed at runtime; Pillow is
+  imported by the build alone.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+MANIFEST_PATH = os.path.join('static', 'images', 'variants', 'manifest.json')
+
+# Widths to build; the displays are 1080p or smaller
+TARGET_WIDTHS = (640, 1280, 1920)
+
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Output formats, most preferred first: (format, extension, mimetype, save options)
+FORMATS = [
+    ('AVIF', 'avif', 'image/avif', {'quality': 60}),
+    ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 6}),
+    ('JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True})
+]
+
+MANIFEST_VERSION = 1
+
+
+def source_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'image'
+
+
+def variant_widths(width: int, targets=TARGET_WIDTHS) -> List[int]:
+    """Target widths for a source image, never wider than the image itself"""
+    widths = sorted(target for target in targets if target < width)
+    if len(widths) < len(targets):
+        widths.append(width)
+    return widths
+
+
+def supported_formats():
+    from PIL import features
+    supported = []
+    for image_format in FORMATS:
+        try:
+            available = features.check(image_format[1])
+        except ValueError:  # feature unknown to this Pillow version
+            available = False
+        if available or image_format[0] == 'JPEG':
+            supported.append(image_format)
+    return supported
+
+
+def build_variants(relative_path: str, static_dir: str, variants_dir: str, digest: str,
+                   widths=TARGET_WIDTHS, formats=None) -> dict:
+    """Write every variant of one poster and return its manifest entry"""
+    from PIL import Image, ImageOps
+
+    with Image.open(os.path.join(static_dir, relative_path)) as opened:
+        # Phone photos are often stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    stem = slug(os.path.splitext(os.path.basename(relative_path))[0])
+    variants = []
+    for width in variant_widths(image.width, widths):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for image_format, extension, mimetype, options in formats or supported_formats():
+            output = resized
+            if image_format == 'JPEG' and output.mode == 'RGBA':
+                # JPEG has no transparency; posters sit on a white background
+                background = Image.new('RGB', output.size, (255, 255, 255))
+                background.paste(output, mask=output.getchannel('A'))
+                output = background
+            filename = f"{stem}-{digest[:8]}-{width}.{extension}"
+            path = os.path.join(variants_dir, filename)
+            if not os.path.exists(path):
+                temporary = f"{path}.tmp"
+                output.save(temporary, image_format, **options)
+                os.replace(temporary, path)
+            variants.append({
+                'file': os.path.relpath(path, static_dir).replace(os.sep, '/'),
+                'width': width,
+                'height': height,
+                'type': mimetype,
+                'bytes': os.path.getsize(path)
+            })
+    return {'hash': digest, 'width': image.width, 'height': image.height, 'variants': variants}
+
+
+def _entry_complete(entry: dict, static_dir: str, widths, formats) -> bool:
+    # Built from the same widths and formats, and every file still there
+    built = {(variant['width'], variant['type']) for variant in entry['variants']}
+    wanted = {(width, image_format[2]) for width in variant_widths(entry['width'], widths) for image_format in formats}
+    return built == wanted and all(os.path.exists(os.path.join(static_dir, variant['file']))
+                                   for variant in entry['variants'])
+
+
+def build(static_dir: str = 'static', widths=TARGET_WIDTHS, prune: bool = True) -> dict:
+    """Build variants for every poster in static/images/ and write the manifest"""
+    images_dir = os.path.join(static_dir, 'images')
+    variants_dir = os.path.join(images_dir, 'variants')
+    manifest_path = os.path.join(variants_dir, 'manifest.json')
+    os.makedirs(variants_dir, exist_ok=True)
+
+    previous = read_manifest(manifest_path).get('images', {})
+    formats = supported_formats()
+    images = {}
+    for filename in sorted(os.listdir(images_dir)):
+        if os.path.splitext(filename)[1].lower() not in SOURCE_EXTENSIONS:
+            continue
+        relative_path = f"images/{filename}"
+        digest = source_hash(os.path.join(images_dir, filename))
+        entry = previous.get(relative_path)
+        if entry and entry['hash'] == digest and _entry_complete(entry, static_dir, widths, formats):
+            images[relative_path] = entry
+            continue
+        print(f"Building {relative_path}")
+        images[relative_path] = build_variants(relative_path, static_dir, variants_dir, digest, widths, formats)
+
+    manifest = {'version': MANIFEST_VERSION, 'images': images}
+    temporary = f"{manifest_path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(temporary, manifest_path)
+
+    if prune:
+        keep = {os.path.basename(variant['file']) for entry in images.values() for variant in entry['variants']}
+        keep.add('manifest.json')
+        for filename in os.listdir(variants_dir):
+            if filename not in keep:
+                os.remove(os.path.join(variants_dir, filename))
+    return manifest
+
+
+def read_manifest(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
+
+
+def accepted_types(accept_mimetypes) -> set:
+    # Only types the browser names: '*/*' does not mean it can decode AVIF
+    return {value for value, quality in accept_mimetypes if quality > 0 and '*' not in value}
+
+
+def choose_variant(entry: dict, accepted: set, width: Optional[int] = None) -> Optional[dict]:
+    """Best variant of one poster for the accepted types and display width"""
+    for _, _, mimetype, _ in FORMATS:
+        if mimetype != 'image/jpeg' and mimetype not in accepted:
+            continue
+        candidates = sorted((variant for variant in entry['variants'] if variant['type'] == mimetype),
+                            key=lambda variant: variant['width'])
+        if not candidates:
+            continue
+        if width is None:
+            return candidates[-1]
+        return next((variant for variant in candidates if variant['width'] >= width), candidates[-1])
+    return None
+
+
+class ImageManifest:
+    """The variants manifest, reloaded when the file changes"""
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._images: Dict[str, dict] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Dict[str, dict]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            if mtime != self._mtime:
+                self._images = read_manifest(self.path).get('images', {}) if mtime is not None else {}
+                self._mtime = mtime
+            return self._images
+
+    def get(self, relative_path: str) -> Optional[dict]:
+        """Manifest entry for e.g. 'images/zakat.jpg', or None"""
+        return self._current().get(relative_path)
+
+    def choose(self, relative_path: str, accept_mimetypes, width: Optional[int] = None) -> Optional[dict]:
+        entry = self.get(relative_path)
+        if entry is None:
+            return None
+        return choose_variant(entry, accepted_types(accept_mimetypes), width)
+
+    def clear(self):
+        with self._lock:
+            self._images = {}
+            self._mtime = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build resized AVIF/WebP/JPEG copies of the announcement posters')
+    parser.add_argument('static_dir', nargs='?', default='static')
+    parser.add_argument('--widths', default=','.join(str(width) for width in TARGET_WIDTHS),
+                        help='comma-separated target widths in pixels')
+    parser.add_argument('--keep', action='store_true', help="don't delete variants that are no longer used")
+    args = parser.parse_args()
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        parser.error('Pillow is needed to build image variants: pip install Pillow')
+
+    widths = tuple(int(width) for width in args.widths.split(','))
+    manifest = build(args.static_dir, widths, prune=not args.keep)
+    total = sum(variant['bytes'] for entry in manifest['images'].values() for variant in entry['variants'])
+    print(f"{len(manifest['images'])} images, {total / 1024 / 1024:.1f} MB of variants "
+          f"({', '.join(image_format[1] for image_format in supported_formats())})")
+
+
+if __name__ == '__main__':
+    main()
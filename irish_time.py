@@ -0,0 +1,74 @@
+"""
+IRISH TIME
+==========
+
+One place for "is Ireland on summer time?" used by both the web app and
+the validator. Clock-change instants are computed once per year and kept
+in a table, so every later question is a dictionary lookup and two
+comparisons.
+
+RULES:
+------
+Irish Summer Time (UTC+1) starts at 01:00 UTC on the last Sunday in
+March and ends at 01:00 UTC on the last Sunday in October (the EU rule,
+matching `zoneinfo.ZoneInfo("Europe/Dublin")`).
+
+HOW TO USE:
+-----------
+    is_dst(datetime(2024, 7, 15, 12, 0, tzinfo=timezone.utc))   # True
+    utc_to_irish(now)          # now shifted to Irish wall-clock time
+    is_dst_on(2024, 3, 31)     # True - clocks went forward that morning
+
+IMPORTANT NOTES:
+---------------
+- `is_dst_on()` answers for a calendar date (as seen at midday), so the
+  Sunday the clocks go forward counts as summer time and the Sunday they
+  go back does not. It also accepts impossible dates such as 30 February
+  without raising, which keeps the validator usable on bad CSV data.
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple
+
+
+class DstTransitions(NamedTuple):
+    start: datetime  # clocks go forward (UTC)
+    end: datetime    # clocks go back (UTC)
+    start_day: int   # day of March
+    end_day: int     # day of October
+
+
+def last_sunday(year: int, month: int) -> int:
+    """Return the day of the month of the last Sunday (month must have 31 days)"""
+    return 31 - (datetime(year, month, 31).weekday() + 1) % 7
+
+
+@lru_cache(maxsize=None)
+def dst_transitions(year: int) -> DstTransitions:
+    """Return (and remember) the clock-change instants for a year"""
+    start_day = last_sunday(year, 3)
+    end_day = last_sunday(year, 10)
+    return DstTransitions(
+        start=datetime(year, 3, start_day, 1, 0, tzinfo=timezone.utc),
+        end=datetime(year, 10, end_day, 1, 0, tzinfo=timezone.utc),
+        start_day=start_day,
+        end_day=end_day
+    )
+
+
+def is_dst(dt: datetime) -> bool:
+    """Is Irish Summer Time in effect at this UTC instant?"""
+    transitions = dst_transitions(dt.year)
+    return transitions.start <= dt < transitions.end
+
+
+def utc_to_irish(dt: datetime) -> datetime:
+    """Shift a UTC datetime to Irish wall-clock time"""
+    return dt + timedelta(hours=(1 if is_dst(dt) else 0))
+
+
+def is_dst_on(year: int, month: int, day: int) -> bool:
+    """Is Irish Summer Time in effect on this calendar date (at midday)?"""
+    transitions = dst_transitions(year)
+    return (3, transitions.start_day) <= (month, day) < (10, transitions.end_day)
@@ -0,0 +1,316 @@
+"""
+METRICS
+=======
+
+A small in-process metrics registry (counters, gauges, histograms) that
+is served at /metrics in the Prometheus text format, with no outside
+service or client library.
+
+HOW TO USE:
+-----------
+    REQUESTS = registry.counter('requests_total', 'Requests handled', ('route',))
+    LATENCY = registry.histogram('request_duration_seconds', 'Request latency', ('route',))
+
+    REQUESTS.inc(route='/')
+    LATENCY.observe(0.012, route='/')
+    with LATENCY.time(route='/'):
+        ...
+
+    registry.collector(lambda: [...])   # values read at scrape time
+    registry.render()                   # Prometheus text for this process
+
+Scrape locally with:
+
+    curl http://localhost:5000/metrics
+
+SEVERAL WORKERS:
+----------------
+Each gunicorn worker has its own registry. Set METRICS_DIR to a
+directory all workers can write, and each worker writes a snapshot of
+its registry to <METRICS_DIR>/worker-<pid>.json, at most every
+FLUSH_SECONDS after a request and whenever it is scraped. A scrape
+reads every worker's file and merges them: counters and histograms are
+summed, and gauges are reported per worker with a `pid` label.
+
+IMPORTANT NOTES:
+---------------
+- Updating a metric takes one short per-metric lock; nothing touches the
+  disk on the request path except the periodic snapshot.
+- Other workers' numbers can be up to FLUSH_SECONDS old in a scrape.
+- Counters of workers that have exited keep counting towards the totals
+  (as Prometheus expects of counters); their gauges are dropped.
+- Clear METRICS_DIR when the server starts so old runs don't add up.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request-sized latencies: 1 ms to 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FLUSH_SECONDS = 5.0
+
+LabelValues = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} needs labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[Dict[str, str], object]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per bucket (not cumulative) counts, the last one for +Inf
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            state['counts'][position] += 1
+            state['sum'] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, {'counts': list(state['counts']), 'sum': state['sum']}) for key, state in self._values.items()]
+        return [(dict(zip(self.labelnames, key)), state) for key, state in items]
+
+
+class Registry:
+    """The metrics of one process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[dict]]] = []
+
+    def _add(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, collect: Callable[[], Iterable[dict]]):
+        """Add values read at scrape time; `collect` returns families as in snapshot()"""
+        self._collectors.append(collect)
+        return collect
+
+    def snapshot(self) -> List[dict]:
+        """Every metric family as plain data: name, type, help, samples (and buckets)"""
+        families = []
+        for metric in self._metrics.values():
+            family = {'name': metric.name, 'type': metric.kind, 'help': metric.documentation,
+                      'samples': metric.samples()}
+            if isinstance(metric, Histogram):
+                family['buckets'] = list(metric.buckets)
+            families.append(family)
+        for collect in self._collectors:
+            families.extend(collect())
+        return families
+
+    def render(self) -> str:
+        return render(self.snapshot())
+
+
+def merge(snapshots: Dict[int, List[dict]]) -> List[dict]:
+    """Combine workers' snapshots (by pid): sum counters and histograms, label gauges by pid"""
+    merged: Dict[str, dict] = {}
+    for pid, families in sorted(snapshots.items()):
+        for family in families:
+            target = merged.setdefault(family['name'], {
+                'name': family['name'], 'type': family['type'], 'help': family['help'],
+                'buckets': family.get('buckets'), 'by_labels': {}
+            })
+            for labels, value in family['samples']:
+                if family['type'] == 'gauge':
+                    labels = dict(labels, pid=str(pid))
+                key = tuple(sorted(labels.items()))
+                current = target['by_labels'].get(key)
+                if family['type'] == 'gauge' or current is None:
+                    if family['type'] == 'histogram':
+                        value = {'counts': list(value['counts']), 'sum': value['sum']}
+                    target['by_labels'][key] = (labels, value)
+                elif family['type'] == 'histogram':
+                    current[1]['counts'] = [a + b for a, b in zip(current[1]['counts'], value['counts'])]
+                    current[1]['sum'] += value['sum']
+                else:
+                    target['by_labels'][key] = (labels, current[1] + value)
+    return [dict(family, samples=list(family.pop('by_labels').values())) for family in merged.values()]
+
+
+def render(families: List[dict]) -> str:
+    """Prometheus text exposition format"""
+    lines = []
+    for family in families:
+        name = family['name']
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family['samples']:
+            if family['type'] != 'histogram':
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(family['buckets']) + [float('inf')], value['counts']):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(dict(labels, le=format_value(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(value['sum'])}")
+            lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkerFiles:
+    """Per-worker snapshot files in a shared directory, merged on scrape"""
+
+    def __init__(self, registry: Registry, directory: str, flush_seconds: float = FLUSH_SECONDS):
+        self.registry = registry
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._next_flush = 0.0
+        self._flush_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"worker-{pid}.json")
+
+    def maybe_flush(self):
+        # Called after every request; writes at most every flush_seconds
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self, blocking: bool = False):
+        if not self._flush_lock.acquire(blocking=blocking):
+            return  # another thread of this worker is writing it
+        try:
+            self._next_flush = time.monotonic() + self.flush_seconds
+            pid = os.getpid()
+            temporary = f"{self.path(pid)}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump(self.registry.snapshot(), file, separators=(',', ':'))
+            os.replace(temporary, self.path(pid))
+        finally:
+            self._flush_lock.release()
+
+    def read_all(self) -> Dict[int, List[dict]]:
+        snapshots = {}
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith('worker-') and filename.endswith('.json')):
+                continue
+            try:
+                pid = int(filename[len('worker-'):-len('.json')])
+                with open(os.path.join(self.directory, filename), 'r', encoding='utf-8') as file:
+                    families = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(pid):
+                # Keep an exited worker's counts, not its gauges
+                families = [family for family in families if family['type'] != 'gauge']
+            snapshots[pid] = families
+        return snapshots
+
+    def render(self) -> str:
+        self.flush(blocking=True)
+        return render(merge(self.read_all()))
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """This process's current RSS, or None where it can't be read"""
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
@@ -8,8 +8,9 @@ HOW TO USE (simple):
     `data/prayer_times.csv`).
 2. Run this validator: `py prayer_time_validator.py` and press
     Enter at the CSV prompt to use the default `data/prayer_times.csv`.
-3. Enter the month number (1-12) when asked — the script will
-    print the validation report for that month.
+3. Enter the month number (1-12) when asked, then the year (press
+    Enter for the current year) — the script will print the
+    validation report for that month.
 
 OUTPUT:
 -------
@@ -22,9 +23,11 @@ IMPORTANT NOTES:
 - The validator expects times in 24-hour HH:MM format.
 - If a time cannot be parsed it is treated as 00:00 for
     comparison purposes and will likely show up as a violation.
-- Zohr jamaah validation uses a simplified Irish daylight
-    saving heuristic; adjust `_is_after_clock_forward` if you
-    need exact last-Sunday detection.
+- Zohr jamaah validation uses the exact Irish clock changes
+    (last Sunday in March / October) from `irish_time.py`. The
+    CSV has no year column, so pass `year` (or enter it at the
+    prompt) for the year being validated; it defaults to the
+    current year.
 
 EXAMPLE:
 -------
@@ -34,13 +37,42 @@ to the one produced by the command-line interface in this file.
 
 import csv
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+from irish_time import is_dst_on
+from timetable import MISSING, PrayerDay, Timetable
 
 
 class PrayerTimeValidator:
-    def __init__(self, csv_file_path: str):
+    def __init__(self, csv_file_path: str, year: Optional[int] = None):
         self.csv_file_path = csv_file_path
+        self.year = year or datetime.now().year
         self.data = self._load_csv_data()
+        self._timetable = None
+        # Rows whose month or day is out of range, left out of the timetable
+        self.skipped_rows: List[List[str]] = []
+        self._rows_by_month: Optional[Dict[int, List[PrayerDay]]] = None
+    
+    @property
+    def timetable(self) -> Timetable:
+        """Indexed view of the CSV rows, built the first time a month is validated"""
+        if self._timetable is None:
+            self._timetable = Timetable.from_dicts(self.data, skipped=self.skipped_rows)
+        return self._timetable
+    
+    def _month_rows(self, month: int) -> List[PrayerDay]:
+        """A month's rows with the times exactly as written in the CSV
+
+        The timetable stores unparseable times as MISSING, which reads back as
+        '' - the jamaah reports need the bad value so the user can fix it.
+        """
+        if self._rows_by_month is None:
+            self._rows_by_month = {}
+            for row in self.data:
+                record = PrayerDay.from_dict(row)
+                if 1 <= record.month <= 12 and 1 <= record.day <= 31:
+                    self._rows_by_month.setdefault(record.month, []).append(record)
+        return self._rows_by_month.get(month, [])
     
     def _load_csv_data(self) -> List[Dict]:
         data = []
@@ -52,21 +84,29 @@ class PrayerTimeValidator:
     
     def validate_month(self, month: int) -> Dict:
         """Validate prayer times for a specific month"""
-        month_data = [row for row in self.data if int(row['MONTH']) == month]
+        month_data = self._month_rows(month)
         
         if not month_data:
             return {"error": f"No data found for month {month}"}
         
+        date_validation = self._validate_dates(month_data)
+        self.timetable  # Building it collects the out-of-range rows in skipped_rows
+        out_of_range = [int(row[1]) for row in self.skipped_rows if int(row[0]) == month]
+        if out_of_range:
+            # Reported like any other extra date; the rows aren't validated
+            date_validation["is_valid"] = False
+            date_validation["extra_dates"] = sorted(set(date_validation["extra_dates"]) | set(out_of_range))
+        
         validation_results = {
             "month": month,
             "total_rows": len(month_data),
-            "date_validation": self._validate_dates(month_data),
-            "fajr_beginning_validation": self._validate_time_pattern(month_data, 'FAJR BEGINNING', month, 'fajr'),
-            "sunrise_beginning_validation": self._validate_time_pattern(month_data, 'SUNRISE BEGINNING', month, 'sunrise'),
-            "zohr_beginning_validation": self._validate_time_pattern(month_data, 'ZOHR BEGINNING', month, 'zohr'),
-            "asar_beginning_validation": self._validate_time_pattern(month_data, 'ASAR BEGINNING', month, 'asar'),
-            "magrib_beginning_validation": self._validate_time_pattern(month_data, 'MAGRIB BEGINNING', month, 'magrib'),
-            "isha_beginning_validation": self._validate_time_pattern(month_data, 'ISHA BEGINNING', month, 'isha'),
+            "date_validation": date_validation,
+            "fajr_beginning_validation": self._validate_column_pattern(month, 'FAJR BEGINNING', 'fajr'),
+            "sunrise_beginning_validation": self._validate_column_pattern(month, 'SUNRISE BEGINNING', 'sunrise'),
+            "zohr_beginning_validation": self._validate_column_pattern(month, 'ZOHR BEGINNING', 'zohr'),
+            "asar_beginning_validation": self._validate_column_pattern(month, 'ASAR BEGINNING', 'asar'),
+            "magrib_beginning_validation": self._validate_column_pattern(month, 'MAGRIB BEGINNING', 'magrib'),
+            "isha_beginning_validation": self._validate_column_pattern(month, 'ISHA BEGINNING', 'isha'),
             "zohr_jamaah_validation": self._validate_zohr_jamaah(month_data, month),
             "magrib_jamaah_validation": self._validate_magrib_jamaah(month_data)
         }
@@ -96,6 +136,17 @@ class PrayerTimeValidator:
             time_str = row[time_column]
             times.append(self._time_to_minutes(time_str))
         
+        return self._validate_minutes_pattern(times, month, prayer_type)
+    
+    def _validate_column_pattern(self, month: int, time_column: str, prayer_type: str) -> Dict:
+        """Validate a time column straight from the timetable's minutes-since-midnight storage"""
+        # Unparseable times are treated as 00:00, the same as _time_to_minutes
+        times = [0 if minutes == MISSING else minutes
+                 for minutes in self.timetable.month_minutes(month, time_column)]
+        return self._validate_minutes_pattern(times, month, prayer_type)
+    
+    def _validate_minutes_pattern(self, times: List[int], month: int, prayer_type: str) -> Dict:
+        """Check consecutive days of one prayer time against the expected pattern"""
         expected_pattern = self._get_expected_pattern(month, prayer_type)
         violations = []
         
@@ -223,23 +274,9 @@ class PrayerTimeValidator:
             "total_violations": len(violations)
         }
     
-    def _is_after_clock_forward(self, month: int, date: int) -> bool:
+    def _is_after_clock_forward(self, month: int, date: int, year: Optional[int] = None) -> bool:
         """Determine if date is after Irish clock forward (last Sunday in March) and before backward (last Sunday in October)"""
-        # Simplified logic: 
-        # After March = April to October
-        # Before March = November to March
-        if month >= 4 and month <= 10:
-            return True
-        elif month <= 3 or month >= 11:
-            return False
-        else:
-            # For March and October, we'd need more complex logic to find last Sunday
-            # For now, assume March 25+ is after forward, October 25+ is after backward
-            if month == 3:
-                return date >= 25
-            elif month == 10:
-                return date < 25
-        return False
+        return is_dst_on(year or self.year, month, date)
     
     def print_validation_report(self, validation_results: Dict):
         """Print a formatted validation report"""
@@ -327,6 +364,10 @@ def main():
             print("Invalid month number. Please enter 1-12.")
             return
         
+        year_input = input(f"Enter year (or press Enter for {validator.year}): ").strip()
+        if year_input:
+            validator.year = int(year_input)
+        
         results = validator.validate_month(month)
         
         if "error" in results:
@@ -0,0 +1,212 @@
+"""
+REQUEST PROFILING
+=================
+
+Opt-in profiling of the index page and the API routes, for when a kiosk
+page is slow and the metrics only say *that* it is slow. A profiled
+request is run under cProfile while a sampler thread records its stack
+every millisecond. Both are written to a directory that keeps only the
+newest profiles:
+
+    profiles/20260315-101502-123456-4242-api-day.pstats      # python -m pstats <file>
+    profiles/20260315-101502-123456-4242-api-day.collapsed   # flamegraph.pl / speedscope
+
+HOW TO USE:
+-----------
+Profile every Nth request (here 1 in 50) on a server:
+
+    PROFILE=1 PROFILE_EVERY=50 gunicorn app:app
+
+Or profile single requests on demand: start the server with a secret,
+then sign a header with it (valid for an hour by default):
+
+    PROFILE_SECRET=... gunicorn app:app
+    PROFILE_SECRET=... py profiling.py sign            # prints the header value
+    curl -H "X-Profile: <value>" https://.../api/day
+
+Other settings: PROFILE_DIR (default "profiles"), PROFILE_KEEP (newest
+profiles kept, default 50).
+
+IMPORTANT NOTES:
+---------------
+- With neither PROFILE nor PROFILE_SECRET set the middleware is not
+  installed at all. With only a secret, a request without the header
+  costs one dictionary lookup and one branch.
+- Only one request per worker is profiled at a time; requests that
+  arrive meanwhile run normally.
+- Only the call into the app is profiled. The body of a streamed
+  response (/events, /api/range) is produced afterwards and isn't.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Mapping, Optional
+
+HEADER = 'X-Profile'
+_ENVIRON_KEY = 'HTTP_X_PROFILE'
+
+# The index page (default and per mosque) and the JSON API
+PROFILED_PATHS = re.compile(r'^/(api/.*|m/[^/]+/)?$')
+
+SAMPLE_SECONDS = 0.001
+
+
+def sign(secret: str, ttl: int = 3600, now: Optional[float] = None) -> str:
+    """Header value that asks for a profile until `ttl` seconds from now"""
+    expires = int((now if now is not None else time.time()) + ttl)
+    signature = hmac.new(secret.encode('utf-8'), str(expires).encode('ascii'), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify(secret: str, value: str, now: Optional[float] = None) -> bool:
+    expires, _, signature = value.partition('.')
+    # isdigit() alone also accepts digits such as '²' that int() and ascii can't take
+    if not (expires.isascii() and expires.isdigit()):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), expires.encode('ascii'), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature) and int(expires) >= (now if now is not None else time.time())
+
+
+def frame_stack(frame) -> str:
+    # Outermost call first, as flame graphs expect
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Records one thread's stack every `interval` seconds, in collapsed form"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[frame_stack(frame)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """Decides which requests to profile and writes their profiles"""
+
+    def __init__(self, directory: str = 'profiles', every: int = 0, keep: int = 50, secret: Optional[str] = None):
+        self.directory = directory
+        self.every = every      # profile 1 in `every` requests; 0 for signed requests only
+        self.keep = keep
+        self.secret = secret
+        self._count = 0
+        self._busy = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str]) -> Optional['Profiler']:
+        """The profiler configured by PROFILE* variables, or None if profiling is off"""
+        every = int(environ.get('PROFILE_EVERY', 1)) if environ.get('PROFILE') == '1' else 0
+        secret = environ.get('PROFILE_SECRET') or None
+        if not every and not secret:
+            return None
+        return cls(environ.get('PROFILE_DIR', 'profiles'), every, int(environ.get('PROFILE_KEEP', 50)), secret)
+
+    def wanted(self, path: str, header: Optional[str]) -> bool:
+        if not PROFILED_PATHS.match(path):
+            return False
+        if header is not None and self.secret and verify(self.secret, header):
+            return True
+        if self.every:
+            self._count += 1  # approximate under threads, which is fine for sampling
+            return self._count % self.every == 0
+        return False
+
+    def profile(self, path: str, call):
+        """Run call() under the profilers, or as is if another request is being profiled"""
+        if not self._busy.acquire(blocking=False):
+            return call()
+        try:
+            profile = cProfile.Profile()
+            with StackSampler(threading.get_ident()) as sampler:
+                result = profile.runcall(call)
+            self.write(path, profile, sampler)
+            return result
+        finally:
+            self._busy.release()
+
+    def write(self, path: str, profile: cProfile.Profile, sampler: StackSampler):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^a-z0-9]+', '-', path.lower()).strip('-') or 'index'
+        stem = os.path.join(self.directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}-{slug}")
+        profile.dump_stats(f"{stem}.pstats")
+        with open(f"{stem}.collapsed", 'w', encoding='utf-8') as file:
+            file.write(sampler.collapsed())
+        self.rotate()
+
+    def rotate(self):
+        # Keep the newest `keep` profiles (each is a .pstats and a .collapsed)
+        stems = sorted({os.path.splitext(name)[0] for name in os.listdir(self.directory)
+                        if name.endswith(('.pstats', '.collapsed'))})
+        for stem in stems[:-self.keep] if self.keep else stems:
+            for extension in ('.pstats', '.collapsed'):
+                try:
+                    os.remove(os.path.join(self.directory, stem + extension))
+                except FileNotFoundError:
+                    pass
+
+
+class ProfilingMiddleware:
+    """WSGI middleware running chosen requests under a Profiler"""
+
+    def __init__(self, wsgi_app, profiler: Profiler):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+        self.always_check = bool(profiler.every)
+
+    def __call__(self, environ, start_response):
+        header = environ.get(_ENVIRON_KEY)
+        if header is None and not self.always_check:
+            return self.wsgi_app(environ, start_response)
+        path = environ.get('PATH_INFO', '')
+        if not self.profiler.wanted(path, header):
+            return self.wsgi_app(environ, start_response)
+        return self.profiler.profile(path, lambda: self.wsgi_app(environ, start_response))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Sign an X-Profile header with PROFILE_SECRET')
+    parser.add_argument('command', choices=['sign'])
+    parser.add_argument('--ttl', type=int, default=3600, help='seconds the header stays valid')
+    args = parser.parse_args()
+
+    secret = os.environ.get('PROFILE_SECRET')
+    if not secret:
+        parser.error('PROFILE_SECRET is not set')
+    print(sign(secret, args.ttl))
+
+
+if __name__ == '__main__':
+    main()
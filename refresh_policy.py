@@ -0,0 +1,66 @@
+"""
+REFRESH POLICY
+==============
+
+Tells each display how to spread out its refreshes, so a whole fleet of
+screens doesn't ask for the day data in the same second (at a scheduled
+refresh minute, on a pushed "day" event, or when the server comes back
+after an outage and every screen retries at once).
+
+Each display gets:
+- an offset: how long to wait before a refresh, the same every time for
+  the same display and spread evenly over REFRESH_WINDOW_SECONDS across
+  displays,
+- a retry policy: wait `initial_seconds` after a failed refresh, then
+  `multiplier` times longer after each further failure, up to
+  `max_seconds`. The display waits a random time between half and all of
+  each delay, so retries that started together drift apart.
+
+HOW TO USE:
+-----------
+The displays ask for it once when the page loads (static/js/time.js):
+
+    GET /api/refresh-policy?device=<id kept in localStorage>
+
+    {"offset_ms": 73215, "window_seconds": 120,
+     "retry": {"initial_seconds": 30, "max_seconds": 600, "multiplier": 2}}
+
+IMPORTANT NOTES:
+---------------
+- The offset only depends on the device id, so a display keeps its place
+  in the window across reloads and restarts. Without an id the client's
+  address and browser are used instead.
+- The window must stay well under the shortest gap between scheduled
+  refreshes (5 minutes on Fridays).
+"""
+
+import hashlib
+
+# Displays refresh within this many seconds of the scheduled moment
+REFRESH_WINDOW_SECONDS = 120
+
+# Retries after a failed refresh
+RETRY_INITIAL_SECONDS = 30
+RETRY_MAX_SECONDS = 600
+RETRY_MULTIPLIER = 2
+
+MAX_DEVICE_ID_LENGTH = 128
+
+
+def device_offset_ms(device: str, window_seconds: int = REFRESH_WINDOW_SECONDS) -> int:
+    """A display's fixed place in the refresh window, in milliseconds"""
+    digest = hashlib.sha256(device.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % (window_seconds * 1000)
+
+
+def refresh_policy(device: str) -> dict:
+    """The policy sent to one display"""
+    return {
+        'offset_ms': device_offset_ms(device),
+        'window_seconds': REFRESH_WINDOW_SECONDS,
+        'retry': {
+            'initial_seconds': RETRY_INITIAL_SECONDS,
+            'max_seconds': RETRY_MAX_SECONDS,
+            'multiplier': RETRY_MULTIPLIER
+        }
+    }
@@ -0,0 +1,265 @@
+"""
+RENDERED PAGE CACHE
+===================
+
+Keeps fully rendered HTML pages (and JSON documents) in memory together
+with a strong ETag and the response headers to send, so repeated requests
+for the same page skip Jinja completely and conditional requests can be
+answered with a 304.
+
+HOW TO USE:
+-----------
+    cache = RenderCache()
+    page = cache.get_or_put(key, lambda: render_template(...))
+    return page.to_response(request)
+
+IMPORTANT NOTES:
+---------------
+- The key must include everything the HTML depends on (for the index page:
+  the Irish calendar date and the timetable version).
+- Pages are sent with `Cache-Control: no-cache`, so browsers always
+  revalidate but only download the body again when the ETag changed.
+- Pages are gzip/Brotli compressed for clients that accept it (see
+  compression.py). Each encoding is compressed once per cached page and
+  kept alongside it.
+- A page is rendered once even when many requests miss the cache at the
+  same moment (every display asking for a new day at midnight): the first
+  renders it and the others wait for its result (see SingleFlight).
+
+FRAGMENTS:
+----------
+When a page can't come from the cache (a new day, a new timetable, or
+another mosque's page), `FragmentCache` still holds the parts of it that
+depend on less, such as the prayer grid for one day:
+
+    grid = fragments.get_or_render(key, lambda: render_template('_prayer_grid.html', ...))
+    render_template('index.html', prayer_grid=grid, ...)
+
+Fragments are returned as Markup so Jinja doesn't escape them again.
+
+SINGLE FLIGHT:
+--------------
+`SingleFlight` is what both caches use to coalesce concurrent misses, and
+can be used on its own for any expensive call keyed by its inputs:
+
+    loads = SingleFlight()
+    timetable = loads.do(csv_path, lambda: Timetable.from_csv(csv_path))
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional, TypeVar
+
+from flask import Response
+from markupsafe import Markup
+
+from compression import MIN_SIZE, compress, negotiate
+
+
+DEFAULT_CACHE_CONTROL = 'no-cache'
+
+T = TypeVar('T')
+
+
+class CachedPage(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    mimetype: str = 'text/html'
+    # Compressed bodies by encoding, filled on first use; None to never compress
+    encoded: Optional[Dict[str, bytes]] = None
+
+    def encoded_body(self, encoding: str) -> bytes:
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compress(self.body, encoding)
+        return body
+
+    def to_response(self, request) -> Response:
+        """Build the response, or an empty 304 if the client already has this page"""
+        encoding = None
+        if self.encoded is not None and len(self.body) >= MIN_SIZE:
+            encoding = negotiate(request.accept_encodings)
+        # Each encoding is a different body, so it gets its own ETag
+        etag = self.etag if encoding is None else f"{self.etag}-{encoding}"
+
+        # The plain ETag matches too: it names the same content, and clients
+        # that send back the version from a JSON body don't know the suffix
+        if request.if_none_match.contains(etag) or request.if_none_match.contains(self.etag):
+            response = Response(status=304)
+        elif encoding is None:
+            response = Response(self.body, mimetype=self.mimetype)
+        else:
+            response = Response(self.encoded_body(encoding), mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers.update(self.headers)
+        if self.encoded is not None:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+class _Flight:
+    """A call in progress that other callers with the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; callers arriving meanwhile share its result"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        """Return call(), or the result of the same key's call already in progress"""
+        with self._lock:
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = call()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class RenderCache:
+    """Small LRU of rendered pages keyed by whatever the page depends on"""
+
+    def __init__(self, max_entries: int = 4, cache_control: str = DEFAULT_CACHE_CONTROL):
+        self.max_entries = max_entries
+        self.cache_control = cache_control
+        self._entries: 'OrderedDict[Hashable, CachedPage]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def coalesced(self) -> int:
+        # Misses that waited for another request's render instead of rendering
+        return self._flights.coalesced
+
+    def get(self, key: Hashable) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def get_or_put(self, key: Hashable, render: Callable[[], Optional[str]],
+                   mimetype: str = 'text/html') -> Optional[CachedPage]:
+        """The cached page, or render() stored as one; None (not cached) if render() returns None"""
+        page = self.get(key)
+        if page is not None:
+            return page
+        return self._flights.do(key, lambda: self._render_and_put(key, render, mimetype))
+
+    def _render_and_put(self, key: Hashable, render: Callable[[], Optional[str]], mimetype: str) -> Optional[CachedPage]:
+        # A render that finished just before this one started has stored it
+        with self._lock:
+            page = self._entries.get(key)
+        if page is not None:
+            return page
+        content = render()
+        return None if content is None else self.put(key, content, mimetype)
+
+    def put(self, key: Hashable, content: str, mimetype: str = 'text/html') -> CachedPage:
+        """Store a rendered page and return the cache entry for it"""
+        body = content.encode('utf-8')
+        page = CachedPage(
+            body=body,
+            etag=hashlib.sha1(body).hexdigest(),
+            headers={'Cache-Control': self.cache_control},
+            mimetype=mimetype,
+            encoded={}
+        )
+        with self._lock:
+            self._entries[key] = page
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FragmentCache:
+    """Small LRU of rendered template fragments"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Markup]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self._flights.coalesced
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> Markup:
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        # Rendered outside the lock, once however many requests want a new key
+        return self._flights.do(key, lambda: self._render_and_store(key, render))
+
+    def _render_and_store(self, key: Hashable, render: Callable[[], str]) -> Markup:
+        with self._lock:
+            fragment = self._entries.get(key)
+        if fragment is not None:
+            return fragment
+        fragment = Markup(render())
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -57,13 +57,20 @@ var announcements = {
 
 // Dynamic announcements loaded from external source
 var dynamicAnnouncements = []; // Initialize as empty array to avoid undefined errors
+var announcementControls = null; // {controlId: hidden} from /api/announcements/active
+var announcementsRefreshTimer = null; // Refetch when the active set next changes
+var announcementsNextChange = null; // When the server said the active set next changes
+var announcementsVersion = null; // Feed version we hold, sent back as ?since=
+var announcementEntries = {}; // Entries we hold, by id, updated from deltas
+var ADHKAR_TEXT_FILE = "/static/data/adhkar.txt"; // Split into pages by /api/adhkar
 
 // Track announcement display states
 var displayState = {
   pausedAnnouncement: null,
   resumeTimeout: null,
   adhkarActive: false,
-  adhkarText: null,
+  adhkarPages: null, // Page texts, from /api/adhkar or split here
+  adhkarPagesUrl: null, // Where adhkarPages came from
   adhkarConfig: null,
   adhkarCurrentPage: 0,
   adhkarCurrentCycle: 0,
@@ -76,6 +83,9 @@ var displayState = {
 var announcementModule = {
   // Helper function to check if a control entry is hidden
   isControlHidden: function(controlId) {
+    if (announcementControls) {
+      return announcementControls[controlId] === true;
+    }
     if (!dynamicAnnouncements || !Array.isArray(dynamicAnnouncements)) {
       return false; // Default to showing if JSON not loaded
     }
@@ -91,8 +101,12 @@ var announcementModule = {
     // Load dynamic announcements when the page loads
     this.loadDynamicAnnouncements();
 
-    // Set up periodic refresh of dynamic announcements (e.g., every hour)
-    setInterval(this.loadDynamicAnnouncements.bind(this), 60 * 60 * 1000);
+    // Hourly refresh is only a fallback; /events pushes changes as they happen
+    setInterval(function() {
+      if (typeof eventsModule === "undefined" || !eventsModule.connected) {
+        announcementModule.loadDynamicAnnouncements();
+      }
+    }, 60 * 60 * 1000);
     
     // Reset triggered jamaah times at midnight each day
     this.scheduleTriggeredTimesReset();
@@ -112,37 +126,100 @@ var announcementModule = {
   },
 
   // Load dynamic announcements from external file
+  // The server sends only what is showing now, plus when that next changes;
+  // test mode fakes the day and time, so it keeps the whole file itself.
+  // After the first load only changes are fetched (?since=<version>), and
+  // nothing at all (304) when the version is unchanged.
   loadDynamicAnnouncements: function () {
-    fetch("/static/data/announcements.json")
+    var url = testMode.enabled ? "/api/announcements" : "/api/announcements/active";
+    var headers = {};
+    if (announcementsVersion) {
+      url += "?since=" + encodeURIComponent(announcementsVersion);
+      headers["If-None-Match"] = '"' + announcementsVersion + '"';
+    }
+    fetch(url, { headers: headers })
       .then((response) => {
+        if (response.status === 304) {
+          return null;
+        }
         if (!response.ok) {
           throw new Error("Network response was not ok: " + response.status);
         }
         return response.json();
       })
       .then((data) => {
-        if (Array.isArray(data)) {
-          dynamicAnnouncements = data;
-          console.log(
-            "Loaded dynamic announcements:",
-            dynamicAnnouncements.length
-          );
-        } else {
-          console.error("Invalid announcements data format:", data);
-          dynamicAnnouncements = [];
+        if (data === null) {
+          console.log("Announcements unchanged:", announcementsVersion);
+          if (!testMode.enabled) {
+            this.scheduleAnnouncementsRefresh(announcementsNextChange);
+          }
+          return;
+        }
+        if (!data || !data.version) {
+          throw new Error("Invalid announcements data format");
         }
+        this.applyAnnouncementsFeed(data);
+        console.log(
+          "Loaded announcements:",
+          dynamicAnnouncements.length,
+          data.announcements ? "(full)" : "(" + data.changed.length + " changed, " + data.removed.length + " removed)"
+        );
         // Update announcements immediately after loading
         this.updateAnnouncement();
       })
       .catch((error) => {
         console.error("Error loading dynamic announcements:", error);
-        // Fallback to empty array if loading fails
+        // Fallback to empty array if loading fails; the next load is a full one
         dynamicAnnouncements = [];
+        announcementEntries = {};
+        announcementsVersion = null;
         // Still attempt to update announcements with default values
         this.updateAnnouncement();
       });
   },
 
+  // Apply a full list or a delta from the versioned announcements feed
+  applyAnnouncementsFeed: function (data) {
+    var order;
+    if (data.announcements) {
+      announcementEntries = {};
+      order = [];
+      data.announcements.forEach(function (entry) {
+        announcementEntries[entry.id] = entry;
+        order.push(entry.id);
+      });
+    } else {
+      data.removed.forEach(function (id) {
+        delete announcementEntries[id];
+      });
+      data.changed.forEach(function (entry) {
+        announcementEntries[entry.id] = entry;
+      });
+      order = data.order;
+    }
+    dynamicAnnouncements = order
+      .map(function (id) { return announcementEntries[id]; })
+      .filter(Boolean);
+    announcementsVersion = data.version;
+    announcementControls = data.controls || null;
+    announcementsNextChange = data.next_change || null;
+    if (!testMode.enabled) {
+      this.scheduleAnnouncementsRefresh(announcementsNextChange);
+    }
+  },
+
+  // Fetch again just after the next start/end (at most every 6 hours)
+  scheduleAnnouncementsRefresh: function (nextChange) {
+    clearTimeout(announcementsRefreshTimer);
+    var delay = 6 * 60 * 60 * 1000;
+    if (nextChange) {
+      delay = Math.min(delay, Math.max(1000, new Date(nextChange).getTime() - Date.now() + 1000));
+    }
+    announcementsRefreshTimer = setTimeout(function () {
+      announcementModule.loadDynamicAnnouncements();
+    }, delay);
+  },
+
   // Find active announcement from the dynamic list based on current date/time
   getActiveDynamicAnnouncement: function (now) {
     // Ensure dynamicAnnouncements exists and has items
@@ -858,7 +935,7 @@ var announcementModule = {
 
     // Create the image element
     var imgElement = document.createElement("img");
-    imgElement.src = "/static/images/Tafseer of the Quran.jpg";
+    imgElement.src = announcementModule.imageUrl("/static/images/Tafseer of the Quran.jpg");
     imgElement.style.maxWidth = "100%"; // Increased from 90%
     imgElement.style.maxHeight = "100%"; // Added maxHeight to fill container height
     imgElement.style.height = "auto";
@@ -991,6 +1068,15 @@ var announcementModule = {
     }
   },
 
+  // Poster URL sized for this screen: /images/... picks a resized
+  // AVIF/WebP/JPEG copy when one has been built (see images.py)
+  imageUrl: function (imagePath) {
+    var prefix = "/static/images/";
+    if (!imagePath || imagePath.indexOf(prefix) !== 0) return imagePath;
+    var width = Math.round(window.screen.width * (window.devicePixelRatio || 1));
+    return "/images/" + imagePath.substring(prefix.length) + "?w=" + width;
+  },
+
   // Display a single image for a specified duration
   displaySingleImage: function (imagePath, duration) {
     console.log("DEBUG: displaySingleImage called for:", imagePath, "duration:", duration);
@@ -1002,7 +1088,7 @@ var announcementModule = {
     if (existingSlideshow) {
       var existingImg = existingSlideshow.querySelector('img');
       var currentImageName = imagePath.split('/').pop();
-      var existingImageName = existingImg ? existingImg.src.split('/').pop() : '';
+      var existingImageName = existingImg ? existingImg.src.split('/').pop().split('?')[0] : '';
       
       console.log("DEBUG: Comparing images - current:", currentImageName, "existing:", existingImageName);
       
@@ -1090,7 +1176,7 @@ var announcementModule = {
 
     // Create the image element
     var imgElement = document.createElement("img");
-    imgElement.src = imagePath;
+    imgElement.src = announcementModule.imageUrl(imagePath);
     imgElement.style.maxWidth = "100%";
     imgElement.style.maxHeight = "100%";
     imgElement.style.height = "auto";
@@ -1265,7 +1351,7 @@ var announcementModule = {
 
       setTimeout(function () {
         // Set new image source
-        imgElement.src = images[currentIndex];
+        imgElement.src = announcementModule.imageUrl(images[currentIndex]);
 
         // When image loads, fade it in
         imgElement.onload = function () {
@@ -1343,7 +1429,7 @@ var announcementModule = {
       setTimeout(showNextImage, imageDisplayTime);
     };
     // Set the first image
-    imgElement.src = images[0];
+    imgElement.src = announcementModule.imageUrl(images[0]);
 
     // Safety timeout to ensure cleanup happens
     setTimeout(function () {
@@ -1608,26 +1694,55 @@ var announcementModule = {
     displayState.adhkarTotalPages = config.display.pageCount || 1;
     displayState.adhkarTotalCycles = config.display.repeatCycles || 1;
 
-    // Load the text file if not already loaded
-    if (!displayState.adhkarText) {
-      fetch(config.textFile)
-        .then(function(response) {
-          if (!response.ok) {
-            throw new Error("Failed to load adhkar text: " + response.status);
-          }
-          return response.text();
-        })
-        .then(function(text) {
-          displayState.adhkarText = text;
-          self.showAdhkarPage(config);
-        })
-        .catch(function(error) {
-          console.error("Error loading adhkar text:", error);
-          self.cleanupAdhkarDisplay();
-        });
-    } else {
+    // Load the pages if not already loaded for this file and split
+    var url = this.adhkarPagesUrl(config);
+    if (displayState.adhkarPages && displayState.adhkarPagesUrl === url) {
       this.showAdhkarPage(config);
+      return;
     }
+    fetch(url)
+      .then(function(response) {
+        if (!response.ok) {
+          throw new Error("Failed to load adhkar text: " + response.status);
+        }
+        return url === config.textFile ? response.text() : response.json();
+      })
+      .then(function(data) {
+        // The server sends the pages ready to render; other files are split here
+        displayState.adhkarPages = typeof data === 'string'
+          ? self.splitAdhkarText(data, config.display.pageDistribution || [100])
+          : data.pages;
+        displayState.adhkarPagesUrl = url;
+        self.showAdhkarPage(config);
+      })
+      .catch(function(error) {
+        console.error("Error loading adhkar text:", error);
+        self.cleanupAdhkarDisplay();
+      });
+  },
+
+  // The server splits the standard adhkar file into pages (/api/adhkar);
+  // any other text file is fetched as it is
+  adhkarPagesUrl: function(config) {
+    if (config.textFile !== ADHKAR_TEXT_FILE) {
+      return config.textFile;
+    }
+    var display = config.display;
+    var url = "/api/adhkar?pages=" + (display.pageCount || 1);
+    if (display.pageDistribution && display.pageDistribution.length === (display.pageCount || 1)) {
+      url += "&distribution=" + display.pageDistribution.join(",");
+    }
+    return url;
+  },
+
+  // Split text into verses using <br> as separator, then into pages
+  splitAdhkarText: function(text, pageDistribution) {
+    var verses = text.split('<br>').filter(function(verse) {
+      return verse.trim().length > 0;
+    });
+    return this.distributeVersesAcrossPages(verses, pageDistribution).map(function(pageVerses) {
+      return pageVerses.join('<br>');
+    });
   },
 
   // Distribute verses across pages based on percentage, respecting verse boundaries
@@ -1668,21 +1783,10 @@ var announcementModule = {
   showAdhkarPage: function (config) {
     var display = config.display;
     var pageCount = display.pageCount || 1;
-    var pageDistribution = display.pageDistribution || [100];
     var currentPage = displayState.adhkarCurrentPage;
 
-    // Split text into verses using <br> as separator
-    var fullText = displayState.adhkarText;
-    var verses = fullText.split('<br>').filter(function(verse) {
-      return verse.trim().length > 0;
-    });
-
-    // Distribute verses across pages based on percentage, respecting verse boundaries
-    var pageVerses = this.distributeVersesAcrossPages(verses, pageDistribution);
-    
-    // Get verses for current page
-    var currentPageVerses = pageVerses[currentPage] || [];
-    var pageText = currentPageVerses.join('<br>');
+    // Pages are already split, verse boundaries respected
+    var pageText = displayState.adhkarPages[currentPage] || '';
 
     // Create and show the display
     var totalCycles = displayState.adhkarTotalCycles;
@@ -1814,7 +1918,7 @@ var announcementModule = {
 
     // Create image element
     var imgElement = document.createElement("img");
-    imgElement.src = imagePath;
+    imgElement.src = announcementModule.imageUrl(imagePath);
     imgElement.style.maxWidth = "90%";
     imgElement.style.height = "auto";
     imgElement.style.opacity = "0";
@@ -0,0 +1,60 @@
+/**
+ * Prayer Times Application - Events Module
+ * Listens to the server's /events stream (Server-Sent Events) so the display
+ * reacts to a new day, timetable or announcements instead of polling for them
+ */
+
+var eventsModule = {
+  source: null,
+  connected: false,
+  serverOffset: 0, // server clock minus this display's clock, in ms; added to the displayed clock
+
+  // Open the stream; the browser reconnects by itself if it drops
+  init: function() {
+    if (testMode.enabled || typeof EventSource === "undefined") {
+      return; // Keep the polling fallbacks in main.js/announcements.js
+    }
+
+    var source = new EventSource("/events");
+    this.source = source;
+
+    source.onopen = function() {
+      eventsModule.connected = true;
+    };
+    source.onerror = function() {
+      eventsModule.connected = false;
+    };
+
+    source.addEventListener("day", function() {
+      timeModule.persistentRefresh();
+    });
+    source.addEventListener("timetable", function() {
+      timeModule.persistentRefresh();
+    });
+    source.addEventListener("announcements", function() {
+      announcementModule.loadDynamicAnnouncements();
+    });
+    source.addEventListener("time", function(event) {
+      eventsModule.syncTime(JSON.parse(event.data));
+    });
+    // Sent when we were disconnected for too long to replay what we missed
+    source.addEventListener("resync", function() {
+      timeModule.persistentRefresh();
+      announcementModule.loadDynamicAnnouncements();
+    });
+  },
+
+  // Resync the clock display against the server's time
+  syncTime: function(data) {
+    // After a deploy every display hears this at once: spread the reloads
+    timeModule.checkPageBuild(data.page_build, timeModule.refreshPolicy.offset_ms);
+    this.serverOffset = data.utc_ms - Date.now();
+    if (Math.abs(this.serverOffset) > 2000) {
+      console.warn("Display clock differs from server by", Math.round(this.serverOffset / 1000), "seconds");
+    }
+    if (window.timeUpdateTimeout) {
+      clearTimeout(window.timeUpdateTimeout);
+    }
+    timeModule.updateTime();
+  }
+};
@@ -32,6 +32,12 @@ var app = {  // Initialize the application
     // Initialize theme system
     themeModule.init();
 
+    // Where this display refreshes within the fleet's refresh window
+    timeModule.loadRefreshPolicy();
+
+    // Listen for pushed changes (new day, timetable, announcements, time sync)
+    eventsModule.init();
+
     // Store interval reference for cleanup
     window.mainInterval = setInterval(function() {
       // Handle regular UI updates
@@ -123,7 +129,8 @@ var app = {  // Initialize the application
         }
       }
 
-      if (shouldRefresh) {
+      // Scheduled refreshes are only a fallback when the /events stream is down
+      if (shouldRefresh && !eventsModule.connected) {
         timeModule.persistentRefresh();
       }
 
@@ -143,7 +150,11 @@ var app = {  // Initialize the application
     }, 1000);
 
     // Force time sync every 30 seconds as a backup measure
+    // (the /events stream sends a time sync when it is connected)
     window.timeRefreshInterval = setInterval(function() {
+      if (eventsModule.connected) {
+        return;
+      }
       if (window.timeUpdateTimeout) {
         clearTimeout(window.timeUpdateTimeout);
       }
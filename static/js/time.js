@@ -4,9 +4,14 @@
  */
 
 var timeModule = {
+  // This display's clock, corrected by the server's (see eventsModule.syncTime)
+  now: function() {
+    return new Date(Date.now() + eventsModule.serverOffset);
+  },
+
   // Updates the digital clock display
   updateTime: function() {
-    var now = testMode.enabled ? testMode.getMockDate() : new Date();    // Get time components, applying Irish offset only when NOT in test mode
+    var now = testMode.enabled ? testMode.getMockDate() : timeModule.now();    // Get time components, applying Irish offset only when NOT in test mode
     var hours, minutes, seconds;
 
     if (testMode.enabled) {
@@ -96,7 +101,7 @@ var timeModule = {
   
   // Handle page refresh at specific times (midnight and 4:30 PM)
   forceMidnightRefresh: function() {
-    var now = testMode.enabled ? testMode.getMockDate() : new Date();
+    var now = testMode.enabled ? testMode.getMockDate() : timeModule.now();
 
     // Get Irish time
     var isIrishSummerTime = dateUtils.isIrelandDST(now);
@@ -164,26 +169,145 @@ var timeModule = {
     }
   },
   
-  // Keep trying to refresh the page until successful
+  // How this display spreads out its refreshes (see refresh_policy.py);
+  // replaced by the server's policy once loadRefreshPolicy() succeeds
+  refreshPolicy: {
+    offset_ms: Math.floor(Math.random() * 120000),
+    window_seconds: 120,
+    retry: { initial_seconds: 30, max_seconds: 600, multiplier: 2 }
+  },
+  refreshPending: false,
+  reloadPending: false,
+
+  // A random id kept in localStorage, so the server gives this display
+  // the same place in the refresh window every time
+  displayId: function() {
+    var id = null;
+    try {
+      id = localStorage.getItem("displayId");
+      if (!id) {
+        id = Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+        localStorage.setItem("displayId", id);
+      }
+    } catch (e) {
+      // No storage (private mode): the server falls back to address and browser
+    }
+    return id;
+  },
+
+  loadRefreshPolicy: function() {
+    var id = this.displayId();
+    var xhr = new XMLHttpRequest();
+    xhr.open('GET', '/api/refresh-policy' + (id ? '?device=' + encodeURIComponent(id) : ''), true);
+    xhr.onreadystatechange = function () {
+      if (xhr.readyState === 4 && xhr.status === 200) {
+        timeModule.refreshPolicy = JSON.parse(xhr.responseText);
+      }
+    };
+    xhr.send();
+  },
+
+  // Delay before retry number `attempt` (0 for the first): backs off up to
+  // max_seconds, randomised between half and all of it so that displays
+  // which failed together don't all retry together
+  retryDelay: function(attempt) {
+    var retry = this.refreshPolicy.retry;
+    var seconds = Math.min(retry.max_seconds, retry.initial_seconds * Math.pow(retry.multiplier, attempt));
+    return Math.round(seconds * 1000 * (0.5 + Math.random() / 2));
+  },
+
+  // Keep trying to refresh the day's data until successful. The first try
+  // waits for this display's offset in the refresh window, so a fleet asked
+  // to refresh at the same moment doesn't all ask the server at once;
+  // calls while a refresh is already waiting or retrying are ignored.
   persistentRefresh: function() {
-    var retryInterval = 30000;
-    var url = window.location.pathname + "?t=" + new Date().getTime();
+    if (timeModule.refreshPending) {
+      return;
+    }
+    timeModule.refreshPending = true;
+    var attempt = 0;
+    // Each mosque's page says where its day data lives (/api/day or /api/<mosque_id>/day)
+    var dayUrl = document.body.getAttribute("data-day-url") || "/api/day";
 
     function tryRefresh() {
       var xhr = new XMLHttpRequest();
-      xhr.open('GET', url, true);
+      xhr.open('GET', dayUrl, true);
       xhr.onreadystatechange = function () {
         if (xhr.readyState === 4) {
           if (xhr.status === 200) {
-            window.location.reload(true);
-          } else {
-            setTimeout(tryRefresh, retryInterval);
+            try {
+              timeModule.applyDayData(JSON.parse(xhr.responseText));
+              timeModule.refreshPending = false;
+              // This request already waited for the display's offset
+              timeModule.checkPageBuild(xhr.getResponseHeader("X-Page-Build"), 0);
+              return;
+            } catch (e) {
+              // A cut-off or garbled response is retried like a failed one
+              console.error("Error applying day data:", e);
+            }
           }
+          setTimeout(tryRefresh, timeModule.retryDelay(attempt));
+          attempt++;
         }
       };
       xhr.send();
     }
 
-    tryRefresh();
+    setTimeout(tryRefresh, testMode.enabled ? 0 : timeModule.refreshPolicy.offset_ms);
+  },
+
+  // Reload the whole page, after `delay` ms, when the server is running a
+  // different build (page_build in app.py) from the one this page came
+  // from, so template and JS/CSS changes reach displays that never restart
+  checkPageBuild: function(build, delay) {
+    if (!build || timeModule.reloadPending || build === document.body.getAttribute("data-page-build")) {
+      return;
+    }
+    timeModule.reloadPending = true;
+    setTimeout(function() {
+      window.location.reload();
+    }, testMode.enabled ? 0 : delay);
+  },
+
+  // Patch a /api/day response into the page instead of reloading it
+  applyDayData: function(data) {
+    var tomorrow = data.tomorrow || data.today;
+
+    function setTime(el, todayTime, tomorrowTime) {
+      if (!el) return;
+      el.setAttribute("data-time", todayTime);
+      el.setAttribute("data-tomorrow", tomorrowTime);
+      el.textContent = todayTime;
+    }
+
+    var gregorianDate = document.querySelector(".gregorian-date");
+    if (gregorianDate) {
+      gregorianDate.textContent = data.gregorian_date;
+    }
+    var islamicDate = document.querySelector(".islamic-date");
+    if (islamicDate) {
+      islamicDate.textContent = data.islamic_date;
+    }
+
+    // Same column order as templates/index.html (Jumu'ah is handled by prayerModule)
+    var prayers = ["fajr", "zohr", "asar", "magrib", "isha"];
+    var beginning = document.querySelectorAll(".prayer-time-value.beginning[data-time]");
+    var jamaah = document.querySelectorAll(".prayer-time-value.jamaah:not(#jumuah-time)");
+    for (var i = 0; i < prayers.length; i++) {
+      var prayer = prayers[i];
+      setTime(beginning[i], data.today.beginning[prayer], tomorrow.beginning[prayer]);
+      setTime(jamaah[i], data.today.jamaah[prayer], tomorrow.jamaah[prayer]);
+    }
+
+    var important = ["sehri_ends", "sunrise", "noon"];
+    var importantEls = document.querySelectorAll(".time-box .time-value");
+    for (var j = 0; j < important.length; j++) {
+      var key = important[j];
+      setTime(importantEls[j], data.today.important[key], tomorrow.important[key]);
+    }
+
+    timeModule.convertTo12Hour();
+    prayerModule.updateToNextDayTimesIfNeeded();
+    prayerModule.updateNextPrayer();
   }
 };
@@ -0,0 +1,137 @@
+"""
+MULTI-MOSQUE TIMETABLES
+=======================
+
+Lets one deployment serve many mosques. Each mosque has its own CSV at
+`data/<mosque_id>/prayer_times.csv`; its timetable is loaded the first
+time it is asked for and kept in a size-bounded LRU cache.
+
+HOW TO USE:
+-----------
+    store = TimetableStore(load_timetable, max_bytes=32 * 1024 * 1024)
+    timetable = store.get('dublin-central')   # loads on first use
+    store.memory_by_tenant()                  # {'dublin-central': 12840, ...}
+
+IMPORTANT NOTES:
+---------------
+- Mosque ids are restricted to lowercase letters, digits, '-' and '_'
+  (see `is_valid_mosque_id`) so they can never point outside `data/`.
+- A load happens outside the store's lock: while one mosque's CSV is
+  being read, requests for every other mosque are still served. Requests
+  for the mosque being loaded wait for that one load instead of reading
+  the file again.
+- When the cached timetables together use more than `max_bytes`
+  (measured with `Timetable.memory_size()`), the least recently used
+  ones are dropped. They are simply loaded again the next time.
+- A failed load (e.g. no such mosque) is not cached; the error is raised
+  to every request that was waiting for it.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from render_cache import SingleFlight
+from timetable import Timetable
+
+
+_MOSQUE_ID = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+
+def is_valid_mosque_id(mosque_id: str) -> bool:
+    return bool(_MOSQUE_ID.match(mosque_id))
+
+
+def tenant_csv_path(data_dir: str, mosque_id: str) -> str:
+    """Return data/<mosque_id>/prayer_times.csv for a valid mosque id"""
+    if not is_valid_mosque_id(mosque_id):
+        raise ValueError(f"Invalid mosque id: {mosque_id!r}")
+    return os.path.join(data_dir, mosque_id, 'prayer_times.csv')
+
+
+class TimetableStore:
+    """Lazy, memory-bounded LRU cache of per-mosque timetables"""
+
+    def __init__(self, loader: Callable[[str], Timetable], max_bytes: int = 32 * 1024 * 1024,
+                 max_entries: Optional[int] = None):
+        self._loader = loader
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._timetables = OrderedDict()  # mosque_id -> (timetable, bytes)
+        self._loads = SingleFlight()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, mosque_id: str) -> Timetable:
+        """Return a mosque's timetable, loading it if it is not cached"""
+        with self._lock:
+            cached = self._timetables.get(mosque_id)
+            if cached is not None:
+                self._timetables.move_to_end(mosque_id)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+        return self._loads.do(mosque_id, lambda: self._load(mosque_id))
+
+    @property
+    def coalesced(self) -> int:
+        """Misses that waited for a load already in progress"""
+        return self._loads.coalesced
+
+    def _load(self, mosque_id: str) -> Timetable:
+        # A load that finished between the miss and this flight is used as is
+        with self._lock:
+            cached = self._timetables.get(mosque_id)
+        if cached is not None:
+            return cached[0]
+        timetable = self._loader(mosque_id)
+        self._store(mosque_id, timetable)
+        return timetable
+
+    def _store(self, mosque_id: str, timetable: Timetable):
+        size = timetable.memory_size()
+        with self._lock:
+            previous = self._timetables.pop(mosque_id, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._timetables[mosque_id] = (timetable, size)
+            self._bytes += size
+            # Keep the one just loaded even if it alone is over the limit
+            while len(self._timetables) > 1 and (
+                    self._bytes > self.max_bytes or
+                    (self.max_entries is not None and len(self._timetables) > self.max_entries)):
+                _, (_, evicted_size) = self._timetables.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, mosque_id: str):
+        """Forget one mosque's timetable so the next request reloads it"""
+        with self._lock:
+            cached = self._timetables.pop(mosque_id, None)
+            if cached is not None:
+                self._bytes -= cached[1]
+
+    def clear(self):
+        with self._lock:
+            self._timetables.clear()
+            self._bytes = 0
+
+    def memory_size(self) -> int:
+        """Bytes used by all cached timetables"""
+        return self._bytes
+
+    def memory_by_tenant(self) -> Dict[str, int]:
+        """Bytes used by each cached timetable, least recently used first"""
+        with self._lock:
+            return {mosque_id: size for mosque_id, (_, size) in self._timetables.items()}
+
+    def __contains__(self, mosque_id: str) -> bool:
+        return mosque_id in self._timetables
+
+    def __len__(self) -> int:
+        return len(self._timetables)
@@ -0,0 +1,133 @@
+"""
+Unit tests for the server-side adhkar pages (adhkar.py)
+Tests splitting, caching and the /api/adhkar route.
+"""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adhkar import AdhkarStore, balance, distribute, paginate, parse_distribution, split_verses
+from app import app
+
+
+TEXT = "Title\n\nfirst verse\n<br>\nsecond verse\n<br>\n<br>\nthird verse\nstill third\n<br>\nfourth verse\n"
+
+
+def touch_later(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestPaginate:
+    """Test splitting the text into pages"""
+
+    def test_split_verses(self):
+        """Test <br> separates verses and empty verses are dropped"""
+        verses = split_verses(TEXT)
+        assert len(verses) == 4
+        assert verses[2] == "\nthird verse\nstill third\n"
+
+    def test_distribution_matches_client(self):
+        """Test percentages round like Math.round and the last page takes the rest"""
+        verses = list('abcdefghij')
+        assert distribute(verses, [48, 52]) == [list('abcde'), list('fghij')]
+        assert distribute(verses, [45, 55]) == [list('abcde'), list('fghij')]
+        assert distribute(verses, [1, 1, 98]) == [['a'], ['b'], list('cdefghij')]
+        assert distribute(verses, [100]) == [verses]
+
+    def test_balanced_by_length(self):
+        """Test pages break where the weight is closest to even"""
+        verses = ['x' * 100, 'x' * 100, 'x' * 300, 'x' * 100]
+        assert balance(verses, 2) == [verses[:2], verses[2:]]
+        assert balance(verses, 3) == [verses[:2], verses[2:3], verses[3:]]
+
+    def test_every_page_gets_a_verse(self):
+        """Test one long verse doesn't leave later pages empty"""
+        verses = ['x' * 5000, 'short', 'short']
+        assert balance(verses, 3) == [[verses[0]], [verses[1]], [verses[2]]]
+
+    def test_pages_rejoined(self):
+        """Test each page is its verses joined with <br>, nothing lost"""
+        pages = paginate(TEXT, 2)
+        assert len(pages) == 2
+        assert '<br>'.join(pages) == '<br>'.join(split_verses(TEXT))
+
+    def test_parse_distribution(self):
+        """Test one percentage is needed per page"""
+        assert parse_distribution('48,52', 2) == (48.0, 52.0)
+        assert parse_distribution(None, 2) is None
+        with pytest.raises(ValueError):
+            parse_distribution('100', 2)
+        with pytest.raises(ValueError):
+            parse_distribution('half,half', 2)
+
+
+class TestAdhkarStore:
+    """Test caching the pages"""
+
+    def test_cached_until_file_changes(self, tmp_path):
+        """Test splits are reused, and redone when the file is edited"""
+        path = tmp_path / 'adhkar.txt'
+        path.write_text(TEXT, encoding='utf-8')
+        store = AdhkarStore(str(path))
+
+        first = store.pages(2)
+        assert store.pages(2) is first
+        assert store.pages(2, (50, 50)).version != first.version
+
+        path.write_text(TEXT + "<br>\nfifth verse\n", encoding='utf-8')
+        touch_later(path)
+        changed = store.pages(2)
+        assert changed.version != first.version
+        assert 'fifth verse' in changed.pages[-1]
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing file raises OSError"""
+        with pytest.raises(OSError):
+            AdhkarStore(str(tmp_path / 'missing.txt')).pages(1)
+
+
+class TestAdhkarApi:
+    """Test /api/adhkar"""
+
+    @pytest.fixture
+    def client(self, tmp_path):
+        path = tmp_path / 'adhkar.txt'
+        path.write_text(TEXT, encoding='utf-8')
+        app.config['TESTING'] = True
+        with patch('app._adhkar', AdhkarStore(str(path))):
+            with app.test_client() as client:
+                yield client
+
+    def test_pages(self, client):
+        """Test the text comes back split into the pages asked for"""
+        response = client.get('/api/adhkar?pages=2&distribution=50,50')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['pages'] == paginate(TEXT, 2, (50, 50))
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+    def test_not_modified(self, client):
+        """Test a display that has these pages gets a 304"""
+        etag = client.get('/api/adhkar?pages=2').headers['ETag']
+        response = client.get('/api/adhkar?pages=2', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+
+    def test_bad_parameters(self, client):
+        """Test bad page counts and distributions are 400s"""
+        assert client.get('/api/adhkar?pages=0').status_code == 400
+        assert client.get('/api/adhkar?pages=two').status_code == 400
+        assert client.get('/api/adhkar?pages=2&distribution=100').status_code == 400
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing adhkar file is a 404"""
+        with patch('app._adhkar', AdhkarStore(str(tmp_path / 'missing.txt'))):
+            with app.test_client() as client:
+                assert client.get('/api/adhkar').status_code == 404
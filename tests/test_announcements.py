@@ -0,0 +1,271 @@
+"""
+Unit tests for the announcements index (announcements.py)
+Tests the start/end sweep, weekly and control entries, and file reloads.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from announcements import (AnnouncementIndex, AnnouncementStore, FeedHistory, feed_body, irish_weekday,
+                           next_irish_midnight, parse_datetime)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def dated(id, start, end, **extra):
+    return dict(id=id, startDate=start, endDate=end, message=id, **extra)
+
+
+ENTRIES = [
+    {'id': 'friday_tafseer_control', 'type': 'control', 'hide': True},
+    {'id': 'thursday_darood_control', 'type': 'control', 'hide': False},
+    dated('eid', '2025-06-04T01:00:00+01:00', '2025-06-04T20:30:00+01:00'),
+    dated('eid_evening', '2025-06-04T20:31:00+01:00', '2025-06-05T20:30:00+01:00'),
+    dated('week', '2025-06-01T00:00:00+01:00', '2025-06-07T23:59:59+01:00'),
+    dated('later', '2025-07-01T00:00:00+01:00', '2025-07-02T00:00:00+01:00'),
+    {'id': 'friday_poster', 'type': 'recurring_weekly', 'dayOfWeek': 5, 'images': ['/static/images/a.jpg']},
+    {'id': 'hidden_poster', 'type': 'recurring_weekly', 'dayOfWeek': 5, 'hide': True},
+    {'id': 'adhkar', 'type': 'adhkar_text', 'enabled': True},
+    {'id': 'old_adhkar', 'type': 'adhkar_text', 'enabled': False},
+    dated('backwards', '2025-06-05T00:00:00+01:00', '2025-06-04T00:00:00+01:00'),
+    dated('bad_date', 'soon', '2025-06-04T00:00:00+01:00'),
+    {'message': 'no id', 'startDate': '2025-06-04T00:00:00+01:00', 'endDate': '2025-06-05T00:00:00+01:00'}
+]
+
+
+def ids(entries):
+    return [entry['id'] for entry in entries]
+
+
+class TestTimes:
+    """Test parsing times and Irish calendar helpers"""
+
+    def test_parse_datetime(self):
+        """Test offsets are converted to UTC and a missing offset means UTC"""
+        assert parse_datetime('2025-06-04T20:30:00+01:00') == utc(2025, 6, 4, 19, 30)
+        assert parse_datetime('2025-06-04T20:30:00Z') == utc(2025, 6, 4, 20, 30)
+        assert parse_datetime('2025-06-04T20:30') == utc(2025, 6, 4, 20, 30)
+
+    def test_irish_weekday(self):
+        """Test the weekday follows Irish clocks (0 = Sunday)"""
+        assert irish_weekday(utc(2025, 6, 6, 12, 0)) == 5
+        # 23:30 UTC on Thursday is already Friday in Irish summer time
+        assert irish_weekday(utc(2025, 6, 5, 23, 30)) == 5
+        assert irish_weekday(utc(2025, 1, 2, 23, 30)) == 4
+
+    def test_next_irish_midnight(self):
+        """Test midnight is 23:00 UTC in summer and 00:00 UTC in winter"""
+        assert next_irish_midnight(utc(2025, 6, 4, 12, 0)) == utc(2025, 6, 4, 23, 0)
+        assert next_irish_midnight(utc(2025, 1, 4, 12, 0)) == utc(2025, 1, 5, 0, 0)
+        # Clocks go forward at 01:00 UTC on 30 March 2025
+        assert next_irish_midnight(utc(2025, 3, 29, 12, 0)) == utc(2025, 3, 30, 0, 0)
+        assert next_irish_midnight(utc(2025, 3, 30, 12, 0)) == utc(2025, 3, 30, 23, 0)
+
+
+class TestAnnouncementIndex:
+    """Test the interval index"""
+
+    def test_dated_lookup(self):
+        """Test only announcements whose start/end contain the instant are active"""
+        index = AnnouncementIndex(ENTRIES)
+
+        assert ids(index.dated_at(utc(2025, 5, 31, 12, 0))) == []
+        assert ids(index.dated_at(utc(2025, 6, 3, 12, 0))) == ['week']
+        assert ids(index.dated_at(utc(2025, 6, 4, 12, 0))) == ['week', 'eid']
+        assert ids(index.dated_at(utc(2025, 6, 4, 19, 30, 30))) == ['week']
+        assert ids(index.dated_at(utc(2025, 6, 4, 19, 31))) == ['week', 'eid_evening']
+        assert ids(index.dated_at(utc(2025, 8, 1))) == []
+
+    def test_start_and_end_inclusive(self):
+        """Test the exact startDate and endDate are both inside"""
+        index = AnnouncementIndex(ENTRIES)
+
+        assert 'eid' in ids(index.dated_at(utc(2025, 6, 4, 0, 0)))
+        assert 'eid' in ids(index.dated_at(utc(2025, 6, 4, 19, 30)))
+        assert 'eid' not in ids(index.dated_at(utc(2025, 6, 4, 19, 30, 0, 1)))
+
+    def test_matches_linear_scan(self):
+        """Test the sweep agrees with checking every entry, hour by hour"""
+        index = AnnouncementIndex(ENTRIES)
+        entries = [(parse_datetime(entry['startDate']), parse_datetime(entry['endDate']), entry['id'])
+                   for entry in ENTRIES if entry.get('id') in ('eid', 'eid_evening', 'week', 'later')]
+
+        at = utc(2025, 5, 30)
+        while at < utc(2025, 7, 5):
+            expected = sorted(id for start, end, id in entries if start <= at <= end)
+            assert sorted(ids(index.dated_at(at))) == expected, at
+            at += timedelta(hours=1)
+
+    def test_skips_invalid_entries(self):
+        """Test entries without an id, with bad dates or ending before they start are skipped"""
+        index = AnnouncementIndex(ENTRIES)
+
+        assert ids(entry for _, _, entry in index.dated) == ['week', 'eid', 'eid_evening', 'later']
+
+    def test_active_resolves_controls_weekly_and_adhkar(self):
+        """Test controls, the day's weekly posters and enabled adhkar are returned"""
+        index = AnnouncementIndex(ENTRIES)
+
+        friday = index.active(utc(2025, 6, 6, 12, 0))
+        assert ids(friday.announcements) == ['week', 'friday_poster', 'adhkar']
+        assert friday.controls == {'friday_tafseer_control': True, 'thursday_darood_control': False}
+
+        thursday = index.active(utc(2025, 6, 5, 12, 0))
+        assert ids(thursday.announcements) == ['week', 'eid_evening', 'adhkar']
+
+    def test_next_change(self):
+        """Test next_change is the next start/end, or Irish midnight if sooner"""
+        index = AnnouncementIndex(ENTRIES)
+
+        # Next boundary is eid's end (20:30 Irish, plus one microsecond)
+        assert index.active(utc(2025, 6, 4, 12, 0)).next_change == utc(2025, 6, 4, 19, 30, 0, 1)
+        # Weekly posters change at Irish midnight, before 'later' starts
+        assert index.active(utc(2025, 6, 20, 12, 0)).next_change == utc(2025, 6, 20, 23, 0)
+
+        without_weekly = AnnouncementIndex([entry for entry in ENTRIES if entry.get('type') != 'recurring_weekly'])
+        assert without_weekly.active(utc(2025, 6, 20, 12, 0)).next_change == utc(2025, 6, 30, 23, 0)
+        assert without_weekly.active(utc(2025, 8, 1)).next_change is None
+
+    def test_upcoming(self):
+        """Test announcements that haven't started are listed soonest first"""
+        index = AnnouncementIndex(ENTRIES)
+
+        assert ids(index.upcoming(utc(2025, 5, 1))) == ['week', 'eid', 'eid_evening', 'later']
+        assert ids(index.upcoming(utc(2025, 6, 4, 12, 0), limit=1)) == ['eid_evening']
+        assert index.upcoming(utc(2025, 8, 1)) == []
+
+    def test_empty(self):
+        """Test an empty file has nothing active"""
+        active = AnnouncementIndex([]).active(utc(2025, 6, 4))
+        assert active.announcements == [] and active.controls == {} and active.next_change is None
+
+
+class TestAnnouncementStore:
+    """Test reloading the file"""
+
+    def write(self, path, entries, later=0):
+        path.write_text(json.dumps(entries), encoding='utf-8')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + later * 10 ** 9))
+
+    def test_reloads_when_changed(self, tmp_path):
+        """Test the index is rebuilt only when the file changes"""
+        path = tmp_path / 'announcements.json'
+        self.write(path, ENTRIES[:3])
+        store = AnnouncementStore(str(path))
+
+        first = store.get()
+        assert store.get() is first
+        assert ids(first.active(utc(2025, 6, 4, 12, 0)).announcements) == ['eid']
+
+        self.write(path, ENTRIES[:4] + [dated('new', '2025-06-04T00:00:00Z', '2025-06-04T23:00:00Z')], later=1)
+        assert ids(store.get().active(utc(2025, 6, 4, 12, 0)).announcements) == ['eid', 'new']
+
+    def test_keeps_last_good_index(self, tmp_path):
+        """Test a half-edited (invalid) file doesn't wipe the announcements"""
+        path = tmp_path / 'announcements.json'
+        self.write(path, ENTRIES[:3])
+        store = AnnouncementStore(str(path))
+        first = store.get()
+
+        path.write_text('[{"id": ', encoding='utf-8')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert store.get() is first
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing file means no announcements"""
+        assert len(AnnouncementStore(str(tmp_path / 'missing.json')).get()) == 0
+
+
+class TestVersionedFeed:
+    """Test versions and deltas"""
+
+    def test_version_follows_content(self):
+        """Test the version changes with any entry and not otherwise"""
+        first = AnnouncementIndex(ENTRIES).snapshot.version
+        assert AnnouncementIndex([dict(entry) for entry in ENTRIES]).snapshot.version == first
+
+        edited = [dict(entry) for entry in ENTRIES]
+        edited[2]['message'] = 'Eid Mubarak'
+        assert AnnouncementIndex(edited).snapshot.version != first
+
+    def test_duplicate_ids_ignored(self):
+        """Test only the first entry with an id is kept"""
+        index = AnnouncementIndex(ENTRIES[:3] + [dated('eid', '2030-01-01T00:00:00Z', '2030-01-02T00:00:00Z')])
+        assert index.by_id['eid']['startDate'] == '2025-06-04T01:00:00+01:00'
+        assert len(index) == 3
+
+    def test_delta(self):
+        """Test a delta lists added and changed entries and removed ids"""
+        history = FeedHistory()
+        old = AnnouncementIndex(ENTRIES[:4])
+        history.record(old.snapshot)
+
+        entries = [dict(entry) for entry in ENTRIES[:2] + ENTRIES[3:5]]
+        entries[2]['message'] = 'Eid evening, updated'
+        new = AnnouncementIndex(entries)
+        history.record(new.snapshot)
+
+        body = feed_body(new.snapshot, new.by_id, history, old.snapshot.version)
+        assert body['version'] == new.snapshot.version
+        assert body['since'] == old.snapshot.version
+        assert ids(body['changed']) == ['eid_evening', 'week']
+        assert body['removed'] == ['eid']
+        assert body['order'] == ['friday_tafseer_control', 'thursday_darood_control', 'eid_evening', 'week']
+
+    def test_unchanged_delta_is_empty(self):
+        """Test asking since the current version returns no entries"""
+        history = FeedHistory()
+        index = AnnouncementIndex(ENTRIES)
+        history.record(index.snapshot)
+
+        body = feed_body(index.snapshot, index.by_id, history, index.snapshot.version)
+        assert body['changed'] == [] and body['removed'] == []
+
+    def test_unknown_version_gets_full_list(self):
+        """Test an unknown or expired version gets everything"""
+        history = FeedHistory(max_versions=1)
+        old = AnnouncementIndex(ENTRIES[:3])
+        new = AnnouncementIndex(ENTRIES)
+        history.record(old.snapshot)
+        history.record(new.snapshot)
+
+        for since in (None, 'unknown', old.snapshot.version):
+            body = feed_body(new.snapshot, new.by_id, history, since)
+            assert ids(body['announcements']) == list(new.by_id)
+            assert 'changed' not in body
+
+    def test_active_version(self):
+        """Test an active answer's version changes with its entries and next_change"""
+        index = AnnouncementIndex(ENTRIES)
+        morning = index.active_snapshot(index.active(utc(2025, 6, 4, 10, 0)))
+        noon = index.active_snapshot(index.active(utc(2025, 6, 4, 12, 0)))
+        evening = index.active_snapshot(index.active(utc(2025, 6, 4, 19, 31)))
+
+        assert morning.version == noon.version
+        assert morning.order == ('week', 'eid', 'adhkar')
+        assert evening.version != noon.version
+
+    def test_store_records_versions(self, tmp_path):
+        """Test each file version is kept so later clients can get a delta"""
+        path = tmp_path / 'announcements.json'
+        path.write_text(json.dumps(ENTRIES[:3]), encoding='utf-8')
+        store = AnnouncementStore(str(path))
+        first = store.get().snapshot.version
+        assert store.last_modified is not None
+
+        path.write_text(json.dumps(ENTRIES[:4]), encoding='utf-8')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        index = store.get()
+
+        body = feed_body(index.snapshot, index.by_id, store.history, first)
+        assert ids(body['changed']) == ['eid_evening']
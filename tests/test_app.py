@@ -3,6 +3,10 @@ Unit tests for the Flask web application (app.py)
 Tests all functions and routes in the main application module.
 """
 
+import gzip
+import json
+import threading
+import time
 import pytest
 from datetime import datetime, date, timezone, timedelta
 from unittest.mock import patch, mock_open, MagicMock
@@ -12,9 +16,12 @@ import os
 # Add parent directory to Python path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import app as app_module
+from announcements import AnnouncementStore
 from app import (
     app,
     load_prayer_times,
+    get_timetable,
     get_islamic_date,
     calculate_important_times,
     is_ireland_dst,
@@ -22,6 +29,14 @@ from app import (
 )
 
 
+@pytest.fixture(autouse=True)
+def reset_app_caches():
+    """Make every test load its own (usually mocked) prayer times"""
+    app_module.reset_caches()
+    yield
+    app_module.reset_caches()
+
+
 class TestLoadPrayerTimes:
     """Test the load_prayer_times function"""
     
@@ -49,6 +64,53 @@ class TestLoadPrayerTimes:
             assert result == []
 
 
+class TestGetTimetable:
+    """Test the shared in-memory timetable"""
+    
+    def test_get_timetable_indexes_rows(self):
+        """Test rows are looked up by (month, day) with typed fields"""
+        mock_prayer_times = [
+            ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15'],
+            ['3', '16', '05:28', '07:27', '12:50', '16:31', '18:27', '19:47', '05:40', '13:15', '17:15', '18:37', '20:15']
+        ]
+        
+        with patch('app.load_prayer_times', return_value=mock_prayer_times):
+            timetable = get_timetable()
+        
+        row = timetable.get(3, 16)
+        assert row.month == 3
+        assert row.day == 16
+        assert row.fajr_begin == '05:28'
+        assert row[2] == '05:28'
+        assert timetable.get(3, 17) is None
+    
+    def test_get_timetable_loads_once(self):
+        """Test the CSV is only read on first use"""
+        mock_prayer_times = [
+            ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']
+        ]
+        
+        with patch('app.load_prayer_times', return_value=mock_prayer_times) as mock_load:
+            first = get_timetable()
+            second = get_timetable()
+        
+        assert first is second
+        mock_load.assert_called_once()
+    
+    def test_reset_caches_reloads(self):
+        """Test reset_caches forces the next lookup to reload the CSV"""
+        mock_prayer_times = [
+            ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']
+        ]
+        
+        with patch('app.load_prayer_times', return_value=mock_prayer_times) as mock_load:
+            get_timetable()
+            app_module.reset_caches()
+            get_timetable()
+        
+        assert mock_load.call_count == 2
+
+
 class TestGetIslamicDate:
     """Test the get_islamic_date function"""
     
@@ -96,6 +158,8 @@ class TestGetIslamicDate:
         test_date = date(2024, 1, 1)
         
         for i, month_name in enumerate(expected_months, 1):
+            # Conversions are memoised per date, so drop the previous mocked result
+            app_module.reset_caches()
             with patch('hijri_converter.convert.Gregorian') as mock_gregorian:
                 mock_hijri = MagicMock()
                 mock_hijri.day = 1
@@ -107,6 +171,28 @@ class TestGetIslamicDate:
                 assert month_name in result
 
 
+class TestGetIslamicDateCaching:
+    """Test memoisation of Hijri conversions"""
+    
+    def test_get_islamic_date_memoised(self):
+        """Test repeated lookups of a date convert it only once"""
+        with patch('hijri_converter.convert.Gregorian') as mock_gregorian:
+            mock_hijri = MagicMock()
+            mock_hijri.day = 5
+            mock_hijri.month = 9
+            mock_hijri.year = 1445
+            mock_gregorian.return_value.to_hijri.return_value = mock_hijri
+            
+            results = [get_islamic_date(date(2024, 3, 15)) for _ in range(100)]
+        
+        assert set(results) == {"5 Ramadan 1445"}
+        mock_gregorian.assert_called_once_with(2024, 3, 15)
+    
+    def test_get_islamic_date_real_conversion(self):
+        """Test a known conversion without mocks"""
+        assert get_islamic_date(date(2024, 3, 15)) == "5 Ramadan 1445"
+
+
 class TestCalculateImportantTimes:
     """Test the calculate_important_times function"""
     
@@ -245,7 +331,7 @@ class TestFlaskApp:
                 
                 type(mock_now).__add__ = mock_add
                 
-                with patch('app.is_ireland_dst', return_value=False):
+                with patch('irish_time.utc_to_irish', side_effect=lambda now: now):
                     with patch('app.get_islamic_date', return_value='5 Ramadan 1445'):
                         response = client.get('/')
                         
@@ -277,7 +363,7 @@ class TestFlaskApp:
                 
                 type(mock_now).__add__ = mock_add
                 
-                with patch('app.is_ireland_dst', return_value=False):
+                with patch('irish_time.utc_to_irish', side_effect=lambda now: now):
                     with patch('app.calculate_important_times') as mock_calc:
                         mock_calc.return_value = {'sehri_ends': '05:20', 'sunrise': '07:25', 'noon': '12:40'}
                         response = client.get('/')
@@ -312,7 +398,7 @@ class TestFlaskApp:
                 type(mock_now).__add__ = mock_add
                 
                 # Test with DST enabled
-                with patch('app.is_ireland_dst', return_value=True):
+                with patch('irish_time.utc_to_irish', side_effect=lambda now: now + timedelta(hours=1)):
                     response = client.get('/')
                     assert response.status_code == 200
 
@@ -384,7 +470,7 @@ class TestIntegration:
                 
                 type(mock_now).__add__ = mock_add
                 
-                with patch('app.is_ireland_dst', return_value=False):
+                with patch('irish_time.utc_to_irish', side_effect=lambda now: now):
                     with patch('app.get_islamic_date', return_value='5 Ramadan 1445'):
                         response = client.get('/')
                         
@@ -392,3 +478,523 @@ class TestIntegration:
                         # Check that prayer times are properly embedded
                         assert b'05:30' in response.data  # Fajr time
                         assert b'12:50' in response.data  # Zohr time
+
+
+class TestIndexRenderCache:
+    """Test the rendered page cache behind the index route"""
+    
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    
+    @pytest.fixture(autouse=True)
+    def mock_timetable(self):
+        mock_prayer_times = [
+            ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']
+        ]
+        with patch('app.load_prayer_times', return_value=mock_prayer_times):
+            yield
+    
+    def test_index_renders_once_per_day(self, client):
+        """Test repeated requests reuse the rendered page"""
+        with patch('app.render_index', return_value='<html>cached</html>') as mock_render:
+            first = client.get('/')
+            second = client.get('/?t=12345')
+        
+        assert first.status_code == 200
+        assert second.data == b'<html>cached</html>'
+        mock_render.assert_called_once()
+    
+    def test_index_sets_etag_and_cache_control(self, client):
+        """Test the page carries a strong ETag and must be revalidated"""
+        with patch('app.render_index', return_value='<html>cached</html>'):
+            response = client.get('/')
+        
+        etag, is_weak = response.get_etag()
+        assert etag
+        assert is_weak is False
+        assert response.headers['Cache-Control'] == 'no-cache'
+    
+    def test_index_not_modified(self, client):
+        """Test a matching If-None-Match gets a 304 without rendering again"""
+        with patch('app.render_index', return_value='<html>cached</html>') as mock_render:
+            etag = client.get('/').get_etag()[0]
+            response = client.get('/', headers={'If-None-Match': f'"{etag}"'})
+        
+        assert response.status_code == 304
+        assert response.data == b''
+        mock_render.assert_called_once()
+    
+    def test_index_stale_etag(self, client):
+        """Test an old ETag gets the full page"""
+        with patch('app.render_index', return_value='<html>cached</html>'):
+            response = client.get('/', headers={'If-None-Match': '"stale"'})
+        
+        assert response.status_code == 200
+        assert response.data == b'<html>cached</html>'
+    
+    def test_index_rerenders_when_timetable_changes(self, client):
+        """Test a new timetable version invalidates the cached page"""
+        with patch('app.render_index', return_value='<html>cached</html>') as mock_render:
+            client.get('/')
+            app_module._timetable = None
+            with patch('app.load_prayer_times', return_value=[
+                ['3', '15', '05:31', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']
+            ]):
+                client.get('/')
+        
+        assert mock_render.call_count == 2
+
+
+    def test_grid_rendered_once_per_day(self, client):
+        """Test the prayer grid is reused when the page around it is rendered again"""
+        app.jinja_env.cache.clear()
+        with patch('app.render_prayer_grid_html', wraps=app_module.render_prayer_grid_html) as mock_grid:
+            with patch('app.get_irish_time', return_value=datetime(2025, 3, 15, 12, 0, tzinfo=timezone.utc)):
+                first = client.get('/')
+                app_module._index_cache.clear()
+                second = client.get('/')
+        
+        assert first.status_code == 200
+        assert first.data == second.data
+        assert b'data-time="05:30"' in first.data
+        mock_grid.assert_called_once()
+
+
+class TestApiDay:
+    """Test the /api/day JSON endpoint"""
+    
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    
+    @pytest.fixture(autouse=True)
+    def mock_timetable(self):
+        mock_prayer_times = [
+            ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15'],
+            ['3', '16', '05:28', '07:27', '12:50', '16:31', '18:27', '19:47', '05:40', '13:15', '17:15', '18:37', '20:15']
+        ]
+        with patch('app.load_prayer_times', return_value=mock_prayer_times):
+            with patch('app.get_islamic_date', return_value='5 Ramadan 1445'):
+                yield
+    
+    def test_api_day_with_date(self, client):
+        """Test the payload for a given date"""
+        response = client.get('/api/day?date=2024-03-15')
+        data = response.get_json()
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        assert data['date'] == '2024-03-15'
+        assert data['gregorian_date'] == 'Fri 15 Mar 2024'
+        assert data['islamic_date'] == '5 Ramadan 1445'
+        assert data['version'] == get_timetable().version
+        assert data['today']['beginning'] == {
+            'fajr': '05:30', 'sunrise': '07:25', 'zohr': '12:50',
+            'asar': '16:30', 'magrib': '18:25', 'isha': '19:45'
+        }
+        assert data['today']['jamaah'] == {
+            'fajr': '05:40', 'zohr': '13:15', 'asar': '17:15',
+            'magrib': '18:35', 'isha': '20:15'
+        }
+        assert data['today']['important'] == {'sehri_ends': '05:20', 'sunrise': '07:25', 'noon': '12:40'}
+        assert data['tomorrow']['beginning']['fajr'] == '05:28'
+    
+    def test_api_day_uses_precomputed_important_times(self, client):
+        """Test the request path does not recalculate important times"""
+        with patch('app.calculate_important_times', side_effect=AssertionError('recalculated')):
+            data = client.get('/api/day?date=2024-03-16').get_json()
+        
+        assert data['today']['important'] == {'sehri_ends': '05:18', 'sunrise': '07:27', 'noon': '12:40'}
+    
+    def test_api_day_without_tomorrow(self, client):
+        """Test the last day of the timetable has no tomorrow"""
+        data = client.get('/api/day?date=2024-03-16').get_json()
+        
+        assert data['today']['beginning']['fajr'] == '05:28'
+        assert data['tomorrow'] is None
+    
+    def test_api_day_defaults_to_irish_today(self, client):
+        """Test the date defaults to today's Irish date"""
+        with patch('app.get_irish_time', return_value=datetime(2025, 3, 15, 23, 30)):
+            data = client.get('/api/day').get_json()
+        
+        assert data['date'] == '2025-03-15'
+    
+    def test_api_day_invalid_date(self, client):
+        """Test a malformed date is rejected"""
+        response = client.get('/api/day?date=15-03-2024')
+        
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+    
+    def test_api_day_missing_date(self, client):
+        """Test a date with no timetable row returns 404"""
+        response = client.get('/api/day?date=2024-07-01')
+        
+        assert response.status_code == 404
+        assert 'error' in response.get_json()
+    
+    def test_api_day_outside_hijri_range(self, client):
+        """Test dates the Hijri converter cannot handle are rejected"""
+        with patch('app.get_islamic_date', side_effect=OverflowError):
+            response = client.get('/api/day?date=1900-03-15')
+        
+        assert response.status_code == 400
+    
+    def test_api_day_not_modified(self, client):
+        """Test conditional requests get a 304"""
+        etag = client.get('/api/day?date=2024-03-15').get_etag()[0]
+        response = client.get('/api/day?date=2024-03-15', headers={'If-None-Match': f'"{etag}"'})
+        
+        assert response.status_code == 304
+    
+    def test_api_day_page_build(self, client):
+        """Test the day data says which page build the server runs, as the page itself does"""
+        response = client.get('/api/day?date=2024-03-15')
+        
+        assert response.headers['X-Page-Build'] == app_module.page_build()
+        assert len(app_module.page_build()) == 12
+    
+    def test_page_build_follows_assets(self):
+        """Test a changed asset bundle gives a new page build"""
+        build = app_module.page_build()
+        app_module.reset_caches()
+        
+        with patch.object(app_module._assets, 'filename', return_value='app.000000000000.js'):
+            assert app_module.page_build() != build
+
+
+class TestApiRange:
+    """Test the /api/range streaming export"""
+    
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    
+    @pytest.fixture(autouse=True)
+    def mock_timetable(self):
+        mock_prayer_times = [
+            ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15'],
+            ['3', '16', '05:28', '07:27', '12:50', '16:31', '18:27', '19:47', '05:40', '13:15', '17:15', '18:37', '20:15']
+        ]
+        with patch('app.load_prayer_times', return_value=mock_prayer_times):
+            yield
+    
+    def test_api_range_ndjson(self, client):
+        """Test the default NDJSON export over several years"""
+        response = client.get('/api/range?from=2024-03-01&to=2026-03-31')
+        lines = response.data.decode().splitlines()
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert len(lines) == 6
+        assert '"date":"2024-03-15"' in lines[0]
+        assert '"sehri_ends":"05:20"' in lines[0]
+    
+    def test_api_range_csv(self, client):
+        """Test the CSV export"""
+        response = client.get('/api/range?from=2024-03-15&to=2024-03-16&format=csv')
+        lines = response.data.decode().splitlines()
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert 'attachment' in response.headers['Content-Disposition']
+        assert lines[0].startswith('DATE,FAJR BEGINNING')
+        assert lines[1] == '2024-03-15,05:30,07:25,12:50,16:30,18:25,19:45,05:40,13:15,17:15,18:35,20:15,05:20,12:40,5 Ramadan 1445'
+    
+    def test_api_range_is_streamed(self, client):
+        """Test the response body is a generator, not a prebuilt document"""
+        response = client.get('/api/range?from=2024-03-01&to=2024-03-31', buffered=False)
+        
+        assert not response.is_sequence
+        assert response.content_length is None
+        response.close()
+    
+    def test_api_range_missing_params(self, client):
+        """Test from and to are required"""
+        assert client.get('/api/range?from=2024-03-01').status_code == 400
+        assert client.get('/api/range?to=2024-03-01').status_code == 400
+    
+    def test_api_range_invalid_dates(self, client):
+        """Test malformed and reversed ranges are rejected"""
+        assert client.get('/api/range?from=2024-3-1x&to=2024-03-02').status_code == 400
+        assert client.get('/api/range?from=2024-03-02&to=2024-03-01').status_code == 400
+    
+    def test_api_range_too_long(self, client):
+        """Test ranges over the limit are rejected"""
+        response = client.get('/api/range?from=1900-01-01&to=2099-12-31')
+        
+        assert response.status_code == 400
+    
+    def test_api_range_unknown_format(self, client):
+        """Test unknown formats are rejected"""
+        response = client.get('/api/range?from=2024-03-01&to=2024-03-02&format=xml')
+        
+        assert response.status_code == 400
+        assert 'ndjson' in response.get_json()['error']
+
+
+class TestEvents:
+    """Test the /events Server-Sent Events stream"""
+    
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    
+    @pytest.fixture(autouse=True)
+    def no_watcher_thread(self):
+        with patch('app.start_event_watcher') as mock_start:
+            yield mock_start
+    
+    def test_events_stream(self, client, no_watcher_thread):
+        """Test the stream opens with retry and a time sync event"""
+        response = client.get('/events', buffered=False)
+        chunks = iter(response.response)
+        
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert next(chunks).startswith(b'retry: ')
+        time_event = next(chunks)
+        assert b'event: time' in time_event
+        assert f'"page_build":"{app_module.page_build()}"'.encode() in time_event
+        no_watcher_thread.assert_called_once()
+        response.close()
+    
+    def test_events_replay_with_last_event_id(self, client):
+        """Test a reconnecting display gets the events it missed"""
+        first = app_module.event_broker.publish('announcements')
+        app_module.event_broker.publish('day', {'date': '2025-03-16'})
+        
+        response = client.get('/events', headers={'Last-Event-ID': str(first)}, buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+        next(chunks)
+        
+        assert b'event: day' in next(chunks)
+        response.close()
+    
+    def test_event_watcher_reloads_timetable(self):
+        """Test the watcher reloads the timetable and publishes when the CSV changes"""
+        old_times = [['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']]
+        new_times = [['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:30', '17:15', '18:35', '20:15']]
+        csv_version = [1]
+        
+        with patch('app.file_version', side_effect=lambda path: csv_version[0] if path == app_module.PRAYER_TIMES_CSV else 0):
+            with patch('app.load_prayer_times', return_value=old_times):
+                old_version = get_timetable().version
+                watcher = app_module.build_event_watcher()
+            
+            csv_version[0] = 2
+            with patch('app.load_prayer_times', return_value=new_times):
+                watcher.poll()
+        
+        assert get_timetable().version != old_version
+        assert get_timetable().get(3, 15).zohr_jamaah == '13:30'
+        assert f'"version":"{get_timetable().version}"' in ''.join(app_module.event_broker._since(0))
+
+
+class TestTenants:
+    """Test serving other mosques from data/<mosque_id>/prayer_times.csv"""
+    
+    @pytest.fixture
+    def client(self, tmp_path):
+        csv_header = "MONTH,DATE,FAJR BEGINNING,SUNRISE BEGINNING,ZOHR BEGINNING,ASAR BEGINNING,MAGRIB BEGINNING,ISHA BEGINNING,FAJR JAMAAH,ZOHR JAMAAH,ASAR JAMAAH,MAGRIB JAMAAH,ISHA JAMAAH\n"
+        for mosque_id, fajr in [('north', '05:30'), ('south', '05:45')]:
+            (tmp_path / mosque_id).mkdir()
+            (tmp_path / mosque_id / 'prayer_times.csv').write_text(
+                csv_header +
+                f"3,15,{fajr},07:25,12:50,16:30,18:25,19:45,05:40,13:15,17:15,18:35,20:15\n"
+                f"3,16,{fajr},07:27,12:50,16:31,18:27,19:47,05:40,13:15,17:15,18:37,20:15\n",
+                encoding='utf-8'
+            )
+        app.config['TESTING'] = True
+        # Other tests render with builtins.open mocked; don't reuse a template loaded that way
+        app.jinja_env.cache.clear()
+        with patch('app.DATA_DIR', str(tmp_path)):
+            with patch('app.get_islamic_date', return_value='5 Ramadan 1445'):
+                with app.test_client() as client:
+                    yield client
+    
+    def test_tenant_api_day(self, client):
+        """Test each mosque gets its own times"""
+        north = client.get('/api/north/day?date=2024-03-15').get_json()
+        south = client.get('/api/south/day?date=2024-03-15').get_json()
+        
+        assert north['today']['beginning']['fajr'] == '05:30'
+        assert south['today']['beginning']['fajr'] == '05:45'
+    
+    def test_tenant_unknown(self, client):
+        """Test unknown and malformed mosque ids are 404s"""
+        assert client.get('/api/west/day').status_code == 404
+        assert client.get('/api/West/day').status_code == 404
+        assert client.get('/m/west/').status_code == 404
+    
+    def test_tenant_broken_csv_not_a_404(self, client, tmp_path):
+        """Test a mosque whose CSV is broken raises instead of looking unknown"""
+        (tmp_path / 'west').mkdir()
+        (tmp_path / 'west' / 'prayer_times.csv').write_text(
+            "MONTH,DATE,FAJR BEGINNING\n"
+            "3,32,05:30\n",
+            encoding='utf-8'
+        )
+        
+        with pytest.raises(ValueError):
+            client.get('/api/west/day')
+    
+    def test_tenant_index(self, client):
+        """Test the page points the display at its own mosque's day data"""
+        with patch('app.get_irish_time', return_value=datetime(2024, 3, 15, 12, 0)):
+            response = client.get('/m/north/')
+        
+        assert response.status_code == 200
+        assert b'data-day-url="/api/north/day"' in response.data
+    
+    def test_tenant_loaded_lazily(self, client):
+        """Test mosques are only loaded when asked for"""
+        client.get('/api/north/day?date=2024-03-15')
+        
+        assert 'north' in app_module._tenants
+        assert 'south' not in app_module._tenants
+
+
+class TestAnnouncementsApi:
+    """Test /api/announcements/active and /api/announcements/upcoming"""
+    
+    @pytest.fixture
+    def client(self, tmp_path):
+        path = tmp_path / 'announcements.json'
+        path.write_text(json.dumps([
+            {'id': 'friday_tafseer_control', 'type': 'control', 'hide': True},
+            {'id': 'eid', 'startDate': '2025-06-04T01:00:00+01:00', 'endDate': '2025-06-04T20:30:00+01:00', 'message': 'Eid'},
+            {'id': 'later', 'startDate': '2025-07-01T00:00:00+01:00', 'endDate': '2025-07-02T00:00:00+01:00', 'message': 'Later'}
+        ]), encoding='utf-8')
+        app.config['TESTING'] = True
+        with patch('app._announcements', AnnouncementStore(str(path))):
+            with app.test_client() as client:
+                yield client
+    
+    def test_active(self, client):
+        """Test only the showing announcements and resolved controls are returned"""
+        data = client.get('/api/announcements/active?at=2025-06-04T12:00:00%2B01:00').get_json()
+        
+        assert [entry['id'] for entry in data['announcements']] == ['eid']
+        assert data['controls'] == {'friday_tafseer_control': True}
+        assert data['at'] == '2025-06-04T11:00:00+00:00'
+        assert data['next_change'] == '2025-06-04T19:30:00.000001+00:00'
+    
+    def test_active_nothing_showing(self, client):
+        """Test a quiet moment returns no announcements"""
+        data = client.get('/api/announcements/active?at=2025-06-20T12:00:00Z').get_json()
+        
+        assert data['announcements'] == []
+        assert data['next_change'] == '2025-06-30T23:00:00+00:00'
+    
+    def test_upcoming(self, client):
+        """Test announcements that haven't started yet, soonest first"""
+        data = client.get('/api/announcements/upcoming?at=2025-06-01T00:00:00Z&limit=1').get_json()
+        
+        assert [entry['id'] for entry in data['announcements']] == ['eid']
+    
+    def test_bad_parameters(self, client):
+        """Test malformed times and limits are 400s"""
+        assert client.get('/api/announcements/active?at=tomorrow').status_code == 400
+        assert client.get('/api/announcements/upcoming?limit=0').status_code == 400
+        assert client.get('/api/announcements/upcoming?limit=many').status_code == 400
+    
+    def test_feed(self, client):
+        """Test the whole file is served as a versioned feed"""
+        response = client.get('/api/announcements')
+        data = response.get_json()
+        
+        assert [entry['id'] for entry in data['announcements']] == ['friday_tafseer_control', 'eid', 'later']
+        assert response.headers['ETag'] == '"%s"' % data['version']
+        assert response.headers['Last-Modified']
+        assert response.headers['Cache-Control'] == 'no-cache'
+    
+    def test_feed_not_modified(self, client):
+        """Test an unchanged feed revalidates with a 304"""
+        response = client.get('/api/announcements')
+        
+        assert client.get('/api/announcements', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+        assert client.get('/api/announcements', headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    
+    def test_feed_not_modified_gzip(self, client):
+        """Test a gzip client sending back the feed version gets a 304, as the display does"""
+        with patch('render_cache.MIN_SIZE', 0):
+            response = client.get('/api/announcements', headers={'Accept-Encoding': 'gzip'})
+            version = json.loads(gzip.decompress(response.get_data()))['version']
+            revalidated = client.get('/api/announcements', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{version}"'})
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert revalidated.status_code == 304
+    
+    def test_feed_delta(self, client, tmp_path):
+        """Test ?since= returns only what changed in the file"""
+        version = client.get('/api/announcements').get_json()['version']
+        path = tmp_path / 'announcements.json'
+        entries = json.loads(path.read_text(encoding='utf-8'))
+        entries[1]['message'] = 'Eid Mubarak'
+        del entries[2]
+        path.write_text(json.dumps(entries), encoding='utf-8')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        
+        data = client.get(f'/api/announcements?since={version}').get_json()
+        
+        assert data['since'] == version
+        assert [entry['message'] for entry in data['changed']] == ['Eid Mubarak']
+        assert data['removed'] == ['later']
+        assert data['order'] == ['friday_tafseer_control', 'eid']
+    
+    def test_active_delta_and_not_modified(self, client):
+        """Test the active answer is versioned too"""
+        first = client.get('/api/announcements/active?at=2025-06-04T10:00:00Z')
+        version = first.get_json()['version']
+        
+        same = client.get('/api/announcements/active?at=2025-06-04T12:00:00Z', headers={'If-None-Match': first.headers['ETag']})
+        assert same.status_code == 304
+        
+        later = client.get(f'/api/announcements/active?at=2025-06-20T12:00:00Z&since={version}').get_json()
+        assert later['changed'] == []
+        assert later['removed'] == ['eid']
+        assert later['order'] == []
+
+
+class TestCoalescedRequests:
+    """Test a burst of identical requests does the work once"""
+    
+    def test_timetable_and_day_built_once(self):
+        """Test concurrent /api/day requests share one CSV load and one day build"""
+        calls = []
+        
+        def slow_load():
+            calls.append('load')
+            time.sleep(0.05)
+            return [['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']]
+        
+        statuses = []
+        client = app_module.app.test_client
+        
+        def request_day():
+            statuses.append(client().get('/api/day?date=2026-03-15').status_code)
+        
+        with patch('app.load_prayer_times', side_effect=slow_load):
+            with patch('app.compute_day_payload', wraps=app_module.compute_day_payload) as mock_compute:
+                threads = [threading.Thread(target=request_day) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join(5)
+        
+        assert statuses == [200] * 8
+        assert calls == ['load']
+        assert mock_compute.call_count == 1
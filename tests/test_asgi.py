@@ -0,0 +1,232 @@
+"""
+Unit tests for the asyncio serving mode (asgi.py)
+Tests the native /events stream, the Flask bridge and lifespan handling.
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import asgi
+from asgi import application
+
+
+MOCK_PRAYER_TIMES = [
+    ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']
+]
+
+
+def http_scope(path, query=b'', headers=()):
+    return {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+        'headers': list(headers), 'http_version': '1.1', 'scheme': 'http',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)
+    }
+
+
+class FakeClient:
+    """Plays the server side of an ASGI connection"""
+    
+    def __init__(self):
+        self.sent = []
+        self.got_body = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self._requested = False
+        self._read = 1
+    
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+    
+    async def send(self, message):
+        self.sent.append(message)
+        if message['type'] == 'http.response.body':
+            self.got_body.set()
+    
+    async def next_body(self):
+        # Everything streamed since the last call
+        await asyncio.wait_for(self.got_body.wait(), 2)
+        self.got_body.clear()
+        bodies = self.sent[self._read:]
+        self._read = len(self.sent)
+        return b''.join(message['body'] for message in bodies).decode('utf-8')
+    
+    @property
+    def status(self):
+        return self.sent[0]['status']
+    
+    @property
+    def body(self):
+        return b''.join(message.get('body', b'') for message in self.sent[1:])
+
+
+@pytest.fixture(autouse=True)
+def reset_app_caches():
+    app_module.reset_caches()
+    with patch('app.load_prayer_times', return_value=MOCK_PRAYER_TIMES):
+        with patch('asgi.start_event_watcher'):
+            yield
+    app_module.reset_caches()
+
+
+class TestEventsStream:
+    """Test /events served on the event loop"""
+    
+    def test_stream_sends_published_events(self):
+        """Test the stream opens, then delivers events published from another thread"""
+        async def scenario():
+            client = FakeClient()
+            task = asyncio.ensure_future(application(http_scope('/events'), client.receive, client.send))
+            opening = await client.next_body()
+            connections = app_module.event_broker.connections
+            
+            await asyncio.get_running_loop().run_in_executor(None, app_module.event_broker.publish, 'announcements')
+            event = await client.next_body()
+            
+            client.disconnected.set()
+            await asyncio.wait_for(task, 2)
+            return client, opening, event, connections
+        
+        client, opening, event, connections = asyncio.run(scenario())
+        
+        assert client.status == 200
+        assert (b'content-type', b'text/event-stream; charset=utf-8') in client.sent[0]['headers']
+        assert opening.startswith('retry: ')
+        assert 'event: time' in opening
+        assert 'event: announcements' in event
+        assert connections >= 1
+    
+    def test_disconnect_releases_connection(self):
+        """Test a closed stream no longer counts as connected"""
+        async def scenario():
+            before = app_module.event_broker.connections
+            client = FakeClient()
+            task = asyncio.ensure_future(application(http_scope('/events'), client.receive, client.send))
+            await client.next_body()
+            client.disconnected.set()
+            await asyncio.wait_for(task, 2)
+            return before, app_module.event_broker.connections
+        
+        before, after = asyncio.run(scenario())
+        
+        assert after == before
+    
+    def test_keepalive(self):
+        """Test the shared timer sends keep-alives to idle streams"""
+        async def scenario():
+            client = FakeClient()
+            with patch.object(app_module.event_broker, 'keepalive', 0.05):
+                asgi._waker = None
+                task = asyncio.ensure_future(application(http_scope('/events'), client.receive, client.send))
+                await client.next_body()
+                keepalive = await client.next_body()
+            client.disconnected.set()
+            await asyncio.wait_for(task, 2)
+            return keepalive
+        
+        assert asyncio.run(scenario()) == ': keep-alive\n\n'
+    
+    def test_last_event_id_replay(self):
+        """Test a reconnecting display gets what it missed"""
+        first = app_module.event_broker.publish('announcements')
+        app_module.event_broker.publish('day', {'date': '2025-03-16'})
+        
+        async def scenario():
+            client = FakeClient()
+            scope = http_scope('/events', headers=[(b'last-event-id', str(first).encode())])
+            task = asyncio.ensure_future(application(scope, client.receive, client.send))
+            replay = await client.next_body()
+            client.disconnected.set()
+            await asyncio.wait_for(task, 2)
+            return replay
+        
+        replay = asyncio.run(scenario())
+        
+        assert replay.startswith('retry: ')
+        assert 'event: announcements' not in replay
+        assert 'event: day' in replay
+    
+    def test_connection_limit(self):
+        """Test streams beyond the limit are refused"""
+        async def scenario():
+            client = FakeClient()
+            with patch('asgi.MAX_EVENT_CONNECTIONS', 0):
+                await application(http_scope('/events'), client.receive, client.send)
+            return client
+        
+        assert asyncio.run(scenario()).status == 503
+
+
+class TestWsgiBridge:
+    """Test ordinary requests are served by the Flask app"""
+    
+    def test_api_day(self):
+        """Test /api/day comes from the shared timetable"""
+        async def scenario():
+            client = FakeClient()
+            await application(http_scope('/api/day', b'date=2024-03-15'), client.receive, client.send)
+            return client
+        
+        client = asyncio.run(scenario())
+        
+        assert client.status == 200
+        assert json.loads(client.body)['today']['beginning']['fajr'] == '05:30'
+    
+    def test_not_found(self):
+        """Test Flask's own error responses pass through"""
+        async def scenario():
+            client = FakeClient()
+            await application(http_scope('/no-such-page'), client.receive, client.send)
+            return client
+        
+        assert asyncio.run(scenario()).status == 404
+    
+    def test_build_environ_headers(self):
+        """Test ASGI headers become WSGI environ keys"""
+        scope = http_scope('/api/day', b'date=2024-03-15', headers=[(b'if-none-match', b'"abc"'), (b'content-type', b'text/plain')])
+        
+        environ = asgi.build_environ(scope, None)
+        
+        assert environ['PATH_INFO'] == '/api/day'
+        assert environ['QUERY_STRING'] == 'date=2024-03-15'
+        assert environ['HTTP_IF_NONE_MATCH'] == '"abc"'
+        assert environ['CONTENT_TYPE'] == 'text/plain'
+    
+    def test_build_environ_repeated_headers(self):
+        """Test repeated headers are joined, cookies with '; ' so each one still parses"""
+        scope = http_scope('/', headers=[(b'cookie', b'a=1'), (b'cookie', b'b=2'),
+                                         (b'accept', b'text/html'), (b'accept', b'*/*')])
+        
+        environ = asgi.build_environ(scope, None)
+        
+        assert environ['HTTP_COOKIE'] == 'a=1; b=2'
+        assert environ['HTTP_ACCEPT'] == 'text/html,*/*'
+
+
+class TestLifespan:
+    """Test the ASGI lifespan protocol"""
+    
+    def test_startup_and_shutdown(self):
+        """Test startup and shutdown are acknowledged"""
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+        
+        async def receive():
+            return messages.pop(0)
+        
+        async def send(message):
+            sent.append(message['type'])
+        
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
@@ -0,0 +1,171 @@
+"""
+Unit tests for the static asset bundles (assets.py)
+Tests minifying, fingerprinting and the immutable /assets/ responses.
+"""
+
+import gzip
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets import AssetBundler, IMMUTABLE_CACHE_CONTROL, minify_css, minify_js
+from app import app, reset_caches
+
+
+class TestMinifyJs:
+    """Test the conservative JavaScript minifier"""
+
+    def test_removes_comments_and_indentation(self):
+        """Test comments, indentation and blank lines are dropped"""
+        source = "/**\n * Module\n */\nconst a = 1; // one\n\n    function f() {\n        return a; /* inline */\n    }\n"
+        assert minify_js(source) == "const a = 1;\nfunction f() {\nreturn a;\n}"
+
+    def test_keeps_line_breaks(self):
+        """Test statements without semicolons stay on their own lines"""
+        assert minify_js("let a = 1\nlet b = a\n(function () {})()\n") == "let a = 1\nlet b = a\n(function () {})()"
+
+    def test_keeps_comment_markers_inside_strings(self):
+        """Test // and /* inside string literals are not treated as comments"""
+        source = "const url = 'https://example.com/*x'; const s = \"a // b\"; const t = `c /* d */`;"
+        assert minify_js(source) == source
+
+    def test_keeps_regex_literals(self):
+        """Test regular expressions containing slashes and comment markers survive"""
+        source = "if (/^[A-Za-z]/.test(x) && !(/[/*]/.test(y))) { return /\\/\\//; }"
+        assert minify_js(source) == source
+
+    def test_division_is_not_a_regex(self):
+        """Test a '/' after a value is a division, so a following comment is still removed"""
+        assert minify_js("const half = total / 2; // half\nconst q = (a) / b // c\n") == \
+            "const half = total / 2;\nconst q = (a) / b"
+
+
+class TestMinifyCss:
+    """Test the CSS minifier"""
+
+    def test_removes_comments_and_indentation(self):
+        """Test comments, indentation and blank lines are dropped"""
+        source = "/* Clock */\n.clock {\n    color: red; /* brand */\n\n    font: 1em 'Digital-7';\n}\n"
+        assert minify_css(source) == ".clock {\ncolor: red;\nfont: 1em 'Digital-7';\n}"
+
+
+class TestAssetBundler:
+    """Test bundling and fingerprinting"""
+
+    @pytest.fixture
+    def static_dir(self, tmp_path):
+        (tmp_path / 'js').mkdir()
+        (tmp_path / 'js' / 'a.js').write_text("// first\nconst a = 1\n", encoding='utf-8')
+        (tmp_path / 'js' / 'b.js').write_text("const b = a + 1\n", encoding='utf-8')
+        (tmp_path / 'site.css').write_text("body {\n    margin: 0;\n}\n", encoding='utf-8')
+        return tmp_path
+
+    def make_bundler(self, static_dir, **kwargs):
+        return AssetBundler(str(static_dir), {'app.js': ['js/a.js', 'js/b.js'], 'site.css': ['site.css']}, **kwargs)
+
+    def test_concatenates_in_order(self, static_dir):
+        """Test the files are joined in the listed order"""
+        asset = self.make_bundler(static_dir).get('app.js')
+        assert asset.page.body == b"const a = 1;\nconst b = a + 1"
+        assert asset.page.mimetype == 'application/javascript'
+        assert asset.page.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+
+    def test_fingerprint_follows_content(self, static_dir):
+        """Test the file name only changes when the bundle content changes"""
+        first = self.make_bundler(static_dir).filename('app.js')
+        assert first.startswith('app.') and first.endswith('.js') and len(first) == len('app.') + 12 + len('.js')
+
+        # A comment-only edit gives the same bundle
+        (static_dir / 'js' / 'b.js').write_text("// note\nconst b = a + 1\n", encoding='utf-8')
+        assert self.make_bundler(static_dir).filename('app.js') == first
+
+        (static_dir / 'js' / 'b.js').write_text("const b = a + 2\n", encoding='utf-8')
+        assert self.make_bundler(static_dir).filename('app.js') != first
+
+    def test_find_by_fingerprinted_name(self, static_dir):
+        """Test only current fingerprinted names are found"""
+        bundler = self.make_bundler(static_dir)
+        filename = bundler.filename('site.css')
+        assert bundler.find(filename).name == 'site.css'
+        assert bundler.find('site.000000000000.css') is None
+        assert bundler.find('site.css') is None
+
+    def test_built_once(self, static_dir):
+        """Test bundles are kept until cleared"""
+        bundler = self.make_bundler(static_dir)
+        first = bundler.filename('app.js')
+        (static_dir / 'js' / 'b.js').write_text("const b = a + 2\n", encoding='utf-8')
+        assert bundler.filename('app.js') == first
+
+        bundler.clear()
+        assert bundler.filename('app.js') != first
+
+    def test_auto_reload(self, static_dir):
+        """Test auto_reload rebuilds when a source file changes"""
+        bundler = self.make_bundler(static_dir, auto_reload=True)
+        first = bundler.filename('app.js')
+        path = static_dir / 'js' / 'b.js'
+        path.write_text("const b = a + 2\n", encoding='utf-8')
+        os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+        assert bundler.filename('app.js') != first
+
+
+class TestAssetRoutes:
+    """Test the bundles are served and linked from the page"""
+
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        # Other tests render with builtins.open mocked; rebuild from the real files
+        app.jinja_env.cache.clear()
+        reset_caches()
+        with app.test_client() as client:
+            yield client
+        reset_caches()
+
+    def test_index_links_bundles(self, client):
+        """Test the page loads one script and one stylesheet bundle"""
+        with patch('app.get_islamic_date', return_value='5 Ramadan 1445'):
+            html = client.get('/').get_data(as_text=True)
+
+        assert html.count('<script src=') == 1
+        assert '/assets/app.' in html
+        assert '/assets/styles.' in html
+        assert "/static/js/" not in html
+
+    def test_bundle_is_immutable(self, client):
+        """Test a bundle is served with a year-long immutable Cache-Control"""
+        with client.application.test_request_context():
+            url = client.application.jinja_env.globals['asset_url']('app.js')
+
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/javascript'
+        assert response.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+        assert b'var timeModule = {' in response.data
+
+        revalidated = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+        assert revalidated.status_code == 304
+
+    def test_bundle_is_precompressed(self, client):
+        """Test a client that accepts gzip gets the compressed bundle"""
+        with client.application.test_request_context():
+            url = client.application.jinja_env.globals['asset_url']('styles.css')
+
+        plain = client.get(url)
+        compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert compressed.headers['Vary'] == 'Accept-Encoding'
+        assert gzip.decompress(compressed.data) == plain.data
+        assert len(compressed.data) < len(plain.data) / 2
+
+    def test_stale_fingerprint_not_found(self, client):
+        """Test an old or made-up fingerprint is a 404"""
+        assert client.get('/assets/app.000000000000.js').status_code == 404
+        assert client.get('/assets/app.js').status_code == 404
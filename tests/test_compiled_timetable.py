@@ -0,0 +1,156 @@
+"""
+Unit tests for the memory-mapped compiled timetable (compiled_timetable.py)
+Tests compiling, lookups, the source check and the app using the file.
+"""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from compiled_timetable import MappedTimetable, compile_timetable, compiled_path, load_compiled
+from timetable import DerivedTime, Timetable
+
+
+CSV_TEXT = (
+    "MONTH,DATE,FAJR BEGINNING,SUNRISE BEGINNING,ZOHR BEGINNING,ASAR BEGINNING,MAGRIB BEGINNING,ISHA BEGINNING,"
+    "FAJR JAMAAH,ZOHR JAMAAH,ASAR JAMAAH,MAGRIB JAMAAH,ISHA JAMAAH\n"
+    "3,15,05:30,07:25,12:50,16:30,18:25,19:45,05:40,13:15,17:15,18:35,20:15\n"
+    "3,16,05:28,07:23,12:50,16:31,18:27,19:47,05:40,13:15,17:15,18:37,\n"
+    "12,31,06:50,08:40,12:30,14:10,16:20,18:05,07:00,13:00,14:30,16:25,19:30\n"
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'prayer_times.csv'
+    path.write_text(CSV_TEXT, encoding='utf-8')
+    return str(path)
+
+
+class TestMappedTimetable:
+    """Test reading a compiled file"""
+
+    def test_same_as_csv(self, csv_path):
+        """Test every lookup matches the timetable built from the CSV"""
+        compile_timetable(csv_path)
+        mapped = MappedTimetable(compiled_path(csv_path))
+        built = Timetable.from_csv(csv_path)
+
+        assert mapped.version == built.version
+        assert list(mapped) == list(built)
+        assert mapped.get(3, 15).fajr_begin == '05:30'
+        assert mapped.get(3, 16).isha_jamaah == ''
+        assert mapped.get(2, 29) is None
+        assert mapped.derived_times(3, 15) == built.derived_times(3, 15) == \
+            {'sehri_ends': '05:20', 'sunrise': '07:25', 'noon': '12:40'}
+        assert mapped.month_minutes(3, 'FAJR BEGINNING') == [330, 328]
+
+    def test_columns_are_views(self, csv_path):
+        """Test columns read the mapped file instead of copying it"""
+        compile_timetable(csv_path)
+        mapped = MappedTimetable(compiled_path(csv_path))
+
+        assert isinstance(mapped.columns['FAJR BEGINNING'], memoryview)
+        assert mapped.columns['FAJR BEGINNING'].obj is mapped._mmap
+        assert mapped.derived['noon'].obj is mapped._mmap
+
+    def test_memory_size_counts_mapping(self, csv_path):
+        """Test the mapped file is counted, so a TimetableStore can evict it"""
+        path = compile_timetable(csv_path)
+        mapped = MappedTimetable(path)
+
+        assert mapped.memory_size() >= os.path.getsize(path)
+
+    def test_close(self, csv_path):
+        """Test close unmaps the file"""
+        mapped = MappedTimetable(compile_timetable(csv_path))
+
+        mapped.close()
+
+        assert mapped._mmap.closed
+
+    def test_rejects_other_files(self, tmp_path, csv_path):
+        """Test a file that isn't a compiled timetable, or is cut short, is refused"""
+        with pytest.raises(ValueError):
+            MappedTimetable(csv_path)
+
+        path = compile_timetable(csv_path)
+        with open(path, 'rb') as file:
+            data = file.read()
+        truncated = tmp_path / 'truncated.bin'
+        truncated.write_bytes(data[:-2])
+        with pytest.raises(ValueError):
+            MappedTimetable(str(truncated))
+
+
+class TestLoadCompiled:
+    """Test the check against the source CSV"""
+
+    def test_missing(self, csv_path):
+        """Test no compiled file means None"""
+        assert load_compiled(csv_path) is None
+
+    def test_up_to_date(self, csv_path):
+        """Test a file compiled from this CSV is used"""
+        compile_timetable(csv_path)
+        assert isinstance(load_compiled(csv_path), MappedTimetable)
+
+    def test_csv_changed(self, csv_path):
+        """Test an edited CSV makes the compiled file out of date"""
+        compile_timetable(csv_path)
+        with open(csv_path, 'a', encoding='utf-8') as file:
+            file.write("12,30,06:50,08:40,12:30,14:10,16:20,18:05,07:00,13:00,14:30,16:25,19:30\n")
+
+        assert load_compiled(csv_path) is None
+
+    def test_rules_changed(self, csv_path):
+        """Test other derived time rules make the compiled file out of date"""
+        compile_timetable(csv_path)
+        assert load_compiled(csv_path, [DerivedTime('sehri_ends', 'FAJR BEGINNING', -15)]) is None
+
+    def test_out_of_date_file_unmapped(self, csv_path):
+        """Test a compiled file that isn't used is closed straight away"""
+        compile_timetable(csv_path)
+        opened = []
+
+        class Recorded(MappedTimetable):
+            def __init__(self, path):
+                super().__init__(path)
+                opened.append(self)
+
+        with patch('compiled_timetable.MappedTimetable', Recorded):
+            assert load_compiled(csv_path, [DerivedTime('sehri_ends', 'FAJR BEGINNING', -15)]) is None
+
+        assert opened[0]._mmap.closed
+
+
+class TestAppUsesCompiled:
+    """Test the app maps the compiled file when there is one"""
+
+    def test_default_timetable(self, csv_path):
+        """Test get_timetable() uses an up-to-date compiled file and falls back to the CSV"""
+        with patch('app.PRAYER_TIMES_CSV', csv_path):
+            app_module.reset_caches()
+            assert not isinstance(app_module.get_timetable(), MappedTimetable)
+
+            compile_timetable(csv_path, rules=app_module.IMPORTANT_TIME_RULES)
+            app_module.reset_caches()
+            timetable = app_module.get_timetable()
+            assert isinstance(timetable, MappedTimetable)
+            assert timetable.get(3, 15).fajr_begin == '05:30'
+        app_module.reset_caches()
+
+    def test_tenant_timetable(self, tmp_path):
+        """Test a mosque's compiled file is used for its pages"""
+        (tmp_path / 'north').mkdir()
+        csv_path = tmp_path / 'north' / 'prayer_times.csv'
+        csv_path.write_text(CSV_TEXT, encoding='utf-8')
+        compile_timetable(str(csv_path), rules=app_module.IMPORTANT_TIME_RULES)
+
+        with patch('app.DATA_DIR', str(tmp_path)):
+            assert isinstance(app_module.load_tenant_timetable('north'), MappedTimetable)
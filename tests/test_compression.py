@@ -0,0 +1,225 @@
+"""
+Unit tests for response compression (compression.py)
+Tests encoding negotiation, precompressed siblings and the /static/ handler.
+"""
+
+import gzip
+import os
+import sys
+import pytest
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compression
+from compression import (StaticVariants, compress, is_compressible, negotiate, precompress_file,
+                         precompress_tree, precompressed_path)
+from app import app, reset_caches
+
+
+JSON = b'{"announcements": [' + b'{"text": "Jumuah khutbah at 13:15"},' * 40 + b'{}]}'
+
+
+def accept(header):
+    return parse_accept_header(header, Accept)
+
+
+def touch_later(path, seconds=1):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+class TestNegotiate:
+    """Test picking an encoding from Accept-Encoding"""
+
+    def test_prefers_brotli(self):
+        """Test br wins over gzip when both are offered and accepted"""
+        assert negotiate(accept('gzip, deflate, br'), ('br', 'gzip')) == 'br'
+
+    def test_gzip_only(self):
+        """Test gzip is used when it is the only match"""
+        assert negotiate(accept('gzip, deflate'), ('br', 'gzip')) == 'gzip'
+        assert negotiate(accept('gzip, br'), ('gzip',)) == 'gzip'
+
+    def test_quality_values(self):
+        """Test q-values are respected, including q=0"""
+        assert negotiate(accept('br;q=0.5, gzip'), ('br', 'gzip')) == 'gzip'
+        assert negotiate(accept('gzip;q=0'), ('gzip',)) is None
+
+    def test_wildcard(self):
+        """Test '*' accepts any encoding"""
+        assert negotiate(accept('*'), ('gzip',)) == 'gzip'
+
+    def test_nothing_accepted(self):
+        """Test no header means no compression"""
+        assert negotiate(accept(''), ('br', 'gzip')) is None
+        assert negotiate(accept('identity'), ('br', 'gzip')) is None
+
+
+class TestCompress:
+    """Test compressing bodies"""
+
+    def test_gzip_round_trip(self):
+        """Test gzip output decompresses to the input and is repeatable"""
+        body = compress(JSON, 'gzip')
+        assert gzip.decompress(body) == JSON
+        assert len(body) < len(JSON)
+        assert compress(JSON, 'gzip') == body
+
+    def test_unknown_encoding(self):
+        """Test an unsupported encoding is an error"""
+        with pytest.raises(ValueError):
+            compress(JSON, 'deflate')
+
+    def test_compressible_extensions(self):
+        """Test text files are compressible and images are not"""
+        assert is_compressible('static/data/announcements.json')
+        assert is_compressible('static/data/adhkar.txt')
+        assert is_compressible('static/fonts/ds_digital/DS-DIGI.TTF')
+        assert not is_compressible('static/images/zakat.jpg')
+
+
+class TestPrecompress:
+    """Test writing .gz/.br siblings"""
+
+    def test_writes_gzip_sibling(self, tmp_path, monkeypatch):
+        """Test a compressible file gets a .gz sibling with the same content"""
+        monkeypatch.setattr(compression, 'brotli', None)
+        path = tmp_path / 'announcements.json'
+        path.write_bytes(JSON)
+
+        assert precompress_file(str(path)) == [str(path) + '.gz']
+        assert gzip.decompress((tmp_path / 'announcements.json.gz').read_bytes()) == JSON
+        assert precompressed_path(str(path), 'gzip') == str(path) + '.gz'
+
+    def test_skips_up_to_date_and_small_files(self, tmp_path, monkeypatch):
+        """Test fresh siblings are kept and tiny files are left alone"""
+        monkeypatch.setattr(compression, 'brotli', None)
+        (tmp_path / 'big.css').write_bytes(JSON)
+        (tmp_path / 'small.css').write_bytes(b'body{}')
+        (tmp_path / 'photo.jpg').write_bytes(JSON)
+
+        assert precompress_tree(str(tmp_path)) == [str(tmp_path / 'big.css') + '.gz']
+        assert precompress_tree(str(tmp_path)) == []
+        assert precompress_tree(str(tmp_path), force=True) == [str(tmp_path / 'big.css') + '.gz']
+
+    def test_stale_sibling_ignored(self, tmp_path, monkeypatch):
+        """Test a sibling older than the file is not used"""
+        monkeypatch.setattr(compression, 'brotli', None)
+        path = tmp_path / 'adhkar.txt'
+        path.write_bytes(JSON)
+        precompress_file(str(path))
+        touch_later(path)
+
+        assert precompressed_path(str(path), 'gzip') is None
+        assert precompress_file(str(path)) == [str(path) + '.gz']
+
+
+class TestStaticVariants:
+    """Test the in-memory fallback for files without siblings"""
+
+    def test_compresses_once(self, tmp_path):
+        """Test a file is compressed on first use and then reused"""
+        path = tmp_path / 'styles.css'
+        path.write_bytes(JSON)
+        variants = StaticVariants()
+
+        body = variants.get(str(path), 'gzip')
+        assert gzip.decompress(body) == JSON
+        assert variants.get(str(path), 'gzip') is body
+        assert len(variants) == 1
+
+    def test_prefers_sibling(self, tmp_path, monkeypatch):
+        """Test a precompressed sibling is returned as a path"""
+        monkeypatch.setattr(compression, 'brotli', None)
+        path = tmp_path / 'styles.css'
+        path.write_bytes(JSON)
+        precompress_file(str(path))
+
+        assert StaticVariants().get(str(path), 'gzip') == str(path) + '.gz'
+
+    def test_small_file(self, tmp_path):
+        """Test tiny files are not compressed"""
+        path = tmp_path / 'tiny.css'
+        path.write_bytes(b'body{}')
+
+        assert StaticVariants().get(str(path), 'gzip') is None
+
+    def test_bounded(self, tmp_path):
+        """Test the oldest entries are dropped past max_entries"""
+        variants = StaticVariants(max_entries=2)
+        for name in ('a.css', 'b.css', 'c.css'):
+            (tmp_path / name).write_bytes(JSON)
+            variants.get(str(tmp_path / name), 'gzip')
+
+        assert len(variants) == 2
+
+
+class TestStaticRoute:
+    """Test /static/ serves compressed copies when accepted"""
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(compression, 'brotli', None)
+        (tmp_path / 'data').mkdir()
+        (tmp_path / 'data' / 'announcements.json').write_bytes(JSON)
+        (tmp_path / 'photo.jpg').write_bytes(JSON)
+        monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+        app.config['TESTING'] = True
+        reset_caches()
+        with app.test_client() as client:
+            yield client
+        reset_caches()
+
+    def test_gzip_when_accepted(self, client):
+        """Test a JSON file is sent gzip compressed with Vary and its own ETag"""
+        response = client.get('/static/data/announcements.json', headers={'Accept-Encoding': 'gzip, br'})
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert response.mimetype == 'application/json'
+        assert response.headers['ETag'].endswith('-gzip"')
+        assert gzip.decompress(response.data) == JSON
+
+        revalidated = client.get('/static/data/announcements.json',
+                                 headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        assert revalidated.status_code == 304
+
+    def test_identity_when_not_accepted(self, client):
+        """Test clients without gzip get the file as it is"""
+        response = client.get('/static/data/announcements.json')
+
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert response.data == JSON
+        response.close()
+
+    def test_precompressed_sibling(self, client, tmp_path):
+        """Test a .gz written by the precompression step is sent"""
+        path = tmp_path / 'data' / 'announcements.json'
+        (tmp_path / 'data' / 'announcements.json.gz').write_bytes(gzip.compress(JSON, mtime=0))
+        touch_later(str(path) + '.gz')
+
+        response = client.get('/static/data/announcements.json', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'application/json'
+        assert gzip.decompress(response.data) == JSON
+        response.close()
+
+    def test_images_untouched(self, client):
+        """Test images are never compressed"""
+        response = client.get('/static/photo.jpg', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == JSON
+        response.close()
+
+    def test_missing_file(self, client):
+        """Test a missing file is still a 404"""
+        assert client.get('/static/data/missing.json', headers={'Accept-Encoding': 'gzip'}).status_code == 404
+        assert client.get('/static/../app.py', headers={'Accept-Encoding': 'gzip'}).status_code == 404
@@ -0,0 +1,202 @@
+"""
+Unit tests for the display event stream (events.py)
+Tests publishing, replay after reconnects, keep-alives and the watcher.
+"""
+
+import json
+import threading
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from events import EventBroker, Watcher, format_event
+
+
+def parse(chunk):
+    # Turn a text/event-stream chunk into [(id, event, data), ...]
+    events = []
+    for block in chunk.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class TestFormatEvent:
+    """Test the text/event-stream encoding"""
+    
+    def test_format_event(self):
+        """Test id, event and compact JSON data lines"""
+        assert format_event(3, 'day', {'date': '2025-03-16'}) == 'id: 3\nevent: day\ndata: {"date":"2025-03-16"}\n\n'
+        assert format_event(4, 'announcements') == 'id: 4\nevent: announcements\ndata: {}\n\n'
+
+
+class TestEventBroker:
+    """Test fanning events out to streams"""
+    
+    def test_stream_starts_with_retry(self):
+        """Test the stream tells the browser how soon to reconnect"""
+        stream = EventBroker().stream()
+        
+        assert next(stream).startswith('retry: ')
+    
+    def test_initial_chunks(self):
+        """Test extra chunks are sent as soon as the stream opens"""
+        stream = EventBroker().stream(initial=lambda: ['hello\n\n'])
+        next(stream)
+        
+        assert next(stream) == 'hello\n\n'
+    
+    def test_published_event_reaches_stream(self):
+        """Test a waiting stream wakes up for a published event"""
+        broker = EventBroker(keepalive=5)
+        stream = broker.stream()
+        next(stream)
+        
+        timer = threading.Timer(0.05, broker.publish, args=('day', {'date': '2025-03-16'}))
+        timer.start()
+        chunk = next(stream)
+        timer.join()
+        
+        assert parse(chunk) == [(1, 'day', {'date': '2025-03-16'})]
+    
+    def test_events_reach_every_stream(self):
+        """Test all connections see the same event"""
+        broker = EventBroker(keepalive=5)
+        streams = [broker.stream() for _ in range(3)]
+        for stream in streams:
+            next(stream)
+        
+        broker.publish('announcements')
+        
+        assert [parse(next(stream)) for stream in streams] == [[(1, 'announcements', {})]] * 3
+    
+    def test_keepalive_when_idle(self):
+        """Test idle streams get a comment line"""
+        broker = EventBroker(keepalive=0.01)
+        stream = broker.stream()
+        next(stream)
+        
+        assert next(stream) == ': keep-alive\n\n'
+    
+    def test_replay_after_reconnect(self):
+        """Test events since Last-Event-ID are replayed"""
+        broker = EventBroker()
+        broker.publish('day', {'date': '2025-03-16'})
+        broker.publish('announcements')
+        broker.publish('timetable', {'version': 'abc'})
+        stream = broker.stream(last_event_id='1')
+        next(stream)
+        
+        assert [event for _, event, _ in parse(next(stream))] == ['announcements', 'timetable']
+    
+    def test_resync_when_too_far_behind(self):
+        """Test a client that missed more than the history gets a resync"""
+        broker = EventBroker(history=2)
+        for _ in range(5):
+            broker.publish('announcements')
+        stream = broker.stream(last_event_id='1')
+        next(stream)
+        
+        assert parse(next(stream)) == [(5, 'resync', {})]
+    
+    def test_live_event_reaches_connected_stream(self):
+        """Test an event published without replay still reaches open streams"""
+        broker = EventBroker(keepalive=5)
+        stream = broker.stream()
+        next(stream)
+        
+        broker.publish('time', {'utc_ms': 1}, replay=False)
+        
+        assert parse(next(stream)) == [(1, 'time', {'utc_ms': 1})]
+    
+    def test_live_events_not_replayed(self):
+        """Test live-only events neither fill the history nor reach a reconnecting display"""
+        broker = EventBroker(history=2, keepalive=0.01)
+        broker.publish('day', {'date': '2025-03-16'})
+        for minute in range(10):
+            broker.publish('time', {'utc_ms': minute}, replay=False)
+        broker.publish('announcements')
+        stream = broker.stream(last_event_id='1')
+        next(stream)
+        
+        assert [event for _, event, _ in parse(next(stream))] == ['announcements']
+        assert next(stream) == ': keep-alive\n\n'
+    
+    def test_new_connection_skips_history(self):
+        """Test a fresh connection only gets new events"""
+        broker = EventBroker(keepalive=0.01)
+        broker.publish('announcements')
+        stream = broker.stream()
+        next(stream)
+        
+        assert next(stream) == ': keep-alive\n\n'
+    
+    def test_connection_count(self):
+        """Test open streams are counted and closed ones forgotten"""
+        broker = EventBroker()
+        stream = broker.stream()
+        next(stream)
+        
+        assert broker.connections == 1
+        stream.close()
+        assert broker.connections == 0
+
+
+class TestWatcher:
+    """Test turning changes into events"""
+    
+    def test_watch_publishes_on_change(self):
+        """Test an event is published only when the value changes"""
+        broker = EventBroker()
+        value = ['2025-03-15']
+        watcher = Watcher(broker)
+        watcher.watch('day', lambda: value[0], lambda new: {'date': new})
+        
+        watcher.poll()
+        assert broker.last_id == 0
+        
+        value[0] = '2025-03-16'
+        watcher.poll()
+        watcher.poll()
+        
+        assert broker.last_id == 1
+        assert parse(broker._since(0)[0]) == [(1, 'day', {'date': '2025-03-16'})]
+    
+    def test_every(self):
+        """Test interval events are published when due"""
+        broker = EventBroker()
+        watcher = Watcher(broker)
+        watcher.every('time', 60, lambda: {'utc_ms': 1})
+        due = watcher._intervals[0][3]
+        
+        watcher.poll(now=due - 1)
+        assert broker.last_id == 0
+        
+        watcher.poll(now=due)
+        watcher.poll(now=due + 1)
+        assert broker.last_id == 1
+    
+    def test_every_without_replay(self):
+        """Test interval events can be kept out of the history"""
+        broker = EventBroker()
+        watcher = Watcher(broker)
+        watcher.every('time', 60, lambda: {'utc_ms': 1}, replay=False)
+        
+        watcher.poll(now=watcher._intervals[0][3])
+        
+        assert broker.last_id == 1
+        assert broker._since(1) == []
+    
+    def test_start_once(self):
+        """Test the watcher thread is only started once"""
+        watcher = Watcher(EventBroker(), interval=60)
+        
+        watcher.start()
+        thread = watcher._thread
+        watcher.start()
+        
+        assert watcher.running
+        assert watcher._thread is thread
@@ -0,0 +1,98 @@
+"""
+Unit tests for the Hijri calendar lookups (hijri_calendar.py)
+Tests memoised conversion and day-by-day range stepping.
+"""
+
+import pytest
+from datetime import date, timedelta
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hijri_calendar
+from hijri_calendar import (
+    FIRST_SUPPORTED_DATE,
+    LAST_SUPPORTED_DATE,
+    clear_cache,
+    format_hijri_date,
+    iter_hijri_dates
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+class TestFormatHijriDate:
+    """Test single date conversion"""
+    
+    def test_known_dates(self):
+        """Test conversions against known Umm al-Qura dates"""
+        assert format_hijri_date(date(2024, 3, 15)) == "5 Ramadan 1445"
+        assert format_hijri_date(date(2025, 3, 1)) == "1 Ramadan 1446"
+        assert format_hijri_date(date(2024, 7, 7)) == "1 Muharram 1446"
+    
+    def test_memoised(self):
+        """Test a date is only converted once"""
+        with patch('hijri_converter.convert.Gregorian') as mock_gregorian:
+            mock_hijri = MagicMock(day=1, month=1, year=1446)
+            mock_gregorian.return_value.to_hijri.return_value = mock_hijri
+            
+            format_hijri_date(date(2024, 7, 7))
+            format_hijri_date(date(2024, 7, 7))
+        
+        mock_gregorian.assert_called_once_with(2024, 7, 7)
+    
+    def test_out_of_range(self):
+        """Test dates outside the Umm al-Qura table raise OverflowError"""
+        with pytest.raises(OverflowError):
+            format_hijri_date(date(1900, 1, 1))
+
+
+class TestIterHijriDates:
+    """Test range stepping"""
+    
+    def test_matches_single_conversions(self):
+        """Test stepping agrees with converting every day, across month and year ends"""
+        start, end = date(2024, 6, 1), date(2025, 8, 31)
+        
+        stepped = list(iter_hijri_dates(start, end))
+        expected = [format_hijri_date(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+        
+        assert stepped == expected
+    
+    def test_converts_once_per_range(self):
+        """Test a long range makes a single Gregorian conversion"""
+        with patch.object(hijri_calendar.convert, 'Gregorian', wraps=hijri_calendar.convert.Gregorian) as gregorian:
+            dates = list(iter_hijri_dates(date(2025, 1, 1), date(2034, 12, 31)))
+        
+        assert len(dates) == 3652
+        assert gregorian.call_count == 1
+    
+    def test_single_day(self):
+        """Test a one-day range"""
+        assert list(iter_hijri_dates(date(2024, 3, 15), date(2024, 3, 15))) == ["5 Ramadan 1445"]
+    
+    def test_empty_range(self):
+        """Test an end before the start yields nothing"""
+        assert list(iter_hijri_dates(date(2024, 3, 15), date(2024, 3, 14))) == []
+    
+    def test_unsupported_dates_are_blank(self):
+        """Test dates outside the supported range come back empty"""
+        before = list(iter_hijri_dates(FIRST_SUPPORTED_DATE - timedelta(days=2), FIRST_SUPPORTED_DATE))
+        after = list(iter_hijri_dates(LAST_SUPPORTED_DATE, LAST_SUPPORTED_DATE + timedelta(days=2)))
+        
+        assert before[:2] == ['', '']
+        assert before[2] == format_hijri_date(FIRST_SUPPORTED_DATE)
+        assert after[0] == format_hijri_date(LAST_SUPPORTED_DATE)
+        assert after[1:] == ['', '']
+    
+    def test_entirely_unsupported_range(self):
+        """Test a range wholly outside the table"""
+        assert list(iter_hijri_dates(date(1900, 1, 1), date(1900, 1, 3))) == ['', '', '']
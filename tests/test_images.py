@@ -0,0 +1,197 @@
+"""
+Unit tests for the responsive poster images (images.py)
+Tests variant selection, the manifest and the /images/ route.
+"""
+
+import json
+import os
+import sys
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from images import ImageManifest, accepted_types, build, choose_variant, read_manifest, variant_widths
+from app import app, reset_caches
+
+
+CHROME_ACCEPT = 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
+OLD_ACCEPT = 'image/webp,*/*'
+
+
+def make_entry(widths=(640, 1280, 1920), types=('image/avif', 'image/webp', 'image/jpeg')):
+    extensions = {'image/avif': 'avif', 'image/webp': 'webp', 'image/jpeg': 'jpg'}
+    return {
+        'hash': 'abcdef0123456789',
+        'width': 3000,
+        'height': 4000,
+        'variants': [
+            {'file': f'images/variants/zakat-abcdef01-{width}.{extensions[mimetype]}', 'width': width,
+             'height': width * 4 // 3, 'type': mimetype, 'bytes': 1000}
+            for width in widths for mimetype in types
+        ]
+    }
+
+
+def accept(header):
+    return parse_accept_header(header, MIMEAccept)
+
+
+class TestVariantWidths:
+    """Test choosing the widths to build"""
+
+    def test_large_source(self):
+        """Test a large poster gets every target width"""
+        assert variant_widths(3000) == [640, 1280, 1920]
+
+    def test_never_upscales(self):
+        """Test a narrow poster gets its own width instead of larger targets"""
+        assert variant_widths(1000) == [640, 1000]
+        assert variant_widths(400) == [400]
+        assert variant_widths(1280) == [640, 1280]
+
+
+class TestChooseVariant:
+    """Test picking a variant for a request"""
+
+    def test_accepted_types_ignore_wildcards(self):
+        """Test '*/*' and 'image/*' don't count as AVIF/WebP support"""
+        assert accepted_types(accept(CHROME_ACCEPT)) == {'image/avif', 'image/webp', 'image/apng', 'image/svg+xml'}
+        assert accepted_types(accept('image/avif;q=0, */*')) == set()
+
+    def test_best_format(self):
+        """Test AVIF, then WebP, then JPEG"""
+        entry = make_entry()
+        assert choose_variant(entry, {'image/avif', 'image/webp'})['type'] == 'image/avif'
+        assert choose_variant(entry, {'image/webp'})['type'] == 'image/webp'
+        assert choose_variant(entry, set())['type'] == 'image/jpeg'
+
+    def test_skips_formats_not_built(self):
+        """Test a format missing from the manifest falls through to the next"""
+        entry = make_entry(types=('image/webp', 'image/jpeg'))
+        assert choose_variant(entry, {'image/avif', 'image/webp'})['type'] == 'image/webp'
+
+    def test_width(self):
+        """Test the smallest variant at least as wide as the display is chosen"""
+        entry = make_entry()
+        assert choose_variant(entry, set(), 600)['width'] == 640
+        assert choose_variant(entry, set(), 1080)['width'] == 1280
+        assert choose_variant(entry, set(), 1280)['width'] == 1280
+        assert choose_variant(entry, set(), 3840)['width'] == 1920
+        assert choose_variant(entry, set())['width'] == 1920
+
+
+class TestImageManifest:
+    """Test loading the manifest"""
+
+    def test_missing_manifest(self, tmp_path):
+        """Test no manifest means no variants"""
+        manifest = ImageManifest(str(tmp_path / 'manifest.json'))
+        assert manifest.get('images/zakat.jpg') is None
+        assert manifest.choose('images/zakat.jpg', accept(CHROME_ACCEPT)) is None
+
+    def test_reloads_when_changed(self, tmp_path):
+        """Test a rebuilt manifest is picked up without a restart"""
+        path = tmp_path / 'manifest.json'
+        path.write_text(json.dumps({'version': 1, 'images': {}}), encoding='utf-8')
+        manifest = ImageManifest(str(path))
+        assert manifest.get('images/zakat.jpg') is None
+
+        path.write_text(json.dumps({'version': 1, 'images': {'images/zakat.jpg': make_entry()}}), encoding='utf-8')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert manifest.choose('images/zakat.jpg', accept(OLD_ACCEPT), 1000)['file'] == \
+            'images/variants/zakat-abcdef01-1280.webp'
+
+    def test_other_version_ignored(self, tmp_path):
+        """Test a manifest from another format version is not used"""
+        path = tmp_path / 'manifest.json'
+        path.write_text(json.dumps({'version': 99, 'images': {'images/zakat.jpg': make_entry()}}), encoding='utf-8')
+        assert read_manifest(str(path)) == {}
+
+
+class TestBuild:
+    """Test building variants (needs Pillow)"""
+
+    def test_build_and_cache(self, tmp_path):
+        """Test variants and manifest are written, and unchanged posters are not rebuilt"""
+        Image = pytest.importorskip('PIL.Image')
+        (tmp_path / 'images').mkdir()
+        Image.new('RGB', (1500, 2000), (200, 30, 30)).save(tmp_path / 'images' / 'Zakat Poster.png')
+
+        manifest = build(str(tmp_path), widths=(640, 1280, 1920))
+        entry = manifest['images']['images/Zakat Poster.png']
+        assert (entry['width'], entry['height']) == (1500, 2000)
+        assert sorted({variant['width'] for variant in entry['variants']}) == [640, 1280, 1500]
+        for variant in entry['variants']:
+            assert os.path.basename(variant['file']).startswith('zakat-poster-')
+            assert (tmp_path / variant['file']).exists()
+        assert read_manifest(str(tmp_path / 'images' / 'variants' / 'manifest.json')) == manifest
+
+        first = tmp_path / entry['variants'][0]['file']
+        mtime = os.stat(first).st_mtime_ns
+        assert build(str(tmp_path), widths=(640, 1280, 1920)) == manifest
+        assert os.stat(first).st_mtime_ns == mtime
+
+
+class TestImageRoute:
+    """Test /images/ serves the chosen variant"""
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        variants = tmp_path / 'images' / 'variants'
+        variants.mkdir(parents=True)
+        (tmp_path / 'images' / 'zakat.jpg').write_bytes(b'original')
+        entry = make_entry(types=('image/webp', 'image/jpeg'))
+        for variant in entry['variants']:
+            (tmp_path / variant['file']).write_bytes(variant['file'].encode())
+        (variants / 'manifest.json').write_text(
+            json.dumps({'version': 1, 'images': {'images/zakat.jpg': entry}}), encoding='utf-8')
+
+        monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+        monkeypatch.setattr('app._image_manifest', ImageManifest(str(variants / 'manifest.json')))
+        app.config['TESTING'] = True
+        reset_caches()
+        with app.test_client() as client:
+            yield client
+        reset_caches()
+
+    def test_serves_variant(self, client):
+        """Test the best format and width are sent, varying on Accept"""
+        response = client.get('/images/zakat.jpg?w=1080', headers={'Accept': CHROME_ACCEPT})
+
+        assert response.status_code == 200
+        assert response.data == b'images/variants/zakat-abcdef01-1280.webp'
+        assert response.mimetype == 'image/webp'
+        assert 'Accept' in response.headers['Vary']
+        response.close()
+
+    def test_jpeg_fallback(self, client):
+        """Test browsers without WebP get JPEG at the largest width by default"""
+        response = client.get('/images/zakat.jpg', headers={'Accept': '*/*'})
+
+        assert response.data == b'images/variants/zakat-abcdef01-1920.jpg'
+        assert response.mimetype == 'image/jpeg'
+        response.close()
+
+    def test_bad_width_ignored(self, client):
+        """Test a malformed width is treated as no width"""
+        response = client.get('/images/zakat.jpg?w=wide', headers={'Accept': '*/*'})
+
+        assert response.data == b'images/variants/zakat-abcdef01-1920.jpg'
+        response.close()
+
+    def test_original_when_not_built(self, client, tmp_path):
+        """Test a poster missing from the manifest is sent as the original"""
+        (tmp_path / 'images' / 'new.jpg').write_bytes(b'new poster')
+        response = client.get('/images/new.jpg?w=1080', headers={'Accept': CHROME_ACCEPT})
+
+        assert response.status_code == 200
+        assert response.data == b'new poster'
+        response.close()
+
+    def test_missing_image(self, client):
+        """Test an unknown poster is a 404"""
+        assert client.get('/images/missing.jpg').status_code == 404
@@ -0,0 +1,102 @@
+"""
+Unit tests for the Irish summer time helpers (irish_time.py)
+Tests the per-year transition table, UTC conversion and date checks.
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from irish_time import dst_transitions, is_dst, is_dst_on, last_sunday, utc_to_irish
+
+try:
+    from zoneinfo import ZoneInfo
+    DUBLIN = ZoneInfo("Europe/Dublin")
+except Exception:  # zoneinfo or the tz database is not available
+    DUBLIN = None
+
+
+class TestTransitions:
+    """Test the per-year clock change table"""
+    
+    def test_last_sunday(self):
+        """Test last Sundays against known dates"""
+        assert last_sunday(2024, 3) == 31
+        assert last_sunday(2024, 10) == 27
+        assert last_sunday(2025, 3) == 30
+        assert last_sunday(2025, 10) == 26
+        assert last_sunday(2026, 3) == 29
+    
+    def test_dst_transitions(self):
+        """Test transition instants are 01:00 UTC"""
+        transitions = dst_transitions(2024)
+        
+        assert transitions.start == datetime(2024, 3, 31, 1, 0, tzinfo=timezone.utc)
+        assert transitions.end == datetime(2024, 10, 27, 1, 0, tzinfo=timezone.utc)
+        assert transitions.start_day == 31
+        assert transitions.end_day == 27
+    
+    def test_dst_transitions_cached(self):
+        """Test each year is only computed once"""
+        assert dst_transitions(2030) is dst_transitions(2030)
+
+
+class TestIsDst:
+    """Test UTC instant checks"""
+    
+    def test_is_dst_around_start(self):
+        """Test the instant the clocks go forward"""
+        start = datetime(2024, 3, 31, 1, 0, tzinfo=timezone.utc)
+        
+        assert is_dst(start - timedelta(seconds=1)) is False
+        assert is_dst(start) is True
+    
+    def test_is_dst_around_end(self):
+        """Test the instant the clocks go back"""
+        end = datetime(2024, 10, 27, 1, 0, tzinfo=timezone.utc)
+        
+        assert is_dst(end - timedelta(seconds=1)) is True
+        assert is_dst(end) is False
+    
+    def test_utc_to_irish(self):
+        """Test conversion to Irish wall-clock time"""
+        summer = datetime(2024, 7, 15, 23, 30, tzinfo=timezone.utc)
+        winter = datetime(2024, 1, 15, 23, 30, tzinfo=timezone.utc)
+        
+        assert utc_to_irish(summer) == datetime(2024, 7, 16, 0, 30, tzinfo=timezone.utc)
+        assert utc_to_irish(winter) == winter
+    
+    @pytest.mark.skipif(DUBLIN is None, reason="Europe/Dublin tz data not available")
+    def test_matches_zoneinfo(self):
+        """Test every hour across several years against the tz database"""
+        moment = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        while moment.year < 2031:
+            local = moment.astimezone(DUBLIN)
+            # Europe/Dublin models winter as negative DST, so compare UTC offsets
+            assert is_dst(moment) == (local.utcoffset() == timedelta(hours=1)), moment
+            moment += timedelta(hours=1)
+
+
+class TestIsDstOn:
+    """Test calendar date checks"""
+    
+    def test_is_dst_on_transition_sundays(self):
+        """Test the forward Sunday counts as summer time and the back Sunday does not"""
+        assert is_dst_on(2024, 3, 30) is False
+        assert is_dst_on(2024, 3, 31) is True
+        assert is_dst_on(2024, 10, 26) is True
+        assert is_dst_on(2024, 10, 27) is False
+    
+    def test_is_dst_on_whole_months(self):
+        """Test months that are entirely summer or winter time"""
+        assert all(is_dst_on(2025, month, 15) for month in range(4, 10))
+        assert not any(is_dst_on(2025, month, 15) for month in [1, 2, 11, 12])
+    
+    def test_is_dst_on_invalid_date(self):
+        """Test impossible dates do not raise"""
+        assert is_dst_on(2025, 2, 30) is False
+        assert is_dst_on(2025, 4, 31) is True
@@ -0,0 +1,144 @@
+"""
+Unit tests for the metrics registry (metrics.py)
+Tests the Prometheus text output, merging workers and the /metrics route.
+"""
+
+import json
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Registry, WorkerFiles, merge, render
+from app import app
+
+
+def sample_lines(text, name):
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+class TestRegistry:
+    """Test counters, gauges and histograms"""
+
+    def test_counter_and_gauge(self):
+        """Test values are kept per label set"""
+        registry = Registry()
+        requests = registry.counter('requests_total', 'Requests', ('route',))
+        memory = registry.gauge('memory_bytes', 'Memory')
+        requests.inc(route='/')
+        requests.inc(2, route='/')
+        requests.inc(route='/api/day')
+        memory.set(1024)
+
+        text = registry.render()
+        assert '# TYPE requests_total counter' in text
+        assert 'requests_total{route="/"} 3' in text
+        assert 'requests_total{route="/api/day"} 1' in text
+        assert 'memory_bytes 1024' in text
+
+    def test_labels_required(self):
+        """Test a missing label is an error"""
+        registry = Registry()
+        requests = registry.counter('requests_total', 'Requests', ('route',))
+        with pytest.raises(ValueError):
+            requests.inc()
+
+    def test_histogram(self):
+        """Test buckets are cumulative, with +Inf, sum and count"""
+        registry = Registry()
+        latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value)
+
+        assert sample_lines(registry.render(), 'latency_seconds') == [
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            'latency_seconds_sum 4.05',
+            'latency_seconds_count 4'
+        ]
+
+    def test_label_escaping(self):
+        """Test quotes and backslashes in label values are escaped"""
+        registry = Registry()
+        registry.counter('hits_total', 'Hits', ('path',)).inc(path='a"b\\c')
+
+        assert 'hits_total{path="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_collector(self):
+        """Test values read at scrape time are included"""
+        registry = Registry()
+        registry.collector(lambda: [{'name': 'cache_hits_total', 'type': 'counter', 'help': 'Hits',
+                                     'samples': [({'cache': 'index'}, 7)]}])
+
+        assert 'cache_hits_total{cache="index"} 7' in registry.render()
+
+
+class TestWorkers:
+    """Test merging the numbers of several workers"""
+
+    def make_snapshot(self, count, rss):
+        registry = Registry()
+        registry.counter('requests_total', 'Requests', ('route',)).inc(count, route='/')
+        registry.gauge('rss_bytes', 'RSS').set(rss)
+        latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1,))
+        latency.observe(0.05)
+        return registry.snapshot()
+
+    def test_merge(self):
+        """Test counters and histograms add up and gauges keep a pid label"""
+        text = render(merge({101: self.make_snapshot(2, 1000), 102: self.make_snapshot(3, 2000)}))
+
+        assert 'requests_total{route="/"} 5' in text
+        assert 'latency_seconds_count 2' in text
+        assert 'rss_bytes{pid="101"} 1000' in text
+        assert 'rss_bytes{pid="102"} 2000' in text
+
+    def test_worker_files(self, tmp_path):
+        """Test a scrape merges this worker's numbers with other workers' files"""
+        registry = Registry()
+        registry.counter('requests_total', 'Requests', ('route',)).inc(route='/')
+        registry.gauge('rss_bytes', 'RSS').set(500)
+        files = WorkerFiles(registry, str(tmp_path))
+
+        # A worker that has exited: its counts stay, its gauges go
+        exited = tmp_path / 'worker-999999999.json'
+        exited.write_text(json.dumps(self.make_snapshot(4, 1000)), encoding='utf-8')
+
+        text = files.render()
+        assert (tmp_path / f'worker-{os.getpid()}.json').exists()
+        assert 'requests_total{route="/"} 5' in text
+        assert f'rss_bytes{{pid="{os.getpid()}"}} 500' in text
+        assert 'pid="999999999"' not in text
+
+    def test_flush_is_throttled(self, tmp_path):
+        """Test requests only write the file every flush_seconds"""
+        files = WorkerFiles(Registry(), str(tmp_path), flush_seconds=60)
+        with patch.object(files, 'flush', wraps=files.flush) as mock_flush:
+            for _ in range(5):
+                files.maybe_flush()
+
+        assert mock_flush.call_count == 1
+
+
+class TestMetricsRoute:
+    """Test scraping /metrics"""
+
+    def test_scrape(self):
+        """Test a local scrape reports requests, caches and memory"""
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            client.get('/api/announcements/upcoming?limit=0')
+            response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert ('http_request_duration_seconds_count{route="/api/announcements/upcoming",'
+                'method="GET",status="400"}') in text
+        assert 'cache_hits_total{cache="index"}' in text
+        assert 'hijri_conversions_total' in text
+        assert 'process_resident_memory_bytes' in text
@@ -104,6 +104,24 @@ class TestValidateMonth:
         assert result['month'] == 7
         assert result['total_rows'] == 2
         assert 'date_validation' in result
+    
+    def test_validate_month_out_of_range_day(self):
+        """Test a row with day 32 is reported instead of failing the whole file"""
+        csv_data = """MONTH,DATE,FAJR BEGINNING,SUNRISE BEGINNING,ZOHR BEGINNING,ASAR BEGINNING,MAGRIB BEGINNING,ISHA BEGINNING,FAJR JAMAAH,ZOHR JAMAAH,ASAR JAMAAH,MAGRIB JAMAAH,ISHA JAMAAH
+3,1,05:31,07:24,12:52,16:26,18:21,19:41,05:40,13:15,17:15,18:26,20:15
+3,2,05:28,07:22,12:51,16:28,18:23,19:43,05:40,13:15,17:15,18:28,20:15
+3,32,05:26,07:20,12:51,16:29,18:25,19:45,05:35,13:15,17:15,18:30,20:15
+7,1,04:00,06:00,13:30,18:00,20:30,22:00,04:15,14:00,18:30,20:35,22:30"""
+        
+        with patch("builtins.open", mock_open(read_data=csv_data)):
+            validator = PrayerTimeValidator("test_file.csv")
+        
+        result = validator.validate_month(3)
+        
+        assert result['total_rows'] == 2
+        assert result['date_validation']['is_valid'] is False
+        assert result['date_validation']['extra_dates'] == [32]
+        assert validator.validate_month(7)['date_validation']['is_valid'] is True
 
 
 class TestValidateDates:
@@ -392,6 +410,20 @@ class TestZohrJamaahValidation:
             assert violation['date'] == 15  # First date in the data
             assert violation['expected_time'] == "14:00"  # May is after clock forward
             assert violation['actual_time'] == "13:15"
+    
+    def test_malformed_jamaah_reported_as_written(self):
+        """Test a malformed time is reported exactly as it is in the CSV"""
+        csv_data = """MONTH,DATE,FAJR BEGINNING,SUNRISE BEGINNING,ZOHR BEGINNING,ASAR BEGINNING,MAGRIB BEGINNING,ISHA BEGINNING,FAJR JAMAAH,ZOHR JAMAAH,ASAR JAMAAH,MAGRIB JAMAAH,ISHA JAMAAH
+2,15,06:00,08:00,12:30,15:00,17:00,18:30,06:15,13:6O,15:30,17:0S,19:00
+2,16,05:58,08:02,12:31,15:01,17:02,18:32,06:15,13:15,15:30,17:07,19:00"""
+        
+        with patch("builtins.open", mock_open(read_data=csv_data)):
+            validator = PrayerTimeValidator("test_file.csv", year=2024)
+        
+        result = validator.validate_month(2)
+        
+        assert [v['actual_time'] for v in result['zohr_jamaah_validation']['violations']] == ['13:6O']
+        assert [v['actual_jamaah'] for v in result['magrib_jamaah_validation']['violations']] == ['17:0S']
 
 
 class TestMagribJamaahValidation:
@@ -465,20 +497,40 @@ class TestIsAfterClockForward:
         assert validator._is_after_clock_forward(2, 15) is False
     
     def test_transition_months(self, validator):
-        """Test transition months March and October - based on actual implementation"""
-        # Due to implementation logic flow, March always returns False 
-        # because month <= 3 condition is checked before March-specific logic
-        assert validator._is_after_clock_forward(3, 20) is False
-        assert validator._is_after_clock_forward(3, 24) is False
-        assert validator._is_after_clock_forward(3, 25) is False  # This returns False due to month <= 3 check
-        assert validator._is_after_clock_forward(3, 30) is False
-        
-        # October - the else block never executes due to month <= 10 condition
-        # So October dates return True because they satisfy month >= 4 and month <= 10
-        assert validator._is_after_clock_forward(10, 20) is True
-        assert validator._is_after_clock_forward(10, 24) is True
-        assert validator._is_after_clock_forward(10, 25) is True  # Returns True due to month <= 10 check
-        assert validator._is_after_clock_forward(10, 30) is True
+        """Test transition months March and October use the exact last Sunday"""
+        # 2024: clocks went forward on Sunday 31 March and back on Sunday 27 October
+        assert validator._is_after_clock_forward(3, 20, 2024) is False
+        assert validator._is_after_clock_forward(3, 25, 2024) is False
+        assert validator._is_after_clock_forward(3, 30, 2024) is False
+        assert validator._is_after_clock_forward(3, 31, 2024) is True
+        
+        assert validator._is_after_clock_forward(10, 20, 2024) is True
+        assert validator._is_after_clock_forward(10, 26, 2024) is True
+        assert validator._is_after_clock_forward(10, 27, 2024) is False
+        assert validator._is_after_clock_forward(10, 30, 2024) is False
+    
+    def test_transition_dates_differ_by_year(self, validator):
+        """Test the last Sunday moves from year to year"""
+        # 2025: 30 March / 26 October
+        assert validator._is_after_clock_forward(3, 30, 2025) is True
+        assert validator._is_after_clock_forward(3, 29, 2025) is False
+        assert validator._is_after_clock_forward(10, 26, 2025) is False
+        assert validator._is_after_clock_forward(10, 25, 2025) is True
+    
+    def test_uses_validator_year(self):
+        """Test the year given to the validator is used by default"""
+        csv_data = """MONTH,DATE,FAJR BEGINNING,SUNRISE BEGINNING,ZOHR BEGINNING,ASAR BEGINNING,MAGRIB BEGINNING,ISHA BEGINNING,FAJR JAMAAH,ZOHR JAMAAH,ASAR JAMAAH,MAGRIB JAMAAH,ISHA JAMAAH
+3,30,05:31,07:24,12:52,16:26,18:21,19:41,05:40,14:00,17:15,18:26,20:15
+3,31,05:29,07:22,12:52,16:27,18:23,19:43,05:40,14:00,17:15,18:28,20:15"""
+        
+        with patch("builtins.open", mock_open(read_data=csv_data)):
+            validator_2024 = PrayerTimeValidator("test_file.csv", year=2024)
+            validator_2025 = PrayerTimeValidator("test_file.csv", year=2025)
+        
+        assert validator_2024._is_after_clock_forward(3, 30) is False
+        assert validator_2025._is_after_clock_forward(3, 30) is True
+        assert validator_2024.validate_month(3)['zohr_jamaah_validation']['total_violations'] == 1
+        assert validator_2025.validate_month(3)['zohr_jamaah_validation']['is_valid'] is True
 
 
 class TestPrintValidationReport:
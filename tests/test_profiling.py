@@ -0,0 +1,122 @@
+"""
+Unit tests for opt-in request profiling (profiling.py)
+Tests header signing, choosing requests and the files written.
+"""
+
+import os
+import pstats
+import sys
+import time
+from flask import Flask
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import Profiler, ProfilingMiddleware, sign, verify
+
+
+def make_app(profiler):
+    test_app = Flask(__name__)
+
+    @test_app.route('/')
+    def index():
+        time.sleep(0.01)
+        return 'index'
+
+    @test_app.route('/api/day')
+    def api_day():
+        return 'day'
+
+    @test_app.route('/static/<path:filename>')
+    def static_file(filename):
+        return filename
+
+    test_app.wsgi_app = ProfilingMiddleware(test_app.wsgi_app, profiler)
+    return test_app.test_client()
+
+
+def profiles(directory):
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+class TestSignedHeader:
+    """Test the X-Profile header"""
+
+    def test_valid_until_expiry(self):
+        """Test a signed value is accepted until it expires"""
+        value = sign('secret', ttl=60, now=1000)
+
+        assert verify('secret', value, now=1030)
+        assert not verify('secret', value, now=1061)
+
+    def test_rejects_forgeries(self):
+        """Test another secret, an edited expiry or junk is refused"""
+        value = sign('secret', ttl=60, now=1000)
+        expires, signature = value.split('.')
+
+        assert not verify('other', value, now=1000)
+        assert not verify('secret', f"{int(expires) + 3600}.{signature}", now=1000)
+        assert not verify('secret', 'junk', now=1000)
+
+    def test_rejects_non_ascii_expiry(self):
+        """Test an expiry of non-ASCII digits is refused rather than raising"""
+        assert not verify('secret', '\u00b2.x', now=1000)
+        assert not verify('secret', '\u0661\u0662.x', now=1000)
+
+
+class TestFromEnv:
+    """Test configuration from the environment"""
+
+    def test_off_by_default(self):
+        """Test no flag and no secret means no profiler (and no middleware)"""
+        assert Profiler.from_env({}) is None
+        assert Profiler.from_env({'PROFILE': '0'}) is None
+
+    def test_settings(self):
+        """Test the sampling rate, directory and secret are read"""
+        profiler = Profiler.from_env({'PROFILE': '1', 'PROFILE_EVERY': '10', 'PROFILE_DIR': '/tmp/p',
+                                      'PROFILE_SECRET': 's'})
+        assert (profiler.every, profiler.directory, profiler.secret) == (10, '/tmp/p', 's')
+        assert Profiler.from_env({'PROFILE_SECRET': 's'}).every == 0
+
+
+class TestMiddleware:
+    """Test which requests are profiled and what is written"""
+
+    def test_every_nth_request(self, tmp_path):
+        """Test one in N index/API requests is profiled, and other paths never are"""
+        client = make_app(Profiler(str(tmp_path), every=2))
+        for _ in range(4):
+            assert client.get('/api/day').data == b'day'
+        client.get('/static/app.js')
+        client.get('/static/app.js')
+
+        names = profiles(str(tmp_path))
+        assert len(names) == 4  # two profiles, each a .pstats and a .collapsed
+        assert all('api-day' in name for name in names)
+
+    def test_signed_request(self, tmp_path):
+        """Test only requests carrying a valid signed header are profiled"""
+        client = make_app(Profiler(str(tmp_path), secret='secret'))
+        client.get('/')
+        client.get('/', headers={'X-Profile': 'forged.value'})
+        assert profiles(str(tmp_path)) == []
+
+        assert client.get('/', headers={'X-Profile': sign('secret')}).data == b'index'
+        names = profiles(str(tmp_path))
+        assert [name.rsplit('.', 1)[1] for name in names] == ['collapsed', 'pstats']
+
+        stats = pstats.Stats(str(tmp_path / names[1]))
+        assert any(function == 'index' for _, _, function in stats.stats)
+        with open(tmp_path / names[0], encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+        assert any('index (test_profiling.py' in line for line in lines)
+
+    def test_rotation(self, tmp_path):
+        """Test only the newest profiles are kept"""
+        client = make_app(Profiler(str(tmp_path), every=1, keep=2))
+        for _ in range(4):
+            client.get('/api/day')
+
+        assert len(profiles(str(tmp_path))) == 4
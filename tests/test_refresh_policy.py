@@ -0,0 +1,65 @@
+"""
+Unit tests for the per-display refresh policy (refresh_policy.py)
+Tests the device offsets and the /api/refresh-policy route.
+"""
+
+import os
+import sys
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from refresh_policy import MAX_DEVICE_ID_LENGTH, REFRESH_WINDOW_SECONDS, device_offset_ms, refresh_policy
+
+
+class TestDeviceOffset:
+    """Test where each display falls in the refresh window"""
+
+    def test_deterministic(self):
+        """Test a display always gets the same offset"""
+        assert device_offset_ms('display-1') == device_offset_ms('display-1')
+        assert refresh_policy('display-1') == refresh_policy('display-1')
+
+    def test_spread_over_window(self):
+        """Test a fleet's offsets cover the whole window about evenly"""
+        window_ms = REFRESH_WINDOW_SECONDS * 1000
+        offsets = [device_offset_ms(f'display-{number}') for number in range(1000)]
+
+        assert all(0 <= offset < window_ms for offset in offsets)
+        quarters = [sum(1 for offset in offsets if quarter * window_ms / 4 <= offset < (quarter + 1) * window_ms / 4)
+                    for quarter in range(4)]
+        assert min(quarters) > 200
+
+    def test_retry_policy(self):
+        """Test the backoff sent to the displays"""
+        retry = refresh_policy('display-1')['retry']
+
+        assert retry['initial_seconds'] <= retry['max_seconds']
+        assert retry['multiplier'] > 1
+
+
+class TestRefreshPolicyRoute:
+    """Test /api/refresh-policy"""
+
+    def test_policy_for_device(self):
+        """Test a display gets its own policy"""
+        response = app_module.app.test_client().get('/api/refresh-policy?device=display-7')
+
+        assert response.status_code == 200
+        assert response.get_json() == refresh_policy('display-7')
+        assert response.headers['Cache-Control'] == 'private, max-age=86400'
+
+    def test_without_device(self):
+        """Test a display without an id is placed by its address and browser"""
+        client = app_module.app.test_client()
+        first = client.get('/api/refresh-policy', headers={'User-Agent': 'kiosk-a'}).get_json()
+
+        assert first == client.get('/api/refresh-policy', headers={'User-Agent': 'kiosk-a'}).get_json()
+        assert first['offset_ms'] != client.get('/api/refresh-policy', headers={'User-Agent': 'kiosk-b'}).get_json()['offset_ms']
+
+    def test_device_too_long(self):
+        """Test an oversized id is rejected"""
+        device = 'x' * (MAX_DEVICE_ID_LENGTH + 1)
+
+        assert app_module.app.test_client().get(f'/api/refresh-policy?device={device}').status_code == 400
@@ -0,0 +1,307 @@
+"""
+Unit tests for the rendered page cache (render_cache.py)
+Tests LRU behaviour, ETags, conditional responses and coalesced misses.
+"""
+
+import gzip
+import threading
+import time
+import pytest
+from flask import Flask, request
+from markupsafe import Markup
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_cache import FragmentCache, RenderCache, SingleFlight
+
+
+def run_together(count, target):
+    """Start `count` threads running target() and wait for all of them"""
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+class SlowRender:
+    """A render that blocks until released, counting its calls"""
+    
+    def __init__(self, content='<p>page</p>'):
+        self.content = content
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return self.content
+
+
+class TestSingleFlight:
+    """Test the SingleFlight class"""
+    
+    def test_concurrent_calls_run_once(self):
+        """Test callers arriving during a call wait for it and share its result"""
+        flights = SingleFlight()
+        render = SlowRender()
+        
+        threads, results = run_together(1, lambda: flights.do('key', render))
+        render.started.wait(5)
+        more, more_results = run_together(4, lambda: flights.do('key', render))
+        while flights.coalesced < 4:
+            time.sleep(0.001)
+        render.release.set()
+        for thread in threads + more:
+            thread.join(5)
+        
+        assert render.calls == 1
+        assert results + more_results == ['<p>page</p>'] * 5
+        assert flights.coalesced == 4
+    
+    def test_error_not_remembered(self):
+        """Test an error reaches the caller, and the next call runs again"""
+        flights = SingleFlight()
+        calls = []
+        
+        def failing():
+            calls.append(1)
+            raise OverflowError('out of range')
+        
+        with pytest.raises(OverflowError):
+            flights.do('key', failing)
+        with pytest.raises(OverflowError):
+            flights.do('key', failing)
+        assert len(calls) == 2
+    
+    def test_different_keys_not_coalesced(self):
+        """Test calls for other keys don't wait"""
+        flights = SingleFlight()
+        
+        assert flights.do('a', lambda: 'A') == 'A'
+        assert flights.do('b', lambda: 'B') == 'B'
+        assert flights.coalesced == 0
+
+
+class TestRenderCache:
+    """Test the RenderCache class"""
+    
+    def test_put_and_get(self):
+        """Test a stored page is returned with its body encoded"""
+        cache = RenderCache()
+        page = cache.put('key', '<p>salaam</p>')
+        
+        assert cache.get('key') is page
+        assert page.body == b'<p>salaam</p>'
+        assert page.headers == {'Cache-Control': 'no-cache'}
+    
+    def test_get_missing(self):
+        """Test a miss returns None and is counted"""
+        cache = RenderCache()
+        
+        assert cache.get('missing') is None
+        assert cache.misses == 1
+        assert cache.hits == 0
+    
+    def test_etag_tracks_body(self):
+        """Test identical bodies share an ETag and different bodies do not"""
+        cache = RenderCache()
+        
+        assert cache.put('a', 'one').etag == cache.put('b', 'one').etag
+        assert cache.put('c', 'two').etag != cache.get('a').etag
+    
+    def test_lru_eviction(self):
+        """Test the least recently used page is evicted first"""
+        cache = RenderCache(max_entries=2)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        cache.get('a')
+        cache.put('c', 'C')
+        
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert len(cache) == 2
+    
+    def test_get_or_put(self):
+        """Test a missing page is rendered and stored, then served from the cache"""
+        cache = RenderCache()
+        calls = []
+        render = lambda: calls.append(1) or '{"day": 1}'
+        
+        page = cache.get_or_put('key', render, mimetype='application/json')
+        
+        assert cache.get_or_put('key', render) is page
+        assert page.mimetype == 'application/json'
+        assert len(calls) == 1
+    
+    def test_get_or_put_none_not_cached(self):
+        """Test a render returning None is passed on and not stored"""
+        cache = RenderCache()
+        
+        assert cache.get_or_put('key', lambda: None) is None
+        assert cache.get('key') is None
+    
+    def test_concurrent_misses_render_once(self):
+        """Test requests missing together wait for one render"""
+        cache = RenderCache()
+        render = SlowRender()
+        
+        threads, results = run_together(1, lambda: cache.get_or_put('key', render))
+        render.started.wait(5)
+        more, more_results = run_together(9, lambda: cache.get_or_put('key', render))
+        while cache.coalesced < 9:
+            time.sleep(0.001)
+        render.release.set()
+        for thread in threads + more:
+            thread.join(5)
+        
+        assert render.calls == 1
+        assert len({id(page) for page in results + more_results}) == 1
+        assert cache.get('key').body == b'<p>page</p>'
+    
+    def test_clear(self):
+        """Test clear drops all pages"""
+        cache = RenderCache()
+        cache.put('a', 'A')
+        cache.clear()
+        
+        assert len(cache) == 0
+
+
+class TestFragmentCache:
+    """Test the FragmentCache class"""
+    
+    def test_renders_once(self):
+        """Test a fragment is rendered on the first request only"""
+        cache = FragmentCache()
+        calls = []
+        render = lambda: calls.append(1) or '<td>05:30</td>'
+        
+        assert cache.get_or_render('key', render) == '<td>05:30</td>'
+        assert cache.get_or_render('key', render) == '<td>05:30</td>'
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_not_escaped_again(self):
+        """Test fragments are Markup, so templates insert them as they are"""
+        fragment = FragmentCache().get_or_render('key', lambda: '<b>Fajr</b>')
+        
+        assert str(Markup('{}').format(fragment)) == '<b>Fajr</b>'
+    
+    def test_lru_eviction(self):
+        """Test the least recently used fragment is evicted first"""
+        cache = FragmentCache(max_entries=2)
+        cache.get_or_render('a', lambda: 'A')
+        cache.get_or_render('b', lambda: 'B')
+        cache.get_or_render('a', lambda: 'A')
+        cache.get_or_render('c', lambda: 'C')
+        
+        assert cache.get_or_render('b', lambda: 'new B') == 'new B'
+        assert len(cache) == 2
+    
+    def test_concurrent_misses_render_once(self):
+        """Test a new fragment wanted by many requests at once is rendered once"""
+        cache = FragmentCache()
+        render = SlowRender('<td>05:30</td>')
+        
+        threads, results = run_together(1, lambda: cache.get_or_render('key', render))
+        render.started.wait(5)
+        more, more_results = run_together(3, lambda: cache.get_or_render('key', render))
+        while cache.coalesced < 3:
+            time.sleep(0.001)
+        render.release.set()
+        for thread in threads + more:
+            thread.join(5)
+        
+        assert render.calls == 1
+        assert results + more_results == ['<td>05:30</td>'] * 4
+
+
+class TestCachedPageResponse:
+    """Test building responses from cached pages"""
+    
+    @pytest.fixture
+    def flask_app(self):
+        return Flask(__name__)
+    
+    def test_full_response(self, flask_app):
+        """Test a normal request gets the body, ETag and headers"""
+        page = RenderCache().put('a', '<p>page</p>')
+        
+        with flask_app.test_request_context('/'):
+            response = page.to_response(request)
+        
+        assert response.status_code == 200
+        assert response.get_data() == b'<p>page</p>'
+        assert response.get_etag() == (page.etag, False)
+        assert response.headers['Cache-Control'] == 'no-cache'
+    
+    def test_not_modified_response(self, flask_app):
+        """Test a matching If-None-Match gets an empty 304"""
+        page = RenderCache().put('a', '<p>page</p>')
+        
+        with flask_app.test_request_context('/', headers={'If-None-Match': f'"{page.etag}"'}):
+            response = page.to_response(request)
+        
+        assert response.status_code == 304
+        assert response.get_data() == b''
+        assert response.get_etag() == (page.etag, False)
+    
+    def test_compressed_response(self, flask_app):
+        """Test a client that accepts gzip gets a gzip body with its own ETag"""
+        html = '<p>' + 'salaam ' * 200 + '</p>'
+        page = RenderCache().put('a', html)
+        
+        with flask_app.test_request_context('/', headers={'Accept-Encoding': 'gzip, deflate'}):
+            response = page.to_response(request)
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert gzip.decompress(response.get_data()).decode('utf-8') == html
+        assert response.get_etag() == (f'{page.etag}-gzip', False)
+        assert page.encoded['gzip'] == response.get_data()
+    
+    def test_compressed_not_modified(self, flask_app):
+        """Test the gzip ETag revalidates only the gzip representation"""
+        page = RenderCache().put('a', 'x' * 1000)
+        
+        with flask_app.test_request_context('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{page.etag}-gzip"'}):
+            assert page.to_response(request).status_code == 304
+        with flask_app.test_request_context('/', headers={'If-None-Match': f'"{page.etag}-gzip"'}):
+            assert page.to_response(request).status_code == 200
+    
+    def test_compressed_not_modified_by_plain_etag(self, flask_app):
+        """Test a gzip client revalidating with the plain ETag gets a 304"""
+        page = RenderCache().put('a', 'x' * 1000)
+        
+        with flask_app.test_request_context('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{page.etag}"'}):
+            response = page.to_response(request)
+        
+        assert response.status_code == 304
+        assert response.get_etag() == (f'{page.etag}-gzip', False)
+    
+    def test_uncompressed_response_varies(self, flask_app):
+        """Test a client without gzip gets the plain body, still marked Vary"""
+        page = RenderCache().put('a', 'x' * 1000)
+        
+        with flask_app.test_request_context('/', headers={'Accept-Encoding': 'gzip;q=0'}):
+            response = page.to_response(request)
+        
+        assert 'Content-Encoding' not in response.headers
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert response.get_data() == b'x' * 1000
+    
+    def test_small_page_not_compressed(self, flask_app):
+        """Test tiny pages are sent as they are"""
+        page = RenderCache().put('a', '<p>page</p>')
+        
+        with flask_app.test_request_context('/', headers={'Accept-Encoding': 'gzip'}):
+            response = page.to_response(request)
+        
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_etag() == (page.etag, False)
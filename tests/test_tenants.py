@@ -0,0 +1,184 @@
+"""
+Unit tests for the per-mosque timetable cache (tenants.py)
+Tests lazy loading, LRU eviction, memory accounting and concurrent loads.
+"""
+
+import threading
+import pytest
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tenants import TimetableStore, is_valid_mosque_id, tenant_csv_path
+from timetable import Timetable
+
+
+ROW = ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15']
+
+
+def make_timetable(mosque_id):
+    return Timetable.from_rows([ROW])
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = []
+    
+    def __call__(self, mosque_id):
+        self.calls.append(mosque_id)
+        if mosque_id == 'missing':
+            raise FileNotFoundError(mosque_id)
+        return make_timetable(mosque_id)
+
+
+class TestMosqueIds:
+    """Test mosque id validation and paths"""
+    
+    def test_valid_ids(self):
+        """Test ordinary ids are accepted"""
+        for mosque_id in ['dublin', 'dublin-central', 'masjid_2', '42']:
+            assert is_valid_mosque_id(mosque_id)
+    
+    def test_invalid_ids(self):
+        """Test ids that could escape the data directory are rejected"""
+        for mosque_id in ['', '..', '../etc', 'a/b', 'Dublin', '-x', 'a' * 65]:
+            assert not is_valid_mosque_id(mosque_id)
+    
+    def test_tenant_csv_path(self):
+        """Test the CSV lives in data/<mosque_id>/"""
+        assert tenant_csv_path('data', 'dublin') == os.path.join('data', 'dublin', 'prayer_times.csv')
+        with pytest.raises(ValueError):
+            tenant_csv_path('data', '../secret')
+
+
+class TestTimetableStore:
+    """Test the lazy LRU cache"""
+    
+    def test_lazy_load_once(self):
+        """Test a timetable is loaded on first use and then reused"""
+        loader = CountingLoader()
+        store = TimetableStore(loader)
+        
+        first = store.get('dublin')
+        second = store.get('dublin')
+        
+        assert first is second
+        assert loader.calls == ['dublin']
+        assert (store.hits, store.misses) == (1, 1)
+    
+    def test_memory_accounting(self):
+        """Test per-mosque and total bytes"""
+        store = TimetableStore(CountingLoader())
+        store.get('a')
+        store.get('b')
+        
+        sizes = store.memory_by_tenant()
+        
+        assert list(sizes) == ['a', 'b']
+        assert sizes['a'] == make_timetable('a').memory_size()
+        assert store.memory_size() == sum(sizes.values())
+    
+    def test_evicts_least_recently_used_by_bytes(self):
+        """Test the oldest timetable is dropped when over the byte limit"""
+        size = make_timetable('x').memory_size()
+        store = TimetableStore(CountingLoader(), max_bytes=size * 2)
+        store.get('a')
+        store.get('b')
+        store.get('a')  # a is now the most recently used
+        
+        store.get('c')
+        
+        assert 'b' not in store
+        assert 'a' in store and 'c' in store
+        assert store.evictions == 1
+        assert store.memory_size() <= size * 2
+    
+    def test_max_entries(self):
+        """Test the optional entry limit"""
+        store = TimetableStore(CountingLoader(), max_entries=2)
+        for mosque_id in ['a', 'b', 'c']:
+            store.get(mosque_id)
+        
+        assert len(store) == 2
+        assert 'a' not in store
+    
+    def test_keeps_one_oversized_timetable(self):
+        """Test a single timetable bigger than the limit is still served"""
+        store = TimetableStore(CountingLoader(), max_bytes=1)
+        
+        assert store.get('a') is not None
+        assert len(store) == 1
+    
+    def test_failed_load_not_cached(self):
+        """Test errors reach the caller and are retried next time"""
+        loader = CountingLoader()
+        store = TimetableStore(loader)
+        
+        for _ in range(2):
+            with pytest.raises(FileNotFoundError):
+                store.get('missing')
+        
+        assert loader.calls == ['missing', 'missing']
+        assert len(store) == 0
+    
+    def test_invalidate(self):
+        """Test a forgotten timetable is reloaded"""
+        loader = CountingLoader()
+        store = TimetableStore(loader)
+        store.get('a')
+        
+        store.invalidate('a')
+        store.get('a')
+        
+        assert loader.calls == ['a', 'a']
+        assert store.memory_size() == make_timetable('a').memory_size()
+    
+    def test_concurrent_misses_load_once(self):
+        """Test requests for a mosque being loaded wait for that load"""
+        release = threading.Event()
+        calls = []
+        
+        def slow_loader(mosque_id):
+            calls.append(mosque_id)
+            release.wait(2)
+            return make_timetable(mosque_id)
+        
+        store = TimetableStore(slow_loader)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.get('slow'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(2)
+        
+        assert calls == ['slow']
+        assert len(results) == 5 and all(result is results[0] for result in results)
+    
+    def test_slow_load_does_not_block_other_mosques(self):
+        """Test a cache miss for one mosque never stalls another"""
+        release = threading.Event()
+        started = threading.Event()
+        
+        def loader(mosque_id):
+            if mosque_id == 'slow':
+                started.set()
+                release.wait(5)
+            return make_timetable(mosque_id)
+        
+        store = TimetableStore(loader)
+        store.get('fast')
+        slow = threading.Thread(target=store.get, args=('slow',))
+        slow.start()
+        started.wait(2)
+        
+        fast_hit = store.get('fast')
+        fast_miss = store.get('other')
+        still_loading = slow.is_alive()
+        release.set()
+        slow.join(2)
+        
+        assert fast_hit is not None and fast_miss is not None
+        assert still_loading
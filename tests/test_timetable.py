@@ -0,0 +1,265 @@
+"""
+Unit tests for the in-memory timetable store (timetable.py)
+Tests record parsing, (month, day) lookups and CSV loading.
+"""
+
+import pytest
+from datetime import date
+from unittest.mock import patch, mock_open
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timetable import CSV_HEADER, MISSING, DerivedTime, PrayerDay, Timetable, derive_minutes, minutes_to_time, time_to_minutes
+
+
+SAMPLE_CSV = """MONTH,DATE,FAJR BEGINNING,SUNRISE BEGINNING,ZOHR BEGINNING,ASAR BEGINNING,MAGRIB BEGINNING,ISHA BEGINNING,FAJR JAMAAH,ZOHR JAMAAH,ASAR JAMAAH,MAGRIB JAMAAH,ISHA JAMAAH
+3,1,05:31,07:24,12:52,16:26,18:21,19:41,05:40,13:15,17:15,18:26,20:15
+3,2,05:28,07:22,12:51,16:28,18:23,19:43,05:40,13:15,17:15,18:28,20:15
+4,1,05:20,07:10,13:50,17:30,19:20,20:45,05:30,14:00,18:00,19:25,21:00"""
+
+
+class TestTimeConversion:
+    """Test the minutes-since-midnight helpers"""
+
+    def test_time_to_minutes(self):
+        """Test HH:MM strings convert to minutes"""
+        assert time_to_minutes('00:00') == 0
+        assert time_to_minutes('05:31') == 331
+        assert time_to_minutes('23:59') == 1439
+        assert time_to_minutes('5:07') == 307
+
+    def test_time_to_minutes_invalid(self):
+        """Test blank and unparseable times become MISSING"""
+        for value in ['', 'invalid', 'ab:cd', '12', None]:
+            assert time_to_minutes(value) == MISSING
+
+    def test_minutes_to_time(self):
+        """Test minutes convert back to zero-padded HH:MM"""
+        assert minutes_to_time(0) == '00:00'
+        assert minutes_to_time(331) == '05:31'
+        assert minutes_to_time(1439) == '23:59'
+        assert minutes_to_time(1599) == '26:39'
+        assert minutes_to_time(MISSING) == ''
+
+
+class TestPrayerDay:
+    """Test the PrayerDay record"""
+
+    def test_from_row(self):
+        """Test typed fields are parsed from a raw CSV row"""
+        row = ['3', '1', '05:31', '07:24', '12:52', '16:26', '18:21', '19:41', '05:40', '13:15', '17:15', '18:26', '20:15']
+
+        day = PrayerDay.from_row(row)
+
+        assert day.month == 3
+        assert day.day == 1
+        assert day.fajr_begin == '05:31'
+        assert day.isha_jamaah == '20:15'
+
+    def test_positional_and_header_access(self):
+        """Test rows can be read by CSV index and by CSV header"""
+        row = ['3', '1', '05:31', '07:24', '12:52', '16:26', '18:21', '19:41', '05:40', '13:15', '17:15', '18:26', '20:15']
+
+        day = PrayerDay.from_row(row)
+
+        assert day[2] == '05:31'
+        assert day['FAJR BEGINNING'] == '05:31'
+        assert day['ZOHR JAMAAH'] == '13:15'
+        assert day['DATE'] == 1
+
+    def test_as_row_round_trip(self):
+        """Test as_row returns the original CSV strings"""
+        row = ['3', '1', '05:31', '07:24', '12:52', '16:26', '18:21', '19:41', '05:40', '13:15', '17:15', '18:26', '20:15']
+
+        assert PrayerDay.from_row(row).as_row() == row
+
+    def test_from_dict_missing_columns(self):
+        """Test missing columns become empty strings"""
+        day = PrayerDay.from_dict({'MONTH': '3', 'DATE': '1', 'FAJR BEGINNING': '05:31'})
+
+        assert day.fajr_begin == '05:31'
+        assert day.isha_jamaah == ''
+        assert len(day) == len(CSV_HEADER)
+
+    def test_from_row_invalid_date(self):
+        """Test non-numeric month/day raise ValueError"""
+        with pytest.raises(ValueError):
+            PrayerDay.from_row(['3', 'invalid_date', '05:31'])
+
+
+class TestTimetable:
+    """Test the Timetable index"""
+
+    @pytest.fixture
+    def timetable(self):
+        with patch("builtins.open", mock_open(read_data=SAMPLE_CSV)):
+            return Timetable.from_csv("test_file.csv")
+
+    def test_from_csv(self, timetable):
+        """Test all rows are loaded in file order"""
+        assert len(timetable) == 3
+        assert [(day.month, day.day) for day in timetable] == [(3, 1), (3, 2), (4, 1)]
+
+    def test_from_csv_opens_utf8(self):
+        """Test the CSV is opened once with UTF-8 encoding"""
+        with patch("builtins.open", mock_open(read_data=SAMPLE_CSV)) as mock_file:
+            Timetable.from_csv("test_file.csv")
+
+        mock_file.assert_called_once_with("test_file.csv", 'r', encoding='utf-8')
+
+    def test_get(self, timetable):
+        """Test lookup by month and day"""
+        assert timetable.get(3, 2).fajr_begin == '05:28'
+        assert timetable.get(4, 1).zohr_jamaah == '14:00'
+
+    def test_get_missing(self, timetable):
+        """Test lookup of a day that is not in the CSV"""
+        assert timetable.get(12, 25) is None
+
+    def test_for_date(self, timetable):
+        """Test lookup ignores the year"""
+        assert timetable.for_date(date(2024, 3, 1)).fajr_begin == '05:31'
+        assert timetable.for_date(date(2031, 3, 1)).fajr_begin == '05:31'
+
+    def test_month(self, timetable):
+        """Test month returns that month's rows in order"""
+        assert [day.day for day in timetable.month(3)] == [1, 2]
+        assert timetable.month(7) == []
+
+    def test_from_dicts(self):
+        """Test building from csv.DictReader rows"""
+        rows = [dict(zip(CSV_HEADER, ['3', '1', '05:31', '07:24', '12:52', '16:26', '18:21', '19:41', '05:40', '13:15', '17:15', '18:26', '20:15']))]
+
+        timetable = Timetable.from_dicts(rows)
+
+        assert timetable.get(3, 1).magrib_jamaah == '18:26'
+
+    def test_version_changes_with_data(self, timetable):
+        """Test the version fingerprint tracks the data"""
+        same = Timetable(list(timetable))
+        changed = Timetable(list(timetable)[:2])
+
+        assert same.version == timetable.version
+        assert changed.version != timetable.version
+
+    def test_empty(self):
+        """Test an empty timetable"""
+        timetable = Timetable.from_rows([])
+
+        assert len(timetable) == 0
+        assert timetable.get(1, 1) is None
+
+
+class TestColumnarStorage:
+    """Test the minutes-since-midnight columns behind the timetable"""
+
+    @pytest.fixture
+    def timetable(self):
+        with patch("builtins.open", mock_open(read_data=SAMPLE_CSV)):
+            return Timetable.from_csv("test_file.csv")
+
+    def test_columns_hold_minutes(self, timetable):
+        """Test each time column is an unsigned short array of minutes"""
+        column = timetable.columns['FAJR BEGINNING']
+
+        assert column.typecode == 'H'
+        assert list(column) == [331, 328, 320]
+
+    def test_minutes(self, timetable):
+        """Test single time lookups as integers"""
+        assert timetable.minutes(3, 2, 'ZOHR JAMAAH') == 795
+        assert timetable.minutes(12, 25, 'ZOHR JAMAAH') is None
+
+    def test_month_minutes(self, timetable):
+        """Test a month's column comes back in file order"""
+        assert timetable.month_minutes(3, 'MAGRIB BEGINNING') == [1101, 1103]
+        assert timetable.month_minutes(7, 'MAGRIB BEGINNING') == []
+
+    def test_invalid_times_are_missing(self):
+        """Test blank/unparseable times are stored as MISSING and shown blank"""
+        timetable = Timetable.from_rows([['3', '1', 'bad', '07:24']])
+
+        assert timetable.minutes(3, 1, 'FAJR BEGINNING') == MISSING
+        assert timetable.minutes(3, 1, 'ISHA JAMAAH') == MISSING
+        assert timetable.get(3, 1).fajr_begin == ''
+        assert timetable.get(3, 1).sunrise_begin == '07:24'
+
+    def test_invalid_dates_rejected(self):
+        """Test impossible months/days raise ValueError"""
+        with pytest.raises(ValueError):
+            Timetable.from_rows([['13', '1', '05:31']])
+        with pytest.raises(ValueError):
+            Timetable.from_rows([['3', '0', '05:31']])
+
+    def test_invalid_dates_skipped(self):
+        """Test impossible months/days are collected when a skipped list is given"""
+        skipped = []
+        timetable = Timetable.from_rows([['3', '1', '05:31'], ['3', '32', '05:28'], ['13', '1', '05:26']],
+                                        skipped=skipped)
+        assert len(timetable) == 1
+        assert skipped == [['3', '32', '05:28'], ['13', '1', '05:26']]
+
+    def test_get_out_of_range(self, timetable):
+        """Test lookups outside the calendar return None"""
+        assert timetable.get(0, 1) is None
+        assert timetable.get(3, 40) is None
+
+    def test_memory_size(self):
+        """Test a full year stays far below one Python string per time"""
+        rows = [[str(month), str(day)] + ['05:31'] * 11 for month in range(1, 13) for day in range(1, 31)]
+        timetable = Timetable.from_rows(rows)
+
+        assert timetable.memory_size() < len(rows) * 11 * sys.getsizeof('05:31') / 5
+
+
+class TestDerivedTimes:
+    """Test the derived times computed when the timetable loads"""
+
+    @pytest.fixture
+    def timetable(self):
+        with patch("builtins.open", mock_open(read_data=SAMPLE_CSV)):
+            return Timetable.from_csv("test_file.csv")
+
+    def test_default_rules(self, timetable):
+        """Test Sehri ends and Noon are 10 minutes before Fajr and Zohr"""
+        assert timetable.derived_times(3, 1) == {'sehri_ends': '05:21', 'sunrise': '07:24', 'noon': '12:42'}
+        assert list(timetable.derived['noon']) == [762, 761, 820]
+
+    def test_derived_times_missing_row(self, timetable):
+        """Test days without a row have no derived times"""
+        assert timetable.derived_times(12, 25) is None
+
+    def test_custom_rules(self):
+        """Test another mosque's offsets"""
+        rules = [DerivedTime('sehri_ends', 'FAJR BEGINNING', -15), DerivedTime('ishraq', 'SUNRISE BEGINNING', 20)]
+
+        with patch("builtins.open", mock_open(read_data=SAMPLE_CSV)):
+            timetable = Timetable.from_csv("test_file.csv", rules)
+
+        assert timetable.derived_times(3, 2) == {'sehri_ends': '05:13', 'ishraq': '07:42'}
+
+    def test_rules_change_version(self, timetable):
+        """Test changing the rules changes the version so cached pages are rebuilt"""
+        rules = [DerivedTime('sehri_ends', 'FAJR BEGINNING', -15)]
+
+        assert Timetable(list(timetable), rules).version != timetable.version
+
+    def test_unknown_column_rejected(self):
+        """Test a rule naming a column that is not in the CSV"""
+        with pytest.raises(ValueError):
+            Timetable.from_rows([], [DerivedTime('tahajjud', 'TAHAJJUD BEGINNING', -60)])
+
+    def test_derive_minutes(self):
+        """Test offsets wrap around midnight and missing stays missing"""
+        assert derive_minutes(5, -10) == 1435
+        assert derive_minutes(1435, 10) == 5
+        assert derive_minutes(MISSING, -10) == MISSING
+
+    def test_missing_source_time(self):
+        """Test a blank source time gives a blank derived time"""
+        timetable = Timetable.from_rows([['3', '1', '', '07:24', '12:52']])
+
+        assert timetable.derived_times(3, 1) == {'sehri_ends': '', 'sunrise': '07:24', 'noon': '12:42'}
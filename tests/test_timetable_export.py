@@ -0,0 +1,120 @@
+"""
+Unit tests for the range export generators (timetable_export.py)
+Tests date walking, NDJSON and CSV output and chunking.
+"""
+
+import csv
+import io
+import json
+from datetime import date
+import sys
+import os
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import timetable_export
+from timetable import Timetable
+from timetable_export import EXPORT_CSV_HEADER, iter_csv, iter_days, iter_ndjson
+
+
+ROWS = [
+    ['2', '28', '06:10', '07:40', '12:45', '15:30', '17:50', '19:10', '06:30', '13:15', '16:00', '17:55', '19:45'],
+    ['3', '1', '06:08', '07:38', '12:45', '15:32', '17:52', '19:12', '06:30', '13:15', '16:00', '17:57', '19:45'],
+    ['3', '2', '06:06', '07:36', '12:44', '15:34', '17:54', '19:14', '06:30', '13:15', '16:00', '17:59', '19:45']
+]
+
+
+class TestIterDays:
+    """Test walking a date range over the timetable"""
+    
+    def test_iter_days_inclusive(self):
+        """Test both ends of the range are included"""
+        timetable = Timetable.from_rows(ROWS)
+        
+        days = [day for day, row in iter_days(timetable, date(2025, 2, 28), date(2025, 3, 2))]
+        
+        assert days == [date(2025, 2, 28), date(2025, 3, 1), date(2025, 3, 2)]
+    
+    def test_iter_days_skips_missing_rows(self):
+        """Test dates without a row (29 Feb, other months) are skipped"""
+        timetable = Timetable.from_rows(ROWS)
+        
+        days = [day for day, row in iter_days(timetable, date(2024, 2, 27), date(2024, 3, 1))]
+        
+        assert days == [date(2024, 2, 28), date(2024, 3, 1)]
+    
+    def test_iter_days_across_years(self):
+        """Test the same rows are reused every year"""
+        timetable = Timetable.from_rows(ROWS)
+        
+        rows = [row for day, row in iter_days(timetable, date(2025, 3, 1), date(2027, 3, 1)) if day.month == 3 and day.day == 1]
+        
+        assert len(rows) == 3
+    
+    def test_iter_days_empty_range(self):
+        """Test a range that ends before it starts yields nothing"""
+        timetable = Timetable.from_rows(ROWS)
+        
+        assert list(iter_days(timetable, date(2025, 3, 2), date(2025, 3, 1))) == []
+
+
+class TestIterNdjson:
+    """Test NDJSON export"""
+    
+    def test_ndjson_lines(self):
+        """Test one JSON object per date"""
+        timetable = Timetable.from_rows(ROWS)
+        
+        text = ''.join(iter_ndjson(timetable, date(2025, 2, 28), date(2025, 3, 2)))
+        lines = [json.loads(line) for line in text.splitlines()]
+        
+        assert [line['date'] for line in lines] == ['2025-02-28', '2025-03-01', '2025-03-02']
+        assert lines[0]['beginning']['fajr'] == '06:10'
+        assert lines[0]['jamaah']['magrib'] == '17:55'
+        assert lines[0]['important'] == {'sehri_ends': '06:00', 'sunrise': '07:40', 'noon': '12:35'}
+        assert lines[0]['islamic_date'] == '29 Sha\'ban 1446'
+        assert lines[1]['islamic_date'] == '1 Ramadan 1446'
+        assert text.endswith('\n')
+    
+    def test_ndjson_chunks(self, monkeypatch):
+        """Test rows are grouped into chunks"""
+        monkeypatch.setattr(timetable_export, 'CHUNK_ROWS', 2)
+        timetable = Timetable.from_rows(ROWS)
+        
+        chunks = list(iter_ndjson(timetable, date(2025, 2, 28), date(2025, 3, 2)))
+        
+        assert [chunk.count('\n') for chunk in chunks] == [2, 1]
+
+
+class TestIterCsv:
+    """Test CSV export"""
+    
+    def test_csv_rows(self):
+        """Test the header and one row per date"""
+        timetable = Timetable.from_rows(ROWS)
+        
+        text = ''.join(iter_csv(timetable, date(2025, 3, 1), date(2025, 3, 2)))
+        rows = list(csv.reader(io.StringIO(text)))
+        
+        assert rows[0] == EXPORT_CSV_HEADER
+        assert rows[1] == ['2025-03-01'] + ROWS[1][2:] + ['05:58', '12:35', '1 Ramadan 1446']
+        assert len(rows) == 3
+    
+    def test_csv_empty_range(self):
+        """Test an empty range still yields the header"""
+        timetable = Timetable.from_rows(ROWS)
+        
+        text = ''.join(iter_csv(timetable, date(2025, 7, 1), date(2025, 7, 2)))
+        
+        assert text == ','.join(EXPORT_CSV_HEADER) + '\n'
+    
+    def test_csv_chunks(self, monkeypatch):
+        """Test rows are grouped into chunks without repeating the header"""
+        monkeypatch.setattr(timetable_export, 'CHUNK_ROWS', 2)
+        timetable = Timetable.from_rows(ROWS)
+        
+        chunks = list(iter_csv(timetable, date(2025, 2, 28), date(2025, 3, 2)))
+        
+        assert len(chunks) == 2
+        assert ''.join(chunks).count('DATE,') == 1
@@ -0,0 +1,97 @@
+"""
+Unit tests for the pre-baked year bundles (year_bundle.py)
+Tests baking, loading, the version check and /api/day using a bundle.
+"""
+
+import os
+import sys
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+# Add parent directory to Python path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from timetable import Timetable
+from year_bundle import YearBundle, YearBundles, build_bundle, bundle_path, write_bundle
+
+
+ROWS = [
+    ['3', '15', '05:30', '07:25', '12:50', '16:30', '18:25', '19:45', '05:40', '13:15', '17:15', '18:35', '20:15'],
+    ['3', '16', '05:28', '07:27', '12:50', '16:31', '18:27', '19:47', '05:40', '13:15', '17:15', '18:37', '20:15'],
+    ['12', '31', '06:50', '08:40', '12:30', '14:10', '16:20', '18:05', '07:00', '13:00', '14:30', '16:25', '19:30'],
+    ['1', '1', '06:50', '08:41', '12:31', '14:11', '16:21', '18:06', '07:00', '13:00', '14:30', '16:25', '19:30']
+]
+
+
+@pytest.fixture
+def timetable():
+    return Timetable.from_rows(ROWS, app_module.IMPORTANT_TIME_RULES)
+
+
+@pytest.fixture
+def bundle(timetable):
+    return build_bundle(2026, timetable.version, lambda day: app_module.compute_day_payload(timetable, day))
+
+
+class TestBuildBundle:
+    """Test baking a year"""
+
+    def test_same_as_computed(self, timetable, bundle):
+        """Test every baked day is the /api/day body the app would build"""
+        baked = YearBundle(bundle)
+
+        for day in [date(2026, 3, 15), date(2026, 3, 16), date(2026, 12, 31), date(2026, 1, 1)]:
+            assert baked.payload(day) == app_module.compute_day_payload(timetable, day)
+        assert len(baked) == 5  # the four rows in 2026, and 1 Jan 2027
+
+    def test_tomorrow_pointer(self, bundle):
+        """Test each day points at the next, including across the new year"""
+        assert bundle['days']['2026-03-15']['tomorrow'] == '2026-03-16'
+        assert bundle['days']['2026-03-16']['tomorrow'] is None
+        assert bundle['days']['2026-12-31']['tomorrow'] == '2027-01-01'
+        assert YearBundle(bundle).payload(date(2026, 12, 31))['tomorrow']['beginning']['fajr'] == '06:50'
+
+    def test_missing_days(self, bundle):
+        """Test days without a CSV row are null"""
+        assert bundle['days']['2026-06-01'] is None
+        assert YearBundle(bundle).payload(date(2026, 6, 1)) is None
+
+
+class TestYearBundles:
+    """Test loading bundles from a directory"""
+
+    def test_version_must_match(self, tmp_path, timetable, bundle):
+        """Test a bundle for another timetable version is not used"""
+        write_bundle(bundle, bundle_path(str(tmp_path), 2026))
+        bundles = YearBundles(str(tmp_path))
+
+        assert bundles.payload(timetable.version, date(2026, 3, 15))['today']['beginning']['fajr'] == '05:30'
+        assert bundles.payload('other', date(2026, 3, 15)) is None
+        assert bundles.payload(timetable.version, date(2025, 3, 15)) is None
+
+    def test_invalid_bundle(self, tmp_path, timetable):
+        """Test an unreadable bundle is ignored"""
+        (tmp_path / 'year-2026.json').write_text('{"format": 99}', encoding='utf-8')
+
+        assert YearBundles(str(tmp_path)).payload(timetable.version, date(2026, 3, 15)) is None
+
+
+class TestApiDayFromBundle:
+    """Test /api/day answers from the bundle"""
+
+    def test_served_from_bundle(self, tmp_path):
+        """Test a baked day is sent without building it again"""
+        with patch('app.load_prayer_times', return_value=ROWS):
+            timetable = app_module.get_timetable()
+            bundle = build_bundle(2026, timetable.version, lambda day: app_module.compute_day_payload(timetable, day))
+            write_bundle(bundle, bundle_path(str(tmp_path), 2026))
+
+            with patch('app._year_bundles', YearBundles(str(tmp_path))):
+                with patch('app.compute_day_payload') as mock_compute:
+                    response = app_module.app.test_client().get('/api/day?date=2026-03-15')
+
+        assert response.status_code == 200
+        assert response.get_json()['today']['beginning']['fajr'] == '05:30'
+        mock_compute.assert_not_called()
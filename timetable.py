@@ -0,0 +1,303 @@
+"""
+PRAYER TIMETABLE STORE
+======================
+
+Holds the rows of `data/prayer_times.csv` in memory, indexed by
+(month, day), so the web app and the validator can look a day up without
+re-reading and re-scanning the CSV file. Times are stored column by column
+as minutes since midnight.
+
+HOW TO USE:
+-----------
+    timetable = Timetable.from_csv('data/prayer_times.csv')
+    today = timetable.get(3, 15)
+    today.fajr_begin          # '05:30'
+    today[2]                  # '05:30' (same as the CSV column index)
+    today['FAJR BEGINNING']   # '05:30' (same as the CSV header)
+    timetable.minutes(3, 15, 'FAJR BEGINNING')   # 330
+    timetable.derived_times(3, 15)   # {'sehri_ends': '05:20', 'sunrise': ..., 'noon': ...}
+
+IMPORTANT NOTES:
+---------------
+- Rows are keyed by (month, day) only; the same timetable is reused
+  every year, exactly like the original CSV lookups in `app.index()`.
+- `PrayerDay` records keep the CSV column order, so templates that use
+  `today_prayer_times[2]` keep working unchanged.
+- Blank or unparseable times are stored as `MISSING` and come back as
+  empty strings.
+- Derived times (Sehri ends, Noon, ...) are worked out from `DerivedTime`
+  rules once when the timetable is built and stored as extra columns, so
+  looking them up never parses a time string. A derived time whose source
+  time is missing is missing too.
+"""
+
+import csv
+import hashlib
+import sys
+from array import array
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+
+CSV_HEADER = [
+    'MONTH', 'DATE',
+    'FAJR BEGINNING', 'SUNRISE BEGINNING', 'ZOHR BEGINNING', 'ASAR BEGINNING',
+    'MAGRIB BEGINNING', 'ISHA BEGINNING',
+    'FAJR JAMAAH', 'ZOHR JAMAAH', 'ASAR JAMAAH', 'MAGRIB JAMAAH', 'ISHA JAMAAH'
+]
+
+_HEADER_INDEX = {name: index for index, name in enumerate(CSV_HEADER)}
+
+TIME_COLUMNS = CSV_HEADER[2:]
+
+# Stored for blank or unparseable times; shown as an empty string
+MISSING = 0xFFFF
+
+MINUTES_PER_DAY = 24 * 60
+
+_HHMM = [f"{minutes // 60:02d}:{minutes % 60:02d}" for minutes in range(MINUTES_PER_DAY)]
+
+
+def time_to_minutes(value: str) -> int:
+    """Convert time string (HH:MM) to minutes since midnight, or MISSING"""
+    try:
+        hours, minutes = value.split(':')
+        total = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return MISSING
+    return total if 0 <= total < MISSING else MISSING
+
+
+def minutes_to_time(minutes: int) -> str:
+    """Convert minutes since midnight to time string (HH:MM)"""
+    if minutes == MISSING:
+        return ''
+    if minutes < MINUTES_PER_DAY:
+        return _HHMM[minutes]
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class DerivedTime(NamedTuple):
+    """A time worked out from one CSV column, e.g. Sehri ends = Fajr - 10 minutes"""
+    name: str
+    column: str
+    offset: int = 0  # minutes, negative for "before"
+
+
+# The Suhoor / Sunrise / Zawal boxes shown under the prayer table
+DEFAULT_DERIVED_TIMES = (
+    DerivedTime('sehri_ends', 'FAJR BEGINNING', -10),  # Suhoor ends 10 minutes before Fajr
+    DerivedTime('sunrise', 'SUNRISE BEGINNING'),
+    DerivedTime('noon', 'ZOHR BEGINNING', -10)  # Zawal 10 minutes before Zohr
+)
+
+
+def derive_minutes(minutes: int, offset: int) -> int:
+    """Apply an offset to minutes since midnight, wrapping around midnight"""
+    if minutes == MISSING:
+        return MISSING
+    return (minutes + offset) % MINUTES_PER_DAY
+
+
+class PrayerDay(NamedTuple):
+    """One row of the timetable with typed month/day and HH:MM time strings"""
+    month: int
+    day: int
+    fajr_begin: str
+    sunrise_begin: str
+    zohr_begin: str
+    asar_begin: str
+    magrib_begin: str
+    isha_begin: str
+    fajr_jamaah: str
+    zohr_jamaah: str
+    asar_jamaah: str
+    magrib_jamaah: str
+    isha_jamaah: str
+
+    def __getitem__(self, key):
+        # Allow row['FAJR BEGINNING'] as well as row[2]
+        if isinstance(key, str):
+            return tuple.__getitem__(self, _HEADER_INDEX[key])
+        return tuple.__getitem__(self, key)
+
+    @classmethod
+    def from_row(cls, row: Sequence[str]) -> 'PrayerDay':
+        """Build a record from a raw CSV row (list of strings)"""
+        times = [value.strip() for value in row[2:len(CSV_HEADER)]]
+        times += [''] * (len(CSV_HEADER) - 2 - len(times))
+        return cls(int(row[0]), int(row[1]), *times)
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, str]) -> 'PrayerDay':
+        """Build a record from a csv.DictReader row"""
+        return cls.from_row([row.get(name) or '' for name in CSV_HEADER])
+
+    def beginning_times(self) -> Dict[str, str]:
+        return {
+            'fajr': self.fajr_begin,
+            'sunrise': self.sunrise_begin,
+            'zohr': self.zohr_begin,
+            'asar': self.asar_begin,
+            'magrib': self.magrib_begin,
+            'isha': self.isha_begin
+        }
+
+    def jamaah_times(self) -> Dict[str, str]:
+        return {
+            'fajr': self.fajr_jamaah,
+            'zohr': self.zohr_jamaah,
+            'asar': self.asar_jamaah,
+            'magrib': self.magrib_jamaah,
+            'isha': self.isha_jamaah
+        }
+
+    def as_row(self) -> List[str]:
+        """Return the record as CSV strings, in header order"""
+        return [str(value) for value in self]
+
+
+class Timetable:
+    """Columnar prayer timetable with O(1) lookups by (month, day)
+
+    Every time column is an array('H') of minutes since midnight and the
+    (month, day) index is a dense array of row numbers, so a whole year
+    takes a few KB instead of thousands of Python strings. Rows are only
+    turned back into PrayerDay records when they are looked up.
+
+    Derived times are computed from `rules` once, after loading, and kept
+    in `derived` alongside the CSV columns.
+    """
+
+    def __init__(self, days: Iterable[Sequence] = (), rules: Sequence[DerivedTime] = DEFAULT_DERIVED_TIMES):
+        self.months = array('B')
+        self.dates = array('B')
+        self.columns: Dict[str, array] = {name: array('H') for name in TIME_COLUMNS}
+        self._index = array('h', [-1] * (13 * 32))
+        self.rules = tuple(rules)
+        for rule in self.rules:
+            if rule.column not in self.columns:
+                raise ValueError(f"Unknown column for derived time {rule.name!r}: {rule.column!r}")
+        for day in days:
+            self._append(day[0], day[1], [time_to_minutes(value) for value in day[2:]])
+        self._finish()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[str]], rules: Sequence[DerivedTime] = DEFAULT_DERIVED_TIMES,
+                  skipped: Optional[List[Sequence[str]]] = None) -> 'Timetable':
+        """Build a timetable from raw CSV rows (header already skipped)
+
+        A row with a month or day out of range raises ValueError, unless a
+        `skipped` list is given: the row is added to it instead.
+        """
+        timetable = cls(rules=rules)
+        for row in rows:
+            if row:
+                month, day = int(row[0]), int(row[1])
+                if skipped is not None and not (1 <= month <= 12 and 1 <= day <= 31):
+                    skipped.append(row)
+                    continue
+                timetable._append(month, day, [time_to_minutes(value) for value in row[2:len(CSV_HEADER)]])
+        timetable._finish()
+        return timetable
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict[str, str]], rules: Sequence[DerivedTime] = DEFAULT_DERIVED_TIMES,
+                   skipped: Optional[List[Sequence[str]]] = None) -> 'Timetable':
+        """Build a timetable from csv.DictReader rows"""
+        return cls.from_rows(([row.get(name) or '' for name in CSV_HEADER] for row in rows), rules, skipped)
+
+    @classmethod
+    def from_csv(cls, csv_file_path: str, rules: Sequence[DerivedTime] = DEFAULT_DERIVED_TIMES) -> 'Timetable':
+        """Read and index a prayer times CSV file"""
+        with open(csv_file_path, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header
+            return cls.from_rows(reader, rules)
+
+    def _finish(self):
+        # Work out the derived columns once all rows are in, then fingerprint
+        self.derived: Dict[str, array] = {
+            rule.name: array('H', [derive_minutes(value, rule.offset) for value in self.columns[rule.column]])
+            for rule in self.rules
+        }
+        self.version = self._fingerprint()
+
+    def _append(self, month: int, day: int, minutes: List[int]):
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            raise ValueError(f"Invalid timetable date: month {month}, day {day}")
+        minutes = minutes + [MISSING] * (len(TIME_COLUMNS) - len(minutes))
+        self._index[month * 32 + day] = len(self.months)
+        self.months.append(month)
+        self.dates.append(day)
+        for name, value in zip(TIME_COLUMNS, minutes):
+            self.columns[name].append(value)
+
+    def row_index(self, month: int, day: int) -> Optional[int]:
+        """Return the row number for a month/day, or None if the CSV has no such row"""
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            return None
+        index = self._index[month * 32 + day]
+        return index if index >= 0 else None
+
+    def row(self, index: int) -> PrayerDay:
+        return PrayerDay(
+            self.months[index], self.dates[index],
+            *[minutes_to_time(self.columns[name][index]) for name in TIME_COLUMNS]
+        )
+
+    def get(self, month: int, day: int) -> Optional[PrayerDay]:
+        """Return the row for a month/day, or None if the CSV has no such row"""
+        index = self.row_index(month, day)
+        return None if index is None else self.row(index)
+
+    def for_date(self, day: date) -> Optional[PrayerDay]:
+        return self.get(day.month, day.day)
+
+    def minutes(self, month: int, day: int, column: str) -> Optional[int]:
+        """Return one time as minutes since midnight (MISSING if blank/invalid)"""
+        index = self.row_index(month, day)
+        return None if index is None else self.columns[column][index]
+
+    def derived_times_at(self, index: int) -> Dict[str, str]:
+        return {name: minutes_to_time(values[index]) for name, values in self.derived.items()}
+
+    def derived_times(self, month: int, day: int) -> Optional[Dict[str, str]]:
+        """Return the derived times for a month/day as HH:MM strings, or None if there is no row"""
+        index = self.row_index(month, day)
+        return None if index is None else self.derived_times_at(index)
+
+    def month(self, month: int) -> List[PrayerDay]:
+        """Return all rows for a month in file order"""
+        return [self.row(index) for index in self._month_rows(month)]
+
+    def month_minutes(self, month: int, column: str) -> List[int]:
+        """Return one column for a month, in file order, as minutes since midnight"""
+        values = self.columns[column]
+        return [values[index] for index in self._month_rows(month)]
+
+    def _month_rows(self, month: int) -> List[int]:
+        return [index for index, value in enumerate(self.months) if value == month]
+
+    def memory_size(self) -> int:
+        """Approximate bytes held by the columns and the date index"""
+        arrays = [self.months, self.dates, self._index] + list(self.columns.values()) + list(self.derived.values())
+        return sum(sys.getsizeof(values) for values in arrays)
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    def __iter__(self) -> Iterator[PrayerDay]:
+        return (self.row(index) for index in range(len(self.months)))
+
+    def _fingerprint(self) -> str:
+        # Short content hash so caches can tell when the CSV data changed
+        digest = hashlib.sha1()
+        digest.update(self.months.tobytes())
+        digest.update(self.dates.tobytes())
+        for name in TIME_COLUMNS:
+            digest.update(self.columns[name].tobytes())
+        for name, values in self.derived.items():
+            digest.update(name.encode('utf-8'))
+            digest.update(values.tobytes())
+        return digest.hexdigest()[:12]
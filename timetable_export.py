@@ -0,0 +1,108 @@
+"""
+TIMETABLE RANGE EXPORT
+======================
+
+Generators that walk a date range over the in-memory timetable and yield
+it as NDJSON or CSV text, a chunk at a time, so `/api/range` can stream a
+whole year (or many years) with constant memory.
+
+HOW TO USE:
+-----------
+    for chunk in iter_ndjson(timetable, date(2025, 1, 1), date(2025, 12, 31)):
+        output.write(chunk)
+
+IMPORTANT NOTES:
+---------------
+- The timetable is keyed by (month, day), so every year in the range
+  reuses the same rows. Dates without a row (e.g. months missing from
+  the CSV, or 29 Feb) are skipped.
+- Hijri dates are stepped day by day from a single conversion, so long
+  ranges cost one `hijri_converter` call rather than one per day.
+- The page's Suhoor/Sunrise/Zawal boxes come from the timetable's
+  precomputed derived times, so no time strings are parsed per row.
+"""
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+from typing import Iterator, Tuple
+
+from hijri_calendar import iter_hijri_dates
+from timetable import CSV_HEADER, PrayerDay, Timetable
+
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Rows per yielded chunk; keeps chunks around 8-16KB
+CHUNK_ROWS = 64
+
+EXPORT_CSV_HEADER = ['DATE'] + CSV_HEADER[2:] + ['SEHRI ENDS', 'NOON', 'HIJRI DATE']
+
+
+def iter_days(timetable: Timetable, start: date, end: date) -> Iterator[Tuple[date, PrayerDay]]:
+    """Yield (date, row) for every date from start to end inclusive that has a row"""
+    day = start
+    one_day = timedelta(days=1)
+    while day <= end:
+        row = timetable.for_date(day)
+        if row is not None:
+            yield day, row
+        day += one_day
+
+
+def iter_days_with_hijri(timetable: Timetable, start: date, end: date) -> Iterator[Tuple[date, int, str]]:
+    """Like iter_days, but yielding the row number and the formatted Hijri date"""
+    day = start
+    one_day = timedelta(days=1)
+    for islamic_date in iter_hijri_dates(start, end):
+        index = timetable.row_index(day.month, day.day)
+        if index is not None:
+            yield day, index, islamic_date
+        day += one_day
+
+
+def iter_ndjson(timetable: Timetable, start: date, end: date) -> Iterator[str]:
+    """Yield the range as newline-delimited JSON, one object per date"""
+    lines = []
+    for day, index, islamic_date in iter_days_with_hijri(timetable, start, end):
+        row = timetable.row(index)
+        lines.append(json.dumps({
+            'date': day.isoformat(),
+            'islamic_date': islamic_date,
+            'beginning': row.beginning_times(),
+            'jamaah': row.jamaah_times(),
+            'important': timetable.derived_times_at(index)
+        }, separators=(',', ':')))
+        if len(lines) >= CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def iter_csv(timetable: Timetable, start: date, end: date) -> Iterator[str]:
+    """Yield the range as CSV text, starting with the header"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_CSV_HEADER)
+    rows = 0
+    for day, index, islamic_date in iter_days_with_hijri(timetable, start, end):
+        important = timetable.derived_times_at(index)
+        writer.writerow([day.isoformat()] + timetable.row(index).as_row()[2:] + [important.get('sehri_ends', ''), important.get('noon', ''), islamic_date])
+        rows += 1
+        if rows % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORTERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv
+}
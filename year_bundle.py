@@ -0,0 +1,179 @@
+"""
+YEAR BUNDLES
+============
+
+Pre-bakes everything the displays ask for about a day - prayer times,
+Suhoor / Sunrise / Zawal, the Hijri date and which day comes next - for
+a whole year into one file, so a freshly woken dyno answers /api/day with
+a dictionary lookup instead of building the day (and converting the Hijri
+date) on the first requests.
+
+HOW TO USE:
+-----------
+Before deploying (and again whenever the CSV changes):
+
+    py year_bundle.py              # this year -> data/year-2026.json
+    py year_bundle.py 2027         # another year
+
+This also compiles data/prayer_times.bin (see compiled_timetable.py), so
+startup maps one file and loads one file. In code:
+
+    bundles = YearBundles('data')
+    bundles.payload(timetable.version, date(2026, 3, 15))   # /api/day body, or None
+
+IMPORTANT NOTES:
+---------------
+- A bundle is only used while its `version` matches the timetable being
+  served, so an edited CSV is never answered from an old bundle; the
+  app builds the day as before until the bundle is rebuilt.
+- Bundles cover 1 January to 31 December plus 1 January of the next year,
+  so 31 December still has a "tomorrow".
+- A day with no row in the CSV is stored as null and answered with a 404,
+  exactly as without a bundle.
+- There is no per-day Summer Time flag: nothing served reads one, and the
+  clock needs it for the current instant (clocks change at 01:00 UTC),
+  which `irish_time.is_dst` answers without a file.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+import irish_time
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+
+
+def bundle_path(data_dir: str, year: int) -> str:
+    return os.path.join(data_dir, f"year-{year}.json")
+
+
+def build_bundle(year: int, version: str, day_payload: Callable[[date], Optional[dict]]) -> dict:
+    """Bake one year from a function returning the /api/day body for a date"""
+    days = {}
+    day = date(year, 1, 1)
+    last = date(year + 1, 1, 1)
+    while day <= last:
+        payload = day_payload(day)
+        if payload is None:
+            days[day.isoformat()] = None
+        else:
+            tomorrow = day + timedelta(days=1)
+            days[day.isoformat()] = {
+                'gregorian_date': payload['gregorian_date'],
+                'islamic_date': payload['islamic_date'],
+                'times': payload['today'],
+                # Tomorrow's times are that day's own entry
+                'tomorrow': tomorrow.isoformat() if payload['tomorrow'] is not None else None
+            }
+        day += timedelta(days=1)
+    return {'format': BUNDLE_FORMAT, 'year': year, 'version': version, 'days': days}
+
+
+def write_bundle(bundle: dict, path: str):
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(bundle, file, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporary, path)
+
+
+class YearBundle:
+    """One loaded year, with every day's /api/day body ready to send"""
+
+    def __init__(self, bundle: dict):
+        if bundle.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported year bundle format: {bundle.get('format')!r}")
+        self.year: int = bundle['year']
+        self.version: str = bundle['version']
+        days = bundle['days']
+        self._payloads: Dict[date, dict] = {}
+        for key, entry in days.items():
+            if entry is None:
+                continue
+            day = date.fromisoformat(key)
+            tomorrow = days.get(entry['tomorrow']) if entry['tomorrow'] else None
+            self._payloads[day] = {
+                'date': key,
+                'version': self.version,
+                'gregorian_date': entry['gregorian_date'],
+                'islamic_date': entry['islamic_date'],
+                'today': entry['times'],
+                'tomorrow': tomorrow['times'] if tomorrow else None
+            }
+
+    @classmethod
+    def load(cls, path: str) -> 'YearBundle':
+        with open(path, 'r', encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    def payload(self, day: date) -> Optional[dict]:
+        return self._payloads.get(day)
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+
+class YearBundles:
+    """Year bundles in a directory, each loaded the first time it is asked for"""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self._bundles: Dict[int, Optional[YearBundle]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, year: int) -> Optional[YearBundle]:
+        with self._lock:
+            if year not in self._bundles:
+                path = bundle_path(self.data_dir, year)
+                bundle = None
+                if os.path.exists(path):
+                    try:
+                        bundle = YearBundle.load(path)
+                    except (OSError, ValueError, KeyError, TypeError) as e:
+                        logger.warning("Ignoring year bundle %s: %s", path, e)
+                self._bundles[year] = bundle
+            return self._bundles[year]
+
+    def payload(self, version: str, day: date) -> Optional[dict]:
+        """The baked /api/day body for a date, if a bundle for this timetable version has it"""
+        bundle = self.get(day.year)
+        if bundle is None or bundle.version != version:
+            return None
+        return bundle.payload(day)
+
+    def clear(self):
+        with self._lock:
+            self._bundles.clear()
+
+
+def main():
+    this_year = irish_time.utc_to_irish(datetime.now(timezone.utc)).year
+    parser = argparse.ArgumentParser(description='Pre-bake a year of /api/day answers: prayer times and Hijri dates')
+    parser.add_argument('year', nargs='?', type=int, default=this_year)
+    parser.add_argument('--csv', default=os.path.join('data', 'prayer_times.csv'))
+    parser.add_argument('--output', help='bundle file (default: year-<year>.json next to the CSV)')
+    args = parser.parse_args()
+
+    # The app's own rules and day builder, so the bundle matches what it would serve
+    import app as app_module
+    from compiled_timetable import compile_timetable
+    from timetable import Timetable
+
+    compiled = compile_timetable(args.csv, rules=app_module.IMPORTANT_TIME_RULES)
+    timetable = Timetable.from_csv(args.csv, app_module.IMPORTANT_TIME_RULES)
+    bundle = build_bundle(args.year, timetable.version,
+                          lambda day: app_module.compute_day_payload(timetable, day))
+    path = args.output or bundle_path(os.path.dirname(args.csv), args.year)
+    write_bundle(bundle, path)
+    baked = sum(1 for entry in bundle['days'].values() if entry is not None)
+    print(f"{args.csv} -> {compiled}, {path} ({baked} days, {os.path.getsize(path) / 1024:.1f} KB)")
+
+
+if __name__ == '__main__':
+    main()